@@ -9,6 +9,10 @@ Registration is defensive on purpose. A diagnostic extension that itself fails
 to import is a bad joke, so if anything goes wrong we degrade to "no panel" and
 print how to run the CLI - which is the thing you'd want anyway if your
 environment is broken enough to break us.
+
+None of this imports the diagnostic engine; it loads on the first request
+(see comfydoctor/api.py), so a start that never opens the panel doesn't pay
+for it.
 """
 
 from .nodes import NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS
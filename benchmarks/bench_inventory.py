@@ -0,0 +1,70 @@
+"""Inventory build: importlib.metadata vs the native scandir reader, and
+serial vs thread-pooled reads.
+
+    python benchmarks/bench_inventory.py [N_DISTS]
+
+Builds a synthetic site-packages of N_DISTS (default 1000) wheel installs and
+times a cold build (no dist-info cache) each way, with and without reading
+the module lists from RECORD. On a local SSD with a warm page cache the pool
+mostly measures GIL contention; the case it exists for is a network or
+spinning disk, where each read is a round trip.
+"""
+
+from __future__ import annotations
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks import synth  # noqa: E402
+from comfydoctor import inventory  # noqa: E402
+
+
+def _time(fn, repeat: int = 5) -> float:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs)
+
+
+def main(n: int = 1000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        site = synth.site_packages(Path(tmp), n)
+        paths = [str(site)]
+
+        ref = inventory.build(paths=paths, use_cache=False)
+        fast = inventory.build(paths=paths, use_cache=False, reader="native")
+        assert fast.to_dict() == ref.to_dict(), "readers disagree - benchmark void"
+
+        t_md = _time(lambda: inventory.build(paths=paths, use_cache=False))
+        t_native = _time(lambda: inventory.build(paths=paths, use_cache=False, reader="native"))
+
+        print(f"{n} dists, cold build (no dist-info cache), median of 5")
+        print(f"  importlib.metadata  {t_md * 1000:8.1f} ms")
+        print(f"  native scandir      {t_native * 1000:8.1f} ms   ({t_md / t_native:.1f}x)")
+
+        # Module lists are read from RECORD only when something asks for them.
+        t_owners = _time(lambda: inventory.build(paths=paths, use_cache=False,
+                                                 reader="native").module_owners)
+        print(f"  native + module_owners {t_owners * 1000:5.1f} ms   (RECORD read: "
+              f"+{(t_owners - t_native) * 1000:.1f} ms)")
+
+        for reader in ("metadata", "native"):
+            serial = _time(lambda: inventory.build(paths=paths, use_cache=False, reader=reader))
+            for workers in (4, 8):
+                par = inventory.build(paths=paths, use_cache=False, reader=reader, workers=workers)
+                assert par.to_dict() == ref.to_dict(), "parallel build disagrees - benchmark void"
+                t = _time(lambda: inventory.build(paths=paths, use_cache=False, reader=reader,
+                                                  workers=workers))
+                print(f"  {reader:<9} serial {serial * 1000:8.1f} ms | {workers} workers "
+                      f"{t * 1000:8.1f} ms   ({serial / t:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
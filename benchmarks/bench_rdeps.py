@@ -0,0 +1,70 @@
+"""Reverse-dependency index vs asking every dist, once per question.
+
+    python benchmarks/bench_rdeps.py [N_DISTS]
+
+The rules used to answer "who pins numpy / torch / <target>?" by walking every
+installed dist through `requirement_pins`. The index is built once, in the same
+pass as the pip check; this measures what that costs the build and what it
+saves the rules, for a handful of questions per scan.
+"""
+
+from __future__ import annotations
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks import synth  # noqa: E402
+from comfydoctor import inventory  # noqa: E402
+
+# Roughly what one scan asks: numpy_abi_break, abi_pin_mismatch, and one
+# bystander lookup per target in broken_dependencies.
+QUESTIONS = ["numpy", "torch"] + [f"pkg-{i:04d}" for i in range(0, 200, 20)]
+
+
+def _time(fn, repeat: int = 5) -> float:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs)
+
+
+def main(n: int = 1000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        site = synth.site_packages(Path(tmp), n)
+        inv = inventory.build(paths=[str(site)], use_cache=False, reader="native")
+
+        # The scan's requirement cache is warm by the time the rules run, so
+        # both sides are measured against it: this is walking, not parsing.
+        reqs = inv.requirements
+
+        def per_dist():
+            for target in QUESTIONS:
+                for d in inv.dists.values():
+                    inventory.requirement_pins(d, target, reqs)
+
+        def lookups():
+            for target in QUESTIONS:
+                inv.pins_on(target)
+
+        for target in QUESTIONS:
+            want = [s for d in inv.dists.values() for s in inventory.requirement_pins(d, target)]
+            assert [p.specifier for p in inv.pins_on(target)] == want, "index disagrees"
+
+        t_build = _time(lambda: inventory._check_requirements(inv.dists, reqs))
+        t_scan = _time(per_dist)
+        t_index = _time(lookups)
+        print(f"{n} dists, {len(QUESTIONS)} 'who pins X' questions, median of 5")
+        print(f"  pip check + index build   {t_build * 1000:8.2f} ms (once per scan)")
+        print(f"  questions via per-dist    {t_scan * 1000:8.2f} ms")
+        print(f"  questions via the index   {t_index * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,75 @@
+"""Version / SpecifierSet memo: the custom node checks with and without it.
+
+    python benchmarks/bench_versions.py [N_NODES]
+
+Surveys a synthetic custom_nodes directory of N_NODES (default 150) and times
+`unsatisfied_demands` + `conflicting_demands` against an inventory that has
+every requested package installed - once with the memo, once with packaging
+parsing every string afresh as it used to.
+"""
+
+from __future__ import annotations
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks import synth  # noqa: E402
+from comfydoctor import custom_nodes, inventory  # noqa: E402
+
+INSTALLED = {
+    "numpy": "1.26.4", "opencv-python": "4.10.0.84", "pillow": "10.4.0", "transformers": "4.44.2",
+    "diffusers": "0.30.0", "einops": "0.8.0", "safetensors": "0.4.4", "scipy": "1.14.1",
+    "insightface": "0.7.3", "onnxruntime": "1.19.0", "kornia": "0.7.3", "timm": "1.0.9",
+    "huggingface-hub": "0.24.6", "accelerate": "0.33.0", "tqdm": "4.66.5", "pyyaml": "6.0.2",
+    "requests": "2.32.3", "matplotlib": "3.9.2",
+}
+
+
+def _time(fn, repeat: int = 5) -> float:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs)
+
+
+def main(n: int = 150) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        survey = custom_nodes.survey(synth.custom_nodes(Path(tmp), n))
+    dists = {k: inventory.Dist(name=k, raw_name=k, version=v, location="/site")
+             for k, v in INSTALLED.items()}
+    inv = inventory.Inventory(dists=dists, duplicates={})
+
+    def checks():
+        custom_nodes.unsatisfied_demands(survey, inv)
+        custom_nodes.conflicting_demands(survey, inv)
+
+    checks()  # warm the requirement cache: this measures versions only
+    inventory._version.cache_clear()
+    inventory.specifier_set.cache_clear()
+    memo = _time(checks)
+    stats = inventory.version_cache_stats()
+
+    cached = (inventory._version, inventory.specifier_set)
+    inventory._version, inventory.specifier_set = (f.__wrapped__ for f in cached)
+    try:
+        fresh = _time(checks)
+    finally:
+        inventory._version, inventory.specifier_set = cached
+
+    reqs = sum(len(node.requirements) for node in survey.nodes)
+    print(f"{n} nodes, {reqs} requirement lines, median of 5")
+    print(f"  parse every time   {fresh * 1000:8.2f} ms")
+    print(f"  memoised           {memo * 1000:8.2f} ms   ({fresh / memo:.1f}x)")
+    for name, s in stats.items():
+        print(f"  {name:<10} hits {s['hits']:6d}  misses {s['misses']:4d}  size {s['size']}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 150)
@@ -0,0 +1,63 @@
+"""Synthetic environments for the benchmarks: big, boring and deterministic.
+
+Nothing here is realistic about *which* packages exist - only about the shape
+of the files on disk, which is what the code being measured actually reads.
+"""
+
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+# A README-sized long description, so METADATA costs what it costs in the wild.
+_BODY = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 12 + "\n") * 40
+
+
+def site_packages(root: Path, n: int = 1000, seed: int = 0) -> Path:
+    """Write `n` wheel-style installs into root/site-packages and return it."""
+    rng = random.Random(seed)
+    site = root / "site-packages"
+    site.mkdir(parents=True, exist_ok=True)
+    names = [f"pkg-{i:04d}" for i in range(n)]
+    for i, name in enumerate(names):
+        mod = name.replace("-", "_")
+        version = f"{rng.randint(0, 9)}.{rng.randint(0, 30)}.{rng.randint(0, 9)}"
+        info = site / f"{mod}-{version}.dist-info"
+        info.mkdir()
+        deps = rng.sample(names[:i], min(i, rng.randint(0, 6)))
+        headers = [
+            "Metadata-Version: 2.1",
+            f"Name: {name}",
+            f"Version: {version}",
+            "Summary: a synthetic package",
+            *(f"Requires-Dist: {d}>={rng.randint(0, 3)}.0" for d in deps),
+            "Requires-Dist: numpy>=1.21; extra == 'fast'",
+            'Requires-Dist: colorama; sys_platform == "win32"',
+        ]
+        (info / "METADATA").write_text("\n".join(headers) + "\n\n" + _BODY, encoding="utf-8")
+        rows = [f"{mod}/__init__.py,sha256=x,10"]
+        rows += [f"{mod}/sub{j}/file{k}.py,sha256=x,10" for j in range(4) for k in range(10)]
+        rows += [f"{mod}/__pycache__/file{k}.cpython-311.pyc,," for k in range(20)]
+        rows += [f"{info.name}/{f},," for f in ("METADATA", "RECORD", "WHEEL", "INSTALLER")]
+        (info / "RECORD").write_text("\n".join(rows) + "\n", encoding="utf-8")
+        (info / "WHEEL").write_text("Wheel-Version: 1.0\n", encoding="utf-8")
+    return site
+
+
+def custom_nodes(root: Path, n: int = 150, seed: int = 0) -> Path:
+    """Write `n` custom node folders, each with a requirements.txt, and return
+    the custom_nodes directory."""
+    rng = random.Random(seed)
+    cn = root / "custom_nodes"
+    cn.mkdir(parents=True, exist_ok=True)
+    pool = ["numpy", "opencv-python", "pillow", "transformers", "diffusers", "einops",
+            "safetensors", "scipy", "insightface", "onnxruntime", "kornia", "timm",
+            "huggingface-hub", "accelerate", "tqdm", "pyyaml", "requests", "matplotlib"]
+    specs = ["", ">=1.0", ">=1.21,<2", "==4.10.0.84", "<3", ">=0.6", "~=2.1", "!=1.0.1"]
+    for i in range(n):
+        node = cn / f"ComfyUI-Node-{i:03d}"
+        node.mkdir()
+        reqs = [p + rng.choice(specs) for p in rng.sample(pool, rng.randint(2, 10))]
+        (node / "requirements.txt").write_text("\n".join(reqs) + "\n", encoding="utf-8")
+        (node / "__init__.py").write_text("", encoding="utf-8")
+    return cn
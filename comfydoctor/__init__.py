@@ -13,9 +13,31 @@ a package compiled against the wrong torch does not raise, it aborts the
 process, and a diagnostic that kills the thing it is diagnosing is worthless.
 """
 
+import importlib
+
 from .models import Finding, Remedy, ScanResult, Severity
-from .scan import last, scan
 
 __version__ = "2.1.1"
 
-__all__ = ["scan", "last", "Finding", "Remedy", "ScanResult", "Severity", "__version__"]
+# The engine (scan, rules, the probes, the inventory) is imported on first use
+# rather than with the package: ComfyUI imports the extension at every start,
+# and most starts never open the panel. `import comfydoctor` costs models.py.
+#
+# `comfydoctor.scan` names both the function and its submodule, and importing
+# the submodule binds the package attribute to the module. So the first lookup
+# of any of these binds all three to the functions, over the submodule, as
+# the eager import used to. Code that imported the submodule itself, before
+# any lookup here, sees the module, as for any package; inside the package the
+# function is always `from .scan import scan`.
+_LAZY = ("scan", "last", "scan_cached")
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        mod = importlib.import_module(".scan", __name__)
+        globals().update({n: getattr(mod, n) for n in _LAZY})
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["scan", "scan_cached", "last", "Finding", "Remedy", "ScanResult", "Severity", "__version__"]
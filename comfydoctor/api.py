@@ -1,12 +1,26 @@
 """HTTP surface, mounted on ComfyUI's aiohttp server.
 
-  GET  /comfydoctor/scan          -> ScanResult as JSON
+  GET  /comfydoctor/scan          -> ScanResult as JSON (?workers=N: parallel dist-info reads;
+                                     ?only=torch_stack,packages: just those rule groups;
+                                     unchanged inventory / node survey are reused, see watch.py;
+                                     served from the last scan while the environment's
+                                     fingerprint matches and within COMFYDOCTOR_SCAN_TTL -
+                                     "cached" says which; ?force=1 always scans. Requests
+                                     arriving mid-scan share it: "single_flight" counts them)
+  GET  /comfydoctor/scan/stream   -> the same scan as NDJSON, one event per line as it happens:
+                                     {"event": "probe"|"rule", ...}, then {"event": "result",
+                                     "result": <ScanResult>, "cached": bool} (or "error")
   GET  /comfydoctor/report.html   -> self-contained HTML report (download)
   GET  /comfydoctor/report.md     -> markdown, anonymized, for pasting into an issue
   POST /comfydoctor/fix           -> {finding_id} -> {job_id}
   GET  /comfydoctor/fix/{job_id}  -> job status + new output lines (poll with ?since=N)
   POST /comfydoctor/fix/{job_id}/cancel
 
+Scans, report rendering and the fix lookup run on ComfyDoctor's own small
+thread pool (executor.py), never on the event loop or its shared default pool -
+and so does the first import of the engine they need. When that pool's queue
+is full, the route answers 503 at once.
+
 The old code registered routes with a Flask-style `@server.route` decorator that
 ComfyUI's aiohttp server does not have - so none of its routes ever existed and
 its Refresh/Save buttons had never worked. This is the actual API.
@@ -15,11 +29,12 @@ its Refresh/Save buttons had never worked. This is the actual API.
 from __future__ import annotations
 
 import json
+from functools import partial
 
-from . import report, runner
-from .scan import last as last_scan
-from .scan import remedy_for
-from .scan import scan as run_scan
+# Only what registering needs is imported here. ComfyUI imports this module at
+# every start, and most starts never open the panel: the engine (scan, rules,
+# probes, inventory) is imported by the first request that uses it.
+from . import executor, prewarm
 
 _registered = False
 
@@ -40,13 +55,72 @@ def register() -> bool:
 
     @routes.get("/comfydoctor/scan")
     async def _scan(request):
-        result = await _in_thread(run_scan)
-        return web.json_response(result.to_dict())
+        only = _list_query(request, "only")
+        if only is not None:
+            try:
+                error = await _in_thread(_unknown_groups, only)
+            except executor.Busy:
+                return _busy(web)
+            if error is not None:
+                return web.json_response({"error": error}, status=400)
+        try:
+            # Anything the scan itself raises is ours, not the request's: a 500.
+            result, cached, flights = await _in_thread(
+                _cached_scan, _int_query(request, "workers"), only, _flag(request, "force"))
+        except executor.Busy:
+            return _busy(web)
+        return web.json_response({**result.to_dict(), "cached": cached,
+                                  "single_flight": flights,
+                                  "executor": executor.default().stats()})
+
+    @routes.get("/comfydoctor/scan/stream")
+    async def _scan_stream(request):
+        import asyncio
+
+        only = _list_query(request, "only")
+        if only is not None:
+            try:
+                error = await _in_thread(_unknown_groups, only)
+            except executor.Busy:
+                return _busy(web)
+            if error is not None:
+                return web.json_response({"error": error}, status=400)
+
+        # The scan runs on a worker thread and hands its events to the event
+        # loop; None marks the end.
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+
+        def emit(event):
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        try:
+            job = _in_thread(_cached_scan, _int_query(request, "workers"), only,
+                             _flag(request, "force"), emit)
+        except executor.Busy:
+            return _busy(web)
+        job.add_done_callback(lambda _: events.put_nowait(None))
+
+        resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson",
+                                           "Cache-Control": "no-cache"})
+        await resp.prepare(request)
+
+        while (event := await events.get()) is not None:
+            await resp.write(_ndjson(event))
+        try:
+            result, cached, _ = job.result()
+            await resp.write(_ndjson({"event": "result", "result": result.to_dict(), "cached": cached}))
+        except Exception as exc:
+            await resp.write(_ndjson({"event": "error", "error": f"{type(exc).__name__}: {exc}"}))
+        await resp.write_eof()
+        return resp
 
     @routes.get("/comfydoctor/report.html")
     async def _report_html(request):
-        result = last_scan() or await _in_thread(run_scan)
-        html = report.to_html(result)
+        try:
+            html = await _in_thread(_render, "to_html")
+        except executor.Busy:
+            return _busy(web)
         return web.Response(
             body=html.encode("utf-8"),
             content_type="text/html",
@@ -55,8 +129,11 @@ def register() -> bool:
 
     @routes.get("/comfydoctor/report.md")
     async def _report_md(request):
-        result = last_scan() or await _in_thread(run_scan)
-        return web.Response(text=report.to_markdown(result), content_type="text/plain")
+        try:
+            text = await _in_thread(_render, "to_markdown")
+        except executor.Busy:
+            return _busy(web)
+        return web.Response(text=text, content_type="text/plain")
 
     @routes.post("/comfydoctor/fix")
     async def _fix(request):
@@ -69,47 +146,132 @@ def register() -> bool:
         if not isinstance(finding_id, str):
             return web.json_response({"error": "finding_id is required"}, status=400)
 
-        # The client hands us an id, never a command. We execute only the argv we
-        # generated ourselves during the last scan. If the id isn't in that scan
-        # (stale panel, or someone poking the endpoint) there is simply nothing
-        # to run.
-        remedy = remedy_for(finding_id)
+        try:
+            remedy, job, err = await _in_thread(_start_fix, finding_id)
+        except executor.Busy:
+            return _busy(web)
         if remedy is None:
             return web.json_response(
                 {"error": "No runnable fix for that finding in the current scan. Re-scan and retry."},
                 status=404,
             )
-
-        job, err = runner.start(finding_id, remedy)
         if job is None:
             return web.json_response({"error": err}, status=409)
         return web.json_response({"job_id": job.id, "commands": remedy.as_shell()})
 
     @routes.get("/comfydoctor/fix/{job_id}")
     async def _fix_status(request):
+        from . import runner
+
         job = runner.get(request.match_info["job_id"])
         if not job:
             return web.json_response({"error": "unknown job"}, status=404)
-        try:
-            since = int(request.query.get("since", "0"))
-        except ValueError:
-            since = 0
-        return web.json_response(job.snapshot(since))
+        return web.json_response(job.snapshot(_int_query(request, "since")))
 
     @routes.post("/comfydoctor/fix/{job_id}/cancel")
     async def _fix_cancel(request):
+        from . import runner
+
         ok = runner.cancel(request.match_info["job_id"])
         return web.json_response({"cancelled": ok})
 
+    # Warm the scan cache in the background once ComfyUI has settled, so the
+    # first panel open is instant (see prewarm.py; COMFYDOCTOR_PREWARM=0).
+    prewarm.schedule(partial(_comfy_busy, PromptServer.instance))
+
     _registered = True
     return True
 
 
-async def _in_thread(fn, *args):
+def _comfy_busy(server) -> bool:
+    """Is a prompt running or queued? ComfyUI's queue counts both."""
+    return server.prompt_queue.get_tasks_remaining() > 0
+
+
+def _int_query(request, name: str, default: int = 0) -> int:
+    try:
+        return int(request.query.get(name, default))
+    except ValueError:
+        return default
+
+
+def _flag(request, name: str) -> bool:
+    return request.query.get(name, "") not in ("", "0", "false")
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, default=str) + "\n").encode("utf-8")
+
+
+def _list_query(request, name: str) -> list[str] | None:
+    raw = request.query.get(name, "")
+    items = [v.strip() for v in raw.split(",") if v.strip()]
+    return items or None
+
+
+def _full(result):
+    """A report is of the whole environment: a partial (?only=) scan won't do."""
+    return result if result is not None and result.only is None else None
+
+
+# The executor jobs below import the engine (scan, rules, the probes, the
+# inventory) themselves: on the pool, never on the event loop, which would
+# stall every websocket for the first request's ~100 ms of imports.
+
+def _cached_scan(workers: int, only: list[str] | None, force: bool, on_event=None):
+    """scan_cached, plus the single-flight stats once it is done."""
+    from .scan import flight_stats, scan_cached
+
+    result, cached = scan_cached(workers, only, force, on_event)
+    return result, cached, flight_stats()
+
+
+def _unknown_groups(only: list[str]) -> str | None:
+    """Why ?only= names no rule group, or None when it is fine."""
+    from .rules import select
+
+    try:
+        select(only)
+    except ValueError as exc:
+        return str(exc)
+    return None
+
+
+def _start_fix(finding_id: str):
+    """(remedy, job, error). The client hands us an id, never a command: we
+    execute only the argv we generated ourselves during the last scan. If the
+    id isn't in that scan (stale panel, or someone poking the endpoint) there
+    is simply nothing to run, and remedy is None."""
+    from . import runner
+    from .scan import remedy_for
+
+    remedy = remedy_for(finding_id)
+    if remedy is None:
+        return None, None, None
+    job, err = runner.start(finding_id, remedy)
+    return remedy, job, err
+
+
+def _render(to_text: str) -> str:
+    """The report, by the name of its report.py renderer."""
+    from . import report
+    from .scan import last, scan_cached
+
+    result = _full(last()) or scan_cached()[0]
+    return getattr(report, to_text)(result)
+
+
+def _busy(web):
+    return web.json_response({"error": "ComfyDoctor is busy; try again in a moment."}, status=503)
+
+
+def _in_thread(fn, *args, priority: int = executor.INTERACTIVE):
     """A full scan takes ~1-3s (nvidia-smi + a few hundred dist-info reads).
     That is far too long to block ComfyUI's event loop, which is also serving
-    the websocket that streams render previews."""
+    the websocket that streams render previews - and too long to borrow the
+    loop's default pool, which ComfyUI and other extensions share. Runs `fn`
+    on ComfyDoctor's own pool (executor.py). Raises executor.Busy at once when
+    its queue is full; otherwise returns an awaitable future."""
     import asyncio
 
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, fn, *args)
+    return asyncio.wrap_future(executor.default().submit(fn, *args, priority=priority))
@@ -0,0 +1,263 @@
+"""Which of the changed packages broke it? A bisection over the time machine's diff.
+
+When the what-changed finding says 37 packages moved, the choice so far was
+to put all 37 back or to guess. Bisection puts back half of them, re-runs a
+scan of just the checks that report the problem, and keeps the half that
+decides it; then a quarter, and so on - about log2(37) + 1 = 7 steps to the
+one package (or torch family) whose old version makes the problem go away.
+
+    comfydoctor bisect start [FINDING_ID]   plan it, from a full scan
+    comfydoctor bisect step                 apply the next step, scan, narrow
+    comfydoctor bisect status | reset
+
+Rules it keeps, the same as the full restore (timemachine._restore_remedy,
+which builds every step's commands):
+
+  * torch, torchvision and torchaudio move together, as one unit, and only
+    through the PyTorch index of the build being installed;
+  * nothing is ever uninstalled. A step that takes a package back to its new
+    version reinstalls that version; a package that had been removed can be
+    put back but never taken away again, so once restored it stays;
+  * packages added since the working state are not part of the search.
+
+Each step's machine state is explicit: the units in `trying` at their old
+versions, every other changed unit at its new one. Only what differs from the
+state already applied is installed.
+
+The plan lives in <comfy_root>/user/comfydoctor/bisect.json and is saved after
+every transition - chosen, applied, observed - so a step interrupted by a
+ComfyUI restart (which a torch change needs anyway) resumes where it stopped.
+The search assumes a single culprit unit. When the narrowed-down unit alone
+does not fix the problem, the plan says so (status "inconclusive") instead of
+naming it. The same goes for a step whose check could not run - a probe
+failed, or one of the problem's rules crashed on the restored packages: the
+finding being absent then says nothing about the problem, and a search that
+read it as "fixed" would name an innocent.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from .env import Environment
+from .models import Remedy
+from .timemachine import TORCH_FAMILY, _restore_remedy, when
+
+FILENAME = "bisect.json"
+TORCH_UNIT = "torch"
+WHAT_CHANGED = "env.changed_since_working"
+
+
+@dataclass
+class Plan:
+    problem: str                       # the finding id being chased
+    reference: str | None              # when the working snapshot was taken
+    only: list[str]                    # rule groups the targeted scan runs
+    units: dict[str, list[list]]       # unit -> [[package, old, new or None if removed]]
+    candidates: list[str]              # units still suspected, in search order
+    restored: list[str] = field(default_factory=list)   # packages at their old versions now
+    trying: list[str] | None = None    # units this step restores
+    applied: bool = False              # this step's packages are installed
+    proven: list[str] | None = None    # the smallest restore seen to fix it
+    steps: list[dict] = field(default_factory=list)     # {"restored", "fixed" or None}, in order
+    status: str = "running"            # running | found | inconclusive
+
+    @classmethod
+    def new(cls, problem: str, diff: dict, reference: str | None, only: list[str]) -> Plan:
+        """A plan over the changed and removed packages of a time machine
+        diff. Raises ValueError when there is nothing to search."""
+        units: dict[str, list[list]] = {}
+        for name, old, new in diff["changed"]:
+            units.setdefault(TORCH_UNIT if name in TORCH_FAMILY else name, []).append([name, old, new])
+        for name, old in diff["removed"]:
+            units.setdefault(TORCH_UNIT if name in TORCH_FAMILY else name, []).append([name, old, None])
+        if not units:
+            raise ValueError("no package changed or was removed, so there is nothing to bisect")
+        return cls(problem, reference, list(only), units, sorted(units))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Plan:
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @property
+    def culprit(self) -> list[str] | None:
+        return self.candidates if self.status == "found" else None
+
+    def steps_left(self) -> int:
+        """At most this many more steps: the halvings, plus a confirming step
+        when the last one narrowed by elimination."""
+        if self.status != "running":
+            return 0
+        n, steps = len(self.candidates), 0
+        while n > 1:
+            n, steps = (n + 1) // 2, steps + 1
+        return steps + 1
+
+    # -- the search --------------------------------------------------------- #
+
+    def next(self) -> list[str] | None:
+        """The units this step restores: the first half of the candidates, or
+        the last candidate alone to confirm it. None once the search is over."""
+        if self.status != "running":
+            return None
+        if self.trying is None:
+            n = len(self.candidates)
+            self.trying = self.candidates[:n // 2] if n > 1 else list(self.candidates)
+            self.applied = False
+        return self.trying
+
+    def remedy(self, env: Environment) -> Remedy | None:
+        """This step's installs: each package whose version in the step's
+        state differs from what is applied now. None when nothing needs to
+        move (a step that would only take a removed package away again)."""
+        trying = set(self.next() or ())
+        restored = set(self.restored)
+        moves = []
+        for unit, packages in self.units.items():
+            for name, old, new in packages:
+                want = old if unit in trying else new
+                have = old if name in restored else new
+                if want is not None and want != have:
+                    # _restore_remedy pins the "old" side of a diff; here that
+                    # is whichever version this step wants.
+                    moves.append((name, want, have))
+        if not moves:
+            return None
+        remedy = _restore_remedy(env, {"changed": moves, "removed": [], "added": []}, "")
+        old = {name: o for packages in self.units.values() for name, o, _ in packages}
+        back = sorted(n for n, want, _ in moves if old[n] == want)
+        forward = sorted(n for n, want, _ in moves if old[n] != want)
+        torch = any("--index-url" in c for c in remedy.commands)
+        remedy.title = f"Bisect step {len(self.steps) + 1}: restore {', '.join(self.trying)}"
+        remedy.explain = (
+            (f"Puts back the versions from {when(self.reference)}: {', '.join(back)}. " if back else "")
+            + (f"Returns to today's versions: {', '.join(forward)}. " if forward else "")
+            + ("torch/torchvision/torchaudio go through the PyTorch index of their build. "
+               if torch else "")
+            + "Nothing is uninstalled."
+        )
+        remedy.danger = (
+            "This is one step of a search: it changes packages you may not want changed for "
+            "good. Finish the bisection (or run `comfydoctor bisect reset` and restore) "
+            "before relying on this environment."
+        )
+        return remedy
+
+    def mark_applied(self) -> None:
+        # A removed package, once back, stays back: nothing is uninstalled.
+        trying = set(self.trying or ())
+        self.restored = sorted(name for unit, packages in self.units.items()
+                               for name, _, new in packages
+                               if unit in trying or (new is None and name in self.restored))
+        self.applied = True
+
+    def observe(self, fixed: bool | None) -> None:
+        """Record whether the problem was gone after this step, and narrow.
+        None - the check couldn't tell - ends the search, inconclusive."""
+        trying = self.trying or []
+        self.steps.append({"restored": list(trying), "fixed": fixed})
+        if fixed is None:
+            self.status = "inconclusive"
+        elif fixed:
+            self.candidates = list(trying)
+            self.proven = list(trying)
+        elif trying == self.candidates:
+            self.status = "inconclusive"   # the last suspect alone didn't fix it
+        else:
+            self.candidates = [c for c in self.candidates if c not in trying]
+        self.trying, self.applied = None, False
+        if self.status == "running" and len(self.candidates) == 1 and self.proven == self.candidates:
+            self.status = "found"
+
+
+# --------------------------------------------------------------------------- #
+# Starting, checking, and the plan on disk
+# --------------------------------------------------------------------------- #
+
+def start(env: Environment, result, problem: str | None = None) -> Plan:
+    """A plan for one problem of a full scan's what-changed finding (its first
+    new problem by default). Raises ValueError when the scan has nothing to
+    bisect."""
+    from . import rules
+
+    wc = next((f for f in result.findings if f.id == WHAT_CHANGED), None)
+    if wc is None:
+        raise ValueError("the scan has no 'what changed' finding: no problem is new since a "
+                         "recorded working state, or no packages changed")
+    new_problems = wc.evidence.get("new_problems") or []
+    problem = problem or (new_problems[0] if new_problems else None)
+    if problem not in new_problems:
+        raise ValueError(f"'{problem}' is not one of the problems new since "
+                         f"{when(wc.evidence.get('reference'))}: {', '.join(new_problems)}")
+    finding = next((f for f in result.findings if f.id == problem), None)
+    try:
+        only = rules.groups_of(rules.select([finding.category]))
+    except (AttributeError, ValueError):
+        only = []
+    # No group to narrow to: every group, which is still a partial scan - the
+    # time machine never journals a bisection's in-between states.
+    return Plan.new(problem, wc.evidence["diff"], wc.evidence.get("reference"),
+                    only or rules.groups_of(rules.names()))
+
+
+def check(plan: Plan) -> bool | None:
+    """Scan the problem's rule groups. True when the problem is gone, False
+    when it is still there, None when the scan can't say: it failed (a probe
+    the rules read raised), or one of those rules crashed instead of judging."""
+    from . import rules
+    from .scan import scan
+
+    try:
+        judges = rules.select(plan.only)
+        result = scan(only=plan.only)
+    except Exception:
+        return None
+    failed = {f"internal.rule_failed.{name}" for name in judges}
+    if any(f.id in failed for f in result.findings):
+        return None
+    return all(f.id != plan.problem for f in result.findings)
+
+
+def plan_path(env: Environment) -> Path | None:
+    if not env.comfy_root:
+        return None
+    return Path(env.comfy_root) / "user" / "comfydoctor" / FILENAME
+
+
+def load(env: Environment) -> Plan | None:
+    """The plan in progress, or None. A file that can't be read is no plan."""
+    path = plan_path(env)
+    if path is None:
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return Plan.from_dict(json.load(f))
+    except Exception:
+        return None
+
+
+def save(env: Environment, plan: Plan) -> None:
+    path = plan_path(env)
+    if path is None:
+        raise ValueError("no ComfyUI folder found, so there is nowhere to keep the plan")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(plan.to_dict(), f, indent=1)
+    os.replace(tmp, str(path))
+
+
+def clear(env: Environment) -> bool:
+    path = plan_path(env)
+    try:
+        path.unlink()
+        return True
+    except (AttributeError, OSError):
+        return False
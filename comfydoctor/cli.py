@@ -16,9 +16,11 @@ from __future__ import annotations
 import argparse
 import os
 import sys
+from contextlib import closing
 
-from . import report, runner
+from . import profile, report, runner
 from .models import Severity
+from .rules import select as select_rules
 # Import the functions, not the module: the package __init__ re-exports `scan`
 # as a function, which shadows the submodule of the same name.
 from .scan import remedy_for
@@ -88,9 +90,16 @@ def _supports_color() -> bool:
 
 
 def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in _SUBCOMMANDS:
+        return _SUBCOMMANDS[argv[0]](argv[1:])
+
     p = argparse.ArgumentParser(
         prog="comfydoctor",
         description="Diagnose a ComfyUI Python environment. Works even when ComfyUI won't start.",
+        epilog="Also: `comfydoctor history [FINDING_ID]` - when a problem first appeared, "
+               "and what changed with it; `comfydoctor bisect` - which changed package did it; "
+               "`comfydoctor fleet ingest|drift` - many machines' journals in one store.",
     )
     p.add_argument("--json", action="store_true", help="emit the full ScanResult as JSON")
     p.add_argument("--markdown", "-m", action="store_true",
@@ -102,7 +111,23 @@ def main(argv: list[str] | None = None) -> int:
     p.add_argument("--fix", metavar="FINDING_ID",
                    help="run the fix for one finding (use the id shown in brackets)")
     p.add_argument("--yes", "-y", action="store_true", help="skip the confirmation prompt for --fix")
+    p.add_argument("--workers", type=int, default=0, metavar="N",
+                   help="read installed packages on N threads (helps on slow or network disks)")
+    p.add_argument("--only", metavar="GROUPS", action="append",
+                   help="check only these rule groups, comma-separated: a rule module "
+                        "(torch_stack, packages, node_health, attention, opportunities, system) "
+                        "or a report category; skips the probes they don't need")
+    p.add_argument("--profile", action="store_true",
+                   help="after the report, print where the scan's time went (to stderr)")
+    p.add_argument("--trace", metavar="PATH",
+                   help="write the scan's timing as a Chrome trace (chrome://tracing, ui.perfetto.dev)")
     args = p.parse_args(argv)
+    only = _split(args.only) if args.only else None
+    if only is not None:
+        try:
+            select_rules(only)
+        except ValueError as exc:
+            p.error(str(exc))
 
     _setup_encoding()
     color = _supports_color()
@@ -110,8 +135,23 @@ def main(argv: list[str] | None = None) -> int:
     if not args.json and not args.markdown:
         print("Examining your environment...", file=sys.stderr)
 
-    result = run_scan()
+    result = run_scan(workers=args.workers, only=only)
+    code = _emit(args, result, color)
+
+    if args.trace:
+        import json
+
+        with open(args.trace, "w", encoding="utf-8") as f:
+            json.dump(profile.chrome_trace(result.profile), f)
+        print(f"Wrote {args.trace}", file=sys.stderr)
+    if args.profile:
+        print("", file=sys.stderr)
+        for line in profile.format_table(result.profile):
+            print(("  " + line).rstrip(), file=sys.stderr)
+    return code
 
+
+def _emit(args, result, color: bool) -> int:
     if args.json:
         import json
 
@@ -241,7 +281,11 @@ def _do_fix(finding_id: str, assume_yes: bool) -> int:
         print(f"No runnable fix for '{finding_id}'.", file=sys.stderr)
         print("Run `python -m comfydoctor` and use an id from the [brackets].", file=sys.stderr)
         return 2
+    return _run_remedy(finding_id, remedy, assume_yes)
+
 
+def _run_remedy(finding_id: str, remedy, assume_yes: bool) -> int:
+    """Show a remedy, ask, run it and stream its output. 0 when it succeeded."""
     print()
     print(f"  {remedy.title}")
     print()
@@ -281,6 +325,284 @@ def _do_fix(finding_id: str, assume_yes: bool) -> int:
     return 0 if job.status == "success" else 1
 
 
+def _history(argv: list[str]) -> int:
+    """`comfydoctor history [FINDING_ID]`: the time machine's journal, read
+    back. Without an id, every problem on record; with one, its story."""
+    from . import timemachine
+    from .env import detect
+
+    p = argparse.ArgumentParser(
+        prog="comfydoctor history",
+        description="When each problem was first and last seen, from the scan journal.",
+    )
+    p.add_argument("finding_id", nargs="?", help="one finding id, as shown in [brackets]")
+    p.add_argument("--package", metavar="NAME[==VERSION]",
+                   help="a package's version changes instead; with ==VERSION, "
+                        "every stretch of history it was at that version")
+    p.add_argument("--json", action="store_true", help="emit JSON")
+    args = p.parse_args(argv)
+    _setup_encoding()
+
+    e = detect()
+    if timemachine.journal_path(e) is None:
+        print("No ComfyUI folder found, so there is no scan journal to read.", file=sys.stderr)
+        return 2
+    with closing(timemachine.load(e)) as journal:
+        return _show_history(e, journal, args)
+
+
+def _show_history(e, journal, args: argparse.Namespace) -> int:
+    from . import timemachine
+
+    when = timemachine.when
+    if args.package:
+        return _package_history(e, journal, args.package, args.json)
+
+    if args.finding_id is None:
+        rows = timemachine.problem_index(e, journal)
+        if args.json:
+            import json
+
+            print(json.dumps(rows, indent=1))
+            return 0
+        if not rows:
+            print("No problems on record.")
+            return 0
+        for r in rows:
+            state = "present" if r["present"] else "gone"
+            print(f"  {r['id']:<48}  {state:<8}  first {when(r['first_seen'])}, "
+                  f"last {when(r['last_seen'])}")
+        return 0
+
+    story = timemachine.history(e, args.finding_id, journal)
+    if args.json:
+        import json
+
+        print(json.dumps(story, indent=1))
+        return 0 if story else 1
+    if story is None:
+        print(f"'{args.finding_id}' is not in the scan journal: no scan on record has had it.")
+        return 1
+
+    print()
+    print(f"  {story['id']}  ({'still present' if story['present'] else 'gone'})")
+    print(f"    first seen    {when(story['first_seen'])}")
+    print(f"    last seen     {when(story['last_seen'])}")
+    if story["last_absent"]:
+        print(f"    last without  {when(story['last_absent'])}")
+    print(f"    on record in  {story['scans_with']} of the {story['scans']} scans kept "
+          f"(since {when(story['oldest'])})")
+    for key, label in (("appeared", "Appeared"), ("resolved", "Went away")):
+        if key in story:
+            lines = timemachine.diff_lines(story[key]["diff"])
+            print()
+            print(f"  {label} {when(story[key]['ts'])}, "
+                  + ("with these package changes:" if lines else "with no package changes."))
+            for line in lines:
+                print("  " + line)
+    print()
+    return 0
+
+
+def _package_history(e, journal, spec: str, as_json: bool) -> int:
+    from . import timemachine
+
+    when = timemachine.when
+    name, _, version = (part.strip() for part in spec.partition("=="))
+    if version:
+        rows = timemachine.states_with(e, name, version, journal)
+    else:
+        rows = timemachine.package_history(e, name, journal)
+    if as_json:
+        import json
+
+        print(json.dumps(rows, indent=1))
+        return 0
+    if version:
+        if not rows:
+            print(f"No scan on record had {name}=={version}.")
+        for r in rows:
+            until = when(r["until"]) if r["until"] else "now"
+            print(f"  {name}=={version}  from {when(r['since'])} until {until}")
+        return 0
+    if not rows:
+        print("The scan journal is empty.")
+    for i, r in enumerate(rows):
+        state = r["version"] or "not installed"
+        print(f"  {when(r['ts'])}  {name} {state}" + ("  (oldest scan kept)" if i == 0 else ""))
+    return 0
+
+
+def _fleet(argv: list[str]) -> int:
+    """`comfydoctor fleet ingest|drift`: many machines' journals in one store."""
+    from pathlib import Path
+
+    from . import fleet
+
+    p = argparse.ArgumentParser(
+        prog="comfydoctor fleet",
+        description="Merge scan journals from many ComfyUI installs and compare them.",
+    )
+    p.add_argument("--store", type=Path, default=Path(fleet.STORE), metavar="PATH",
+                   help=f"the fleet database (default: ./{fleet.STORE})")
+    sub = p.add_subparsers(dest="command", required=True)
+    ing = sub.add_parser("ingest", help="read journals or --json exports into the store")
+    ing.add_argument("sources", nargs="+", type=Path, metavar="SOURCE",
+                     help="a journal, a `comfydoctor --json` export, or a folder holding them")
+    ing.add_argument("--machine", help="the machine name, for a single SOURCE")
+    dr = sub.add_parser("drift", help="machines that differ from the majority")
+    dr.add_argument("packages", nargs="*", default=list(fleet.DRIFT_PACKAGES), metavar="PACKAGE",
+                    help=f"packages to compare (default: {' '.join(fleet.DRIFT_PACKAGES)})")
+    dr.add_argument("--json", action="store_true", help="emit JSON")
+    args = p.parse_args(argv)
+    _setup_encoding()
+    if args.command == "ingest" and args.machine and len(args.sources) > 1:
+        p.error("--machine names the machine of a single SOURCE")
+
+    db = fleet.open_store(args.store)
+    try:
+        if args.command == "ingest":
+            failed = 0
+            for machine, source in fleet.sources(args.sources, args.machine):
+                r = fleet.ingest(db, machine, source)
+                if "error" in r:
+                    failed += 1
+                    print(f"  {machine:<32}  skipped: {r['error']}  ({source})", file=sys.stderr)
+                else:
+                    print(f"  {machine:<32}  {r['snapshots']} new snapshots, "
+                          f"{r['sets']} new package sets")
+            return 1 if failed else 0
+
+        rows = fleet.drift(db, args.packages)
+        if args.json:
+            import json
+
+            print(json.dumps(rows, indent=1))
+            return 0
+        for r in rows:
+            majority = r["majority"] or "not installed"
+            print(f"  {r['package']}: {majority} on {r['with_majority']} of {r['machines']} machines")
+            for machine, version in r["differ"].items():
+                print(f"      {machine:<32}  {version or 'not installed'}")
+        return 0
+    finally:
+        db.close()
+
+
+def _bisect(argv: list[str]) -> int:
+    """`comfydoctor bisect start|step|status|reset`: which changed package
+    brought a problem in, by restoring halves of the change."""
+    from . import bisect
+    from .env import detect
+
+    p = argparse.ArgumentParser(
+        prog="comfydoctor bisect",
+        description="Find which of the packages changed since a working scan brought a "
+                    "problem in, by restoring half of them at a time.",
+    )
+    sub = p.add_subparsers(dest="command", required=True)
+    st = sub.add_parser("start", help="plan a bisection from a full scan")
+    st.add_argument("finding_id", nargs="?",
+                    help="the problem to chase (default: the first new one)")
+    step = sub.add_parser("step", help="apply the next step, re-check, and narrow down")
+    step.add_argument("--yes", "-y", action="store_true", help="skip the confirmation prompt")
+    status = sub.add_parser("status", help="show the plan in progress")
+    status.add_argument("--json", action="store_true", help="emit JSON")
+    sub.add_parser("reset", help="forget the plan (installed packages stay as they are)")
+    args = p.parse_args(argv)
+    _setup_encoding()
+
+    e = detect()
+    if bisect.plan_path(e) is None:
+        print("No ComfyUI folder found, so there is nowhere to keep a bisection.", file=sys.stderr)
+        return 2
+
+    if args.command == "reset":
+        print("  Bisection forgotten." if bisect.clear(e) else "  No bisection in progress.")
+        return 0
+
+    if args.command == "start":
+        current = bisect.load(e)
+        if current is not None and current.status == "running":
+            print("A bisection is already in progress: `comfydoctor bisect step` continues it, "
+                  "`comfydoctor bisect reset` forgets it.", file=sys.stderr)
+            return 2
+        try:
+            plan = bisect.start(e, run_scan(), args.finding_id)
+        except ValueError as exc:
+            print(f"  Nothing to bisect: {exc}.", file=sys.stderr)
+            return 1
+        plan.next()
+        bisect.save(e, plan)
+        _bisect_status(plan)
+        return 0
+
+    plan = bisect.load(e)
+    if plan is None:
+        print("No bisection in progress: `comfydoctor bisect start` plans one.", file=sys.stderr)
+        return 1
+    if args.command == "status":
+        if args.json:
+            import json
+
+            print(json.dumps(plan.to_dict(), indent=1))
+        else:
+            _bisect_status(plan)
+        return 0
+
+    if plan.status != "running":
+        _bisect_status(plan)
+        return 0
+    if not plan.applied:
+        remedy = plan.remedy(e)
+        if remedy is not None and _run_remedy(plan.problem, remedy, args.yes) != 0:
+            bisect.save(e, plan)
+            return 1
+        plan.mark_applied()
+        bisect.save(e, plan)
+    print(f"\n  Checking {plan.problem} ({', '.join(plan.only)})...")
+    fixed = bisect.check(plan)
+    print(f"  {_BISECT_OUTCOME[fixed]} with {', '.join(plan.trying)} restored.")
+    plan.observe(fixed)
+    plan.next()
+    bisect.save(e, plan)
+    _bisect_status(plan)
+    return 0
+
+
+_BISECT_OUTCOME = {True: "Gone", False: "Still there", None: "Could not check"}
+
+
+def _bisect_status(plan) -> None:
+    print()
+    print(f"  Bisecting {plan.problem}: {len(plan.steps)} step(s) done")
+    for i, s in enumerate(plan.steps, 1):
+        print(f"    {i}. restored {', '.join(s['restored'])}: {_BISECT_OUTCOME[s['fixed']].lower()}")
+    if plan.status == "found":
+        packages = [f"{n} {old}" for u in plan.culprit for n, old, _ in plan.units[u]]
+        print(f"\n  Found it: restoring {', '.join(packages)} alone makes the problem go away.")
+        print("  That is installed now; everything else that changed is at today's version.")
+    elif plan.status == "inconclusive" and plan.steps and plan.steps[-1]["fixed"] is None:
+        print("\n  Inconclusive: the last check could not run (a probe failed, or one of the")
+        print(f"  checks for {plan.problem} crashed), so it can't say whether the problem went away.")
+        print("  The full restore in the 'what changed' finding puts everything back at once.")
+    elif plan.status == "inconclusive":
+        print("\n  Inconclusive: no single package (or the torch family) brings it back on its own.")
+        print("  Several changes may act together, or the cause is not a package. The full")
+        print("  restore in the 'what changed' finding puts everything back at once.")
+    else:
+        print(f"\n  {len(plan.candidates)} suspects left, at most {plan.steps_left()} more step(s). "
+              f"Next: restore {', '.join(plan.trying)} - `comfydoctor bisect step`.")
+    print()
+
+
+_SUBCOMMANDS = {"history": _history, "fleet": _fleet, "bisect": _bisect}
+
+
+def _split(values: list[str]) -> list[str]:
+    return [v.strip() for value in values for v in value.split(",") if v.strip()]
+
+
 def _exit_code(result) -> int:
     """0 = clean, 1 = warnings, 2 = errors/critical. Lets people gate a launch
     script on it: `python -m comfydoctor -q || echo "fix your env first"`."""
@@ -19,10 +19,7 @@ import sys
 from dataclasses import dataclass, field
 from pathlib import Path
 
-from .inventory import HAVE_PACKAGING, Inventory, canonicalize_name
-
-if HAVE_PACKAGING:
-    from packaging.requirements import InvalidRequirement, Requirement
+from .inventory import HAVE_PACKAGING, Inventory, RequirementCache, canonicalize_name
 
 # Lines in a requirements.txt we cannot meaningfully evaluate.
 _SKIP_PREFIX = ("-", "--", "#", "git+", "http://", "https://", ".", "/")
@@ -62,14 +59,12 @@ class NodeSurvey:
         }
 
 
-def survey(custom_nodes_dir: Path | None) -> NodeSurvey:
+def survey(custom_nodes_dir: Path | None, reqs: RequirementCache | None = None) -> NodeSurvey:
+    """Walk custom_nodes. `reqs` is the scan's shared requirement cache."""
     s = NodeSurvey()
     if not custom_nodes_dir or not custom_nodes_dir.is_dir():
         return s
 
-    loaded = _loaded_node_dirs()
-    s.runtime_known = loaded is not None
-
     for entry in sorted(custom_nodes_dir.iterdir()):
         if not entry.is_dir() or entry.name.startswith((".", "__")):
             continue
@@ -81,17 +76,29 @@ def survey(custom_nodes_dir: Path | None) -> NodeSurvey:
         if req_file.is_file():
             node.requirements = _read_requirements(req_file)
 
-        if disabled:
-            node.loaded = False
-        elif loaded is not None:
-            node.loaded = entry.name in loaded
-
         s.nodes.append(node)
 
-    s.demands = _build_demands(s.nodes)
+    refresh_loaded(s)
+    s.demands = _build_demands(s.nodes, reqs if reqs is not None else RequirementCache())
     return s
 
 
+def refresh_loaded(s: NodeSurvey) -> None:
+    """(Re)decide which nodes ComfyUI actually imported.
+
+    The only part of a survey that can change without anything changing on
+    disk, so a survey kept between scans gets just this redone."""
+    loaded = _loaded_node_dirs()
+    s.runtime_known = loaded is not None
+    for node in s.nodes:
+        if node.disabled:
+            node.loaded = False
+        elif loaded is not None:
+            node.loaded = node.name in loaded
+        else:
+            node.loaded = None
+
+
 def _read_requirements(path: Path) -> list[str]:
     out: list[str] = []
     try:
@@ -106,7 +113,7 @@ def _read_requirements(path: Path) -> list[str]:
     return out
 
 
-def _build_demands(nodes: list[CustomNode]) -> dict[str, list[tuple[str, str]]]:
+def _build_demands(nodes: list[CustomNode], reqs: RequirementCache) -> dict[str, list[tuple[str, str]]]:
     if not HAVE_PACKAGING:
         return {}
     demands: dict[str, list[tuple[str, str]]] = {}
@@ -114,18 +121,11 @@ def _build_demands(nodes: list[CustomNode]) -> dict[str, list[tuple[str, str]]]:
         if node.disabled:
             continue
         for raw in node.requirements:
-            try:
-                req = Requirement(raw)
-            except InvalidRequirement:
+            pr = reqs.get(raw)
+            # A marker we cannot evaluate counts: better a demand too many.
+            if pr is None or pr.applies is False:
                 continue
-            if req.marker is not None:
-                try:
-                    if not req.marker.evaluate():
-                        continue
-                except Exception:
-                    pass
-            key = canonicalize_name(req.name)
-            demands.setdefault(key, []).append((node.name, str(req.specifier)))
+            demands.setdefault(pr.target, []).append((node.name, pr.specifier))
     return demands
 
 
@@ -169,20 +169,14 @@ def unsatisfied_demands(sv: NodeSurvey, inv: Inventory) -> list[dict]:
         if node.disabled:
             continue
         for raw in node.requirements:
-            try:
-                req = Requirement(raw)
-            except InvalidRequirement:
+            pr = inv.requirements.get(raw)
+            if pr is None or pr.applies is False:
                 continue
-            if req.marker is not None:
-                try:
-                    if not req.marker.evaluate():
-                        continue
-                except Exception:
-                    pass
-            dist = inv.get(req.name)
+            req = pr.req
+            dist = inv.dists.get(pr.target)
             if dist is None:
                 out.append({
-                    "node": node.name, "package": canonicalize_name(req.name),
+                    "node": node.name, "package": pr.target,
                     "requirement": raw, "installed": None,
                     "reason": f"{req.name} is not installed at all",
                 })
@@ -191,7 +185,7 @@ def unsatisfied_demands(sv: NodeSurvey, inv: Inventory) -> list[dict]:
                 continue
             from .inventory import satisfies
 
-            ok = satisfies(dist.version, str(req.specifier))
+            ok = satisfies(dist.version, pr.specifier)
             if ok is False:
                 out.append({
                     "node": node.name, "package": dist.name,
@@ -219,7 +213,8 @@ def conflicting_demands(sv: NodeSurvey, inv: Inventory | None = None) -> list[di
     if not HAVE_PACKAGING:
         return []
     from packaging.specifiers import SpecifierSet
-    from packaging.version import InvalidVersion, Version
+
+    from .inventory import parse_version, specifier_set
 
     out: list[dict] = []
     for pkg, claims in sv.demands.items():
@@ -230,11 +225,11 @@ def conflicting_demands(sv: NodeSurvey, inv: Inventory | None = None) -> list[di
         combined = SpecifierSet()
         ok = True
         for _, spec in pinned:
-            try:
-                combined &= SpecifierSet(spec)
-            except Exception:
+            one = specifier_set(spec)
+            if one is None:
                 ok = False
                 break
+            combined &= one
         if not ok:
             continue
 
@@ -242,12 +237,9 @@ def conflicting_demands(sv: NodeSurvey, inv: Inventory | None = None) -> list[di
         # satisfies every claim, there is by definition no conflict. ftfy==6.1.1
         # and ftfy>=6.1.1 are both happy with 6.1.1.
         installed = inv.version(pkg) if inv else None
-        if installed:
-            try:
-                if combined.contains(Version(installed.split("+")[0]), prereleases=True):
-                    continue
-            except InvalidVersion:
-                pass
+        v = parse_version(installed) if installed else None
+        if v is not None and combined.contains(v, prereleases=True):
+            continue
 
         if _satisfiable(combined, pinned):
             continue
@@ -271,7 +263,7 @@ def _satisfiable(combined, pinned: list[tuple[str, str]]) -> bool:
     """
     import re as _re
 
-    from packaging.version import InvalidVersion, Version
+    from .inventory import parse_version
 
     literals: set[str] = set()
     for _, spec in pinned:
@@ -295,11 +287,9 @@ def _satisfiable(combined, pinned: list[tuple[str, str]]) -> bool:
     candidates.add("0.0.0")
 
     for c in candidates:
-        try:
-            if combined.contains(Version(c), prereleases=True):
-                return True
-        except InvalidVersion:
-            continue
+        v = parse_version(c)
+        if v is not None and combined.contains(v, prereleases=True):
+            return True
     return False
 
 
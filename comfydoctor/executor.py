@@ -0,0 +1,126 @@
+"""ComfyDoctor's own threads inside ComfyUI.
+
+The API handlers used to hand scans to the event loop's default executor -
+the same pool ComfyUI and every other extension use. A cold scan holds a
+thread for seconds; a busy pool made the panel wait behind somebody else's
+work. This is a small pool of our own:
+
+  - a fixed number of named worker threads ("comfydoctor-0", ...),
+  - a bounded queue: past QUEUE_DEPTH waiting jobs, submit() raises Busy
+    rather than piling up work nobody will wait for,
+  - priorities: an interactive request (the panel, a report download) is
+    started before any background refresh that is still queued. A job that
+    is already running is never interrupted.
+
+How long each job sat in the queue goes into the scan's profile as a "queue
+wait" span (see profile.queued).
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from . import profile
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+WORKERS = 2
+QUEUE_DEPTH = 16
+
+
+class Busy(RuntimeError):
+    """The queue is full; try again shortly."""
+
+
+class PriorityExecutor:
+    """A bounded thread pool that starts the lowest `priority` first (FIFO
+    within a priority). Workers start on first use."""
+
+    def __init__(self, workers: int = WORKERS, max_queue: int = QUEUE_DEPTH,
+                 name: str = "comfydoctor"):
+        self.name = name
+        self._workers = workers
+        self._max_queue = max_queue
+        self._cond = threading.Condition()
+        self._heap: list[tuple[int, int, float, Future, Callable[[], Any]]] = []
+        self._seq = itertools.count()
+        self._threads: list[threading.Thread] = []
+        self._running = 0
+        self._done = 0
+        self._rejected = 0
+        self._waits: list[float] = []      # seconds, the last 100 jobs
+
+    def submit(self, fn: Callable[..., Any], *args: Any, priority: int = INTERACTIVE,
+               **kwargs: Any) -> Future:
+        fut: Future = Future()
+        with self._cond:
+            if len(self._heap) >= self._max_queue:
+                self._rejected += 1
+                raise Busy(f"{self.name}: {len(self._heap)} jobs already queued")
+            heapq.heappush(self._heap, (priority, next(self._seq), time.perf_counter(), fut,
+                                        lambda: fn(*args, **kwargs)))
+            idle = len(self._threads) - self._running
+            if len(self._threads) < self._workers and idle < len(self._heap):
+                t = threading.Thread(target=self._work, daemon=True,
+                                     name=f"{self.name}-{len(self._threads)}")
+                self._threads.append(t)
+                t.start()
+            self._cond.notify()
+        return fut
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            waits = list(self._waits)
+            return {
+                "workers": len(self._threads),
+                "max_workers": self._workers,
+                "queued": len(self._heap),
+                "running": self._running,
+                "done": self._done,
+                "rejected": self._rejected,
+                "wait_ms_last": round(waits[-1] * 1000, 1) if waits else None,
+                "wait_ms_max": round(max(waits) * 1000, 1) if waits else None,
+            }
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _prio, _seq, queued_at, fut, job = heapq.heappop(self._heap)
+                self._running += 1
+            started = time.perf_counter()
+            with self._cond:
+                self._waits = [*self._waits[-99:], started - queued_at]
+            try:
+                if fut.set_running_or_notify_cancel():
+                    try:
+                        with profile.queued(queued_at, started, self.name):
+                            result = job()
+                    except BaseException as exc:
+                        fut.set_exception(exc)
+                    else:
+                        fut.set_result(result)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._done += 1
+
+
+_DEFAULT: PriorityExecutor | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default() -> PriorityExecutor:
+    """The pool the API runs its work on."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = PriorityExecutor()
+        return _DEFAULT
@@ -0,0 +1,237 @@
+"""Many ComfyUI installs' history in one place: `comfydoctor fleet`.
+
+    comfydoctor fleet ingest SOURCE... [--store PATH] [--machine NAME]
+    comfydoctor fleet drift [PACKAGE...] [--store PATH] [--json]
+
+`ingest` reads each machine's time machine journal (any of its formats,
+file or SQLite) or a `comfydoctor --json` export, and merges the snapshots
+into one local SQLite store. A SOURCE that is a directory is searched for
+both; the machine is named after its ComfyUI folder's path relative to that
+directory (an export: its file name without .json), or after the folder
+itself. --machine names the machine of a single source.
+
+  package_sets  (hash, size)                  one row per distinct package set
+  set_versions  (hash, name, version)         ...and its contents, once
+  snapshots     (machine, ts, hash, problems) one row per scan per machine
+  machines      (name, source, ingested)
+
+A package set is stored once, under the SHA-256 of its sorted contents: a
+fleet built from one image, scanned hourly, is a handful of sets however many
+snapshots point at them. Snapshots are keyed (machine, ts), so ingesting the
+same journal again adds only the scans it didn't have.
+
+Sources are read one machine at a time and their snapshots streamed into the
+store, one transaction per machine; nothing holds the whole fleet in memory.
+Sources are never written to: an SQLite journal is opened read-only, and one
+that can't be opened is reported like any other unreadable source.
+
+`drift` answers "which machines differ from the majority on torch, xformers
+and numpy?" from each machine's newest snapshot, in one query.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from collections import Counter
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+from .inventory import canonicalize_name
+from .journal import FILENAME, LEGACY, PLAIN, Journal
+from .journal_sqlite import SQLITE_NAME, SqliteJournal
+
+STORE = "comfydoctor_fleet.sqlite3"
+DRIFT_PACKAGES = ("torch", "xformers", "numpy")
+_JOURNALS = (FILENAME, PLAIN, LEGACY, SQLITE_NAME)
+_EVERYTHING = 1 << 62   # retention when reading someone else's journal: none
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS package_sets (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS set_versions (
+    hash    TEXT NOT NULL,
+    name    TEXT NOT NULL,
+    version TEXT NOT NULL,
+    PRIMARY KEY (hash, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS set_versions_name ON set_versions (name, version);
+CREATE TABLE IF NOT EXISTS snapshots (
+    machine  TEXT NOT NULL,
+    ts       TEXT NOT NULL,
+    hash     TEXT NOT NULL,
+    problems TEXT NOT NULL,
+    PRIMARY KEY (machine, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS snapshots_hash ON snapshots (hash);
+CREATE TABLE IF NOT EXISTS machines (
+    name     TEXT PRIMARY KEY,
+    source   TEXT NOT NULL,
+    ingested TEXT NOT NULL
+);
+"""
+
+
+def open_store(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(str(path))
+    try:
+        db.executescript(_SCHEMA)
+    except BaseException:
+        db.close()
+        raise
+    return db
+
+
+def set_hash(packages: dict[str, str]) -> str:
+    """The content hash a package set is stored under."""
+    blob = json.dumps(sorted(packages.items()), separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# --------------------------------------------------------------------------- #
+# Ingest
+# --------------------------------------------------------------------------- #
+
+def sources(paths: list[Path], machine: str | None = None) -> Iterator[tuple[str, Path]]:
+    """(machine name, journal or export file) for every machine under `paths`."""
+    for path in paths:
+        if path.is_dir():
+            found = _find(path)
+        else:
+            found = [path]
+        for f in found:
+            yield machine or _machine_name(f, path if path.is_dir() else None), f
+
+
+def ingest(db: sqlite3.Connection, machine: str, source: Path) -> dict:
+    """Stream one machine's snapshots into the store. Returns what it added;
+    a source that can't be read adds nothing ({"error": ...})."""
+    added = {"machine": machine, "source": str(source), "snapshots": 0, "sets": 0}
+    try:
+        with db:
+            for ts, packages, problems in _snapshots(source):
+                h = set_hash(packages)
+                if db.execute("INSERT OR IGNORE INTO package_sets (hash, size) VALUES (?, ?)",
+                              (h, len(packages))).rowcount:
+                    db.executemany("INSERT INTO set_versions (hash, name, version) VALUES (?, ?, ?)",
+                                   [(h, n, v) for n, v in packages.items()])
+                    added["sets"] += 1
+                added["snapshots"] += db.execute(
+                    "INSERT OR IGNORE INTO snapshots (machine, ts, hash, problems) VALUES (?, ?, ?, ?)",
+                    (machine, ts or "", h, json.dumps(sorted(problems)))).rowcount
+            db.execute("INSERT OR REPLACE INTO machines (name, source, ingested) VALUES (?, ?, ?)",
+                       (machine, str(source),
+                        datetime.now(timezone.utc).isoformat(timespec="seconds")))
+    except Exception as exc:
+        added["error"] = f"{type(exc).__name__}: {exc}"
+    return added
+
+
+def _find(root: Path) -> list[Path]:
+    """The journals and exports under `root`, one source per machine: a
+    journal folder holding several formats (a migration in progress) is read
+    once, through the file journal, which reads them all."""
+    out: list[Path] = []
+    folders: set[Path] = set()
+    for f in sorted(root.rglob("*")):
+        if f.name in _JOURNALS:
+            if f.parent not in folders:
+                folders.add(f.parent)
+                has_file = any((f.parent / n).exists() for n in (FILENAME, PLAIN, LEGACY))
+                out.append(f.parent / (FILENAME if has_file else SQLITE_NAME))
+        elif f.suffix == ".json" and f.is_file() and _export(f) is not None:
+            out.append(f)
+    return out
+
+
+def _machine_name(source: Path, base: Path | None) -> str:
+    if source.name in _JOURNALS:
+        folder = source.parent
+        root = folder.parent.parent if (folder.name, folder.parent.name) == ("comfydoctor", "user") \
+            else folder
+    else:
+        root = source.with_suffix("")
+    if base is not None:
+        try:
+            rel = root.relative_to(base)
+        except ValueError:
+            rel = None
+        if rel is not None and rel.parts:
+            return rel.as_posix()
+    return root.resolve().name
+
+
+def _snapshots(source: Path) -> Iterator[tuple[str | None, dict[str, str], list[str]]]:
+    """(ts, packages, problems), oldest first, one at a time."""
+    if source.name == SQLITE_NAME:
+        # Read-only: another machine's journal is evidence, not ours to migrate.
+        with closing(SqliteJournal.open_readonly(source)) as j:
+            count, _ = j.span()
+            newest = j.newest()
+            for seq in range(newest - count + 1, newest + 1) if count else ():
+                snap = j.snapshot_at(seq)
+                yield snap["ts"], snap["packages"], snap["problems"]
+    elif source.name in _JOURNALS:
+        j = Journal.load(source.with_name(FILENAME), _EVERYTHING)
+        if not j.entries:
+            raise ValueError("no readable journal")
+        for i, e in enumerate(j.entries):
+            yield e.ts, j.packages(i), list(e.problems)
+    else:
+        export = _export(source)
+        if export is None:
+            raise ValueError("not a comfydoctor --json export")
+        yield export
+
+
+def _export(path: Path) -> tuple[str | None, dict[str, str], list[str]] | None:
+    """A `comfydoctor --json` ScanResult as one snapshot, or None if the file
+    isn't one (or its scan didn't read the packages)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        pkgs = data["snapshot"]["packages"]["packages"]
+        packages = {canonicalize_name(n): d["version"] for n, d in pkgs.items()}
+        problems = [f["id"] for f in data["findings"] if f.get("severity") in ("critical", "error")]
+        return data.get("scanned_at"), packages, problems
+    except Exception:
+        return None
+
+
+# --------------------------------------------------------------------------- #
+# Drift
+# --------------------------------------------------------------------------- #
+
+def drift(db: sqlite3.Connection, packages: tuple[str, ...] | list[str] = DRIFT_PACKAGES) -> list[dict]:
+    """For each package: the version most machines have (by their newest
+    snapshot), and every machine that has something else - None when it
+    isn't installed there."""
+    names = [canonicalize_name(p) for p in packages]
+    marks = ",".join("?" * len(names))
+    versions: dict[str, dict[str, str]] = {n: {} for n in names}
+    machines: set[str] = set()
+    for machine, name, version in db.execute(
+            "SELECT s.machine, v.name, v.version FROM snapshots s "
+            "JOIN (SELECT machine, MAX(ts) AS ts FROM snapshots GROUP BY machine) newest "
+            "ON newest.machine = s.machine AND newest.ts = s.ts "
+            f"LEFT JOIN set_versions v ON v.hash = s.hash AND v.name IN ({marks})", names):
+        machines.add(machine)
+        if name is not None:
+            versions[name][machine] = version
+    out = []
+    for name in names:
+        have = {m: versions[name].get(m) for m in sorted(machines)}
+        counts = Counter(have.values())
+        # A tie goes to an installed version over none, then to the one that sorts last.
+        majority, n = max(counts.items(), key=lambda kv: (kv[1], kv[0] is not None, kv[0] or "")) \
+            if counts else (None, 0)
+        out.append({"package": name, "majority": majority, "with_majority": n,
+                    "machines": len(have),
+                    "differ": {m: v for m, v in have.items() if v != majority}})
+    return out
@@ -20,6 +20,8 @@ import subprocess
 import sys
 from dataclasses import dataclass, field
 
+from . import profile
+
 # Minimum NVIDIA driver for each CUDA runtime.
 #
 # KEY FACT (this table used to get it wrong and false-flag working setups):
@@ -101,10 +103,11 @@ def _probe_nvidia_smi(info: GPUInfo) -> None:
         return
     try:
         q = "name,driver_version,memory.total,memory.used,compute_cap"
-        r = subprocess.run(
-            [exe, f"--query-gpu={q}", "--format=csv,noheader,nounits"],
-            capture_output=True, text=True, timeout=15,
-        )
+        with profile.span("nvidia-smi --query-gpu", cat="subprocess"):
+            r = subprocess.run(
+                [exe, f"--query-gpu={q}", "--format=csv,noheader,nounits"],
+                capture_output=True, text=True, timeout=15,
+            )
         if r.returncode != 0:
             info.smi_error = (r.stderr or r.stdout or "nvidia-smi failed").strip()[:300]
             return
@@ -126,7 +129,8 @@ def _probe_nvidia_smi(info: GPUInfo) -> None:
         # The "CUDA Version: 12.8" in the smi header is the max runtime the
         # driver can load - not what is installed. It is exactly the ceiling we
         # need to check a torch cu-tag against.
-        r2 = subprocess.run([exe], capture_output=True, text=True, timeout=15)
+        with profile.span("nvidia-smi", cat="subprocess"):
+            r2 = subprocess.run([exe], capture_output=True, text=True, timeout=15)
         m = re.search(r"CUDA Version:\s*([0-9.]+)", r2.stdout or "")
         if m:
             info.driver_cuda_version = m.group(1)
@@ -241,10 +245,11 @@ def _run_probe_inline() -> dict | None:
 
 def _run_probe_subprocess() -> dict | None:
     try:
-        r = subprocess.run(
-            [sys.executable, "-c", _TORCH_PROBE],
-            capture_output=True, text=True, timeout=120,
-        )
+        with profile.span("torch probe", cat="subprocess"):
+            r = subprocess.run(
+                [sys.executable, "-c", _TORCH_PROBE],
+                capture_output=True, text=True, timeout=120,
+            )
         for line in (r.stdout or "").splitlines():
             if line.startswith("<<<COMFYDOCTOR>>>"):
                 return json.loads(line[len("<<<COMFYDOCTOR>>>"):])
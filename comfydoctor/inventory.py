@@ -14,13 +14,22 @@ maps them to import names rather than guessing that they are the same string.
 
 from __future__ import annotations
 
+import csv
+import json
+import os
 import re
 import sys
+import tempfile
+import threading
 from collections import defaultdict
-from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from functools import lru_cache, partial
 from importlib import metadata as md
-from pathlib import Path
-from typing import Iterable
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from . import profile
 
 try:  # packaging ships with pip and with torch; near-certain to be present.
     from packaging.markers import UndefinedEnvironmentName
@@ -36,14 +45,73 @@ except Exception:  # pragma: no cover - degraded mode
         return re.sub(r"[-_.]+", "-", n).lower()
 
 
+class _Lazy:
+    """A dataclass field computed on first read instead of up front.
+
+    None means "not known yet": the first read calls the owner's `fill` method,
+    which must set the field. Assigning a value (the constructor does, when
+    the caller already has it) makes the field plain data. The value lives in
+    `_<name>`, an instance attribute or a slot (see `_slotted`).
+    """
+
+    def __init__(self, fill: str):
+        self.fill = fill
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.attr = "_" + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return None  # the dataclass default: not known yet
+        value = getattr(obj, self.attr, None)
+        if value is None:
+            getattr(obj, self.fill)()
+            value = getattr(obj, self.attr)
+        return value
+
+    def __set__(self, obj, value) -> None:
+        setattr(obj, self.attr, value)
+
+
+def _slotted(cls):
+    """`@dataclass(slots=True)`, which needs Python 3.10, for 3.9 as well.
+
+    Rebuilds the class with __slots__ - one per field, `_<name>` for a _Lazy
+    one - and without the per-instance __dict__. The generated __init__ keeps
+    its defaults in its own closure, so the class attributes can go.
+    """
+    names = [f.name for f in fields(cls)]
+    slots = tuple(("_" + n) if isinstance(cls.__dict__.get(n), _Lazy) else n for n in names)
+    ns = {k: v for k, v in cls.__dict__.items()
+          if k not in ("__dict__", "__weakref__") and (k not in names or isinstance(v, _Lazy))}
+    ns["__slots__"] = slots
+    new = type(cls)(cls.__name__, cls.__bases__, ns)
+    new.__qualname__ = cls.__qualname__
+    return new
+
+
+def _interned(strings: Iterable[str]) -> tuple[str, ...]:
+    return tuple(sys.intern(s) for s in strings)
+
+
+# A ComfyUI server keeps the last scan's inventory for as long as it runs, and a
+# big install has 600+ of these - times every shadowed copy. So Dist is slotted,
+# its sequences are tuples, and build() interns every name, location and
+# requirement string: a thousand dists in the same site dir share one location
+# string, and "numpy" is stored once however many dists require it.
+@_slotted
 @dataclass
 class Dist:
     name: str                    # canonical, e.g. "opencv-python-headless"
     raw_name: str                # as declared
     version: str                 # e.g. "2.6.0+cu124"
     location: str | None         # the site dir it lives in
-    requires: list[str] = field(default_factory=list)
-    modules: list[str] = field(default_factory=list)  # top-level import names it provides
+    requires: tuple[str, ...] = ()
+    # Both module fields come from RECORD, the biggest file in a dist-info, and
+    # only the module-ownership rules want them. So they are read on first
+    # access (one RECORD pass fills both) and scans that never ask never open
+    # RECORD at all.
+    modules: tuple[str, ...] = _Lazy("_read_record")  # top-level import names it provides
     # Modules for which this dist ships an actual `<mod>/__init__.py`, i.e. it
     # OWNS the package rather than merely contributing to a namespace.
     #
@@ -56,7 +124,24 @@ class Dist:
     #
     # Without this test, the tool screams about google, opentelemetry, nvidia,
     # jaraco, ruamel and pyannote on every healthy machine on earth.
-    owned_modules: list[str] = field(default_factory=list)
+    owned_modules: tuple[str, ...] = _Lazy("_read_record")
+    # The reader's own RECORD pass, returning (modules, owned_modules); dropped
+    # once it has been called. It holds the dist-info's path and nothing else.
+    record: Callable[[], tuple[list, list]] | None = field(
+        default=None, repr=False, compare=False)
+
+    def _read_record(self) -> None:
+        modules: tuple[str, ...] = ()
+        owned: tuple[str, ...] = ()
+        if self.record is not None:
+            try:
+                modules, owned = (_interned(m) for m in self.record())
+            except Exception:
+                pass  # an unreadable RECORD provides nothing, as before
+            self.record = None
+        for attr, value in (("_modules", modules), ("_owned_modules", owned)):
+            if getattr(self, attr, None) is None:
+                setattr(self, attr, value)
 
     @property
     def base_version(self) -> str:
@@ -69,26 +154,51 @@ class Dist:
         torch build from a CPU one without importing torch."""
         return self.version.split("+", 1)[1] if "+" in self.version else None
 
-    def to_dict(self) -> dict:
-        return {
+    def to_dict(self, modules: bool = True) -> dict:
+        """`modules=False` leaves out the two RECORD-backed fields, so that
+        serializing never reads RECORD."""
+        out = {
             "name": self.name,
             "version": self.version,
             "location": self.location,
             "local_tag": self.local_tag,
-            "modules": self.modules,
-            "owned_modules": self.owned_modules,
         }
+        if modules:
+            out["modules"] = list(self.modules)
+            out["owned_modules"] = list(self.owned_modules)
+        return out
 
 
 @dataclass
 class Inventory:
     dists: dict[str, Dist]                       # canonical name -> Dist (first wins = the one that imports)
-    duplicates: dict[str, list[Dist]]            # canonical name -> every copy found, when >1
-    module_owners: dict[str, list[str]]          # import name -> dists that OWN it (ship its __init__.py)
+    duplicates: dict[str, tuple[Dist, ...]]      # canonical name -> every copy found, when >1
+    # import name -> dists that OWN it (ship its __init__.py). Lazy: reading it
+    # reads every copy's RECORD, so only the module rules pay for it.
+    module_owners: dict[str, tuple[str, ...]] = _Lazy("_find_module_owners")
     # The pip-check equivalent. Each entry carries the *parsed* target name, so
     # consumers never have to re-derive it from the requirement string - doing
     # that by hand turns "numpy>=2.0" into a package called "numpy>=2-0".
-    unsatisfied: list[dict]                      # {dist, requirement, target, installed, reason}
+    unsatisfied: list[dict] = field(default_factory=list)  # {dist, requirement, target, installed, reason}
+    # How the build went through the dist-info cache: {"hits": n, "misses": n}.
+    # Empty when the inventory was built without one.
+    cache_stats: dict[str, int] = field(default_factory=dict)
+    # Parsed Requires-Dist strings, shared with everything else in the same
+    # scan that parses requirements (rules, the custom node survey).
+    requirements: RequirementCache = field(default_factory=lambda: RequirementCache())
+    # Reverse dependencies: canonical target -> every non-extra requirement on
+    # it, in `dists` order. build() fills it in the same pass as the pip check;
+    # on a hand-built inventory it is computed the first time it is asked for.
+    dependents: dict[str, list[Pin]] | None = None
+    # Every copy build() found, shadowed ones included, in sys.path order -
+    # what module_owners is computed from. None on hand-built inventories.
+    copies: tuple[Dist, ...] | None = field(default=None, repr=False, compare=False)
+    # (dist-info path, fingerprint, Dist) for each copy whose module lists the
+    # dist-info cache doesn't hold yet. Once module_owners has read them they
+    # are written back, so the next scan does not read RECORD again. The cache
+    # itself isn't kept: it holds every interpreter's records, and a ComfyUI
+    # server keeps this inventory for as long as it runs.
+    uncached: tuple[tuple[str, list[int], Dist], ...] = field(default=(), repr=False, compare=False)
 
     def get(self, name: str) -> Dist | None:
         return self.dists.get(canonicalize_name(name))
@@ -100,13 +210,51 @@ class Inventory:
     def has(self, name: str) -> bool:
         return canonicalize_name(name) in self.dists
 
-    def to_dict(self) -> dict:
+    def _find_module_owners(self) -> None:
+        owners: dict[str, list[str]] = defaultdict(list)
+        every = self.copies if self.copies is not None else self.dists.values()
+        # Only OWNED modules count toward a conflict. A dist that merely drops
+        # files into a shared namespace (google/, nvidia/, opentelemetry/) is
+        # not fighting anyone.
+        with profile.span("RECORD reads", cat="io"):
+            for d in every:
+                for m in d.owned_modules:
+                    if d.name not in owners[m]:
+                        owners[m].append(d.name)
+        self.module_owners = {m: tuple(o) for m, o in owners.items()}
+        if self.uncached:
+            cache = _DistCache.load()
+            cache.fill_modules(self.uncached)
+            cache.save()
+            self.uncached = ()
+
+    def pins_on(self, target: str) -> list[Pin]:
+        """Every installed dist's declared specifier on `target` - "who pins
+        numpy?" as a dict lookup. Same pins as `requirement_pins`, for all dists
+        at once: extras skipped, markers recorded (Pin.applies) but not applied."""
+        if self.dependents is None:
+            self.dependents = _check_requirements(self.dists, self.requirements)[1]
+        return [p for p in self.dependents.get(canonicalize_name(target), ()) if p.specifier]
+
+    def to_dict(self, modules: bool | None = None) -> dict:
+        """The inventory as JSON. Module ownership (each dist's modules, and
+        "shared_modules") costs a RECORD read per dist, so by default it is
+        included only once something - a module rule - has already paid for
+        it; True forces it, False leaves it out."""
+        if modules is None:
+            modules = getattr(self, "_module_owners", None) is not None
+        out = {
+            "packages": {k: v.to_dict(modules) for k, v in sorted(self.dists.items())},
+            "duplicates": {k: [d.to_dict(modules) for d in v] for k, v in self.duplicates.items()},
+        }
+        if modules:
+            out["shared_modules"] = {m: list(o) for m, o in self.module_owners.items() if len(o) > 1}
         return {
-            "packages": {k: v.to_dict() for k, v in sorted(self.dists.items())},
-            "duplicates": {k: [d.to_dict() for d in v] for k, v in self.duplicates.items()},
-            "shared_modules": {m: o for m, o in self.module_owners.items() if len(o) > 1},
+            **out,
             "unsatisfied": self.unsatisfied,
             "count": len(self.dists),
+            "cache": self.cache_stats,
+            "requirement_cache": self.requirements.stats(),
         }
 
 
@@ -126,57 +274,430 @@ def _is_vendored(location: str | None) -> bool:
     return any(v in parts for v in _VENDORED)
 
 
-def build() -> Inventory:
+def build(
+    use_cache: bool = True,
+    paths: list[str] | None = None,
+    reader: str = "metadata",
+    workers: int = 0,
+    reqs: RequirementCache | None = None,
+) -> Inventory:
+    """Read every installed distribution.
+
+    `paths` replaces sys.path as the search path (tests and benchmarks point it
+    at a synthetic site-packages; the scan leaves it None). `reader` is
+    "metadata" (importlib.metadata, the reference) or "native" (the os.scandir
+    reader below, same answers; what the scan uses).
+
+    `workers` > 1 fans the per-dist reads (stat, METADATA) out to a
+    thread pool of that size, capped at MAX_WORKERS. Worth it on slow or
+    network disks, where every read is a round trip. The results are folded
+    back in path order, so the answer is identical to a serial build.
+
+    `reqs` is the scan's requirement cache; a fresh one is made if not given.
+    """
     dists: dict[str, Dist] = {}
     duplicates: dict[str, list[Dist]] = defaultdict(list)
-    module_owners: dict[str, list[str]] = defaultdict(list)
-
-    for dist in md.distributions():
-        try:
-            raw = dist.metadata["Name"]
-            if not raw:
+    copies: list[Dist] = []
+    uncached: list[tuple[str, list[int], Dist]] = []
+
+    cache = _DistCache.load() if use_cache else None
+
+    if reader == "native":
+        found = _native_entries(paths if paths is not None else sys.path)
+    else:
+        found = _metadata_entries(paths)
+
+    # Every dist-info (or its cache entry) is read inside this span.
+    with profile.span("dist-info reads", cat="io", reader=reader):
+        if workers > 1:
+            entries = list(found)
+            with ThreadPoolExecutor(min(workers, MAX_WORKERS), thread_name_prefix="comfydoctor-inv") as pool:
+                resolved = zip(entries, list(pool.map(partial(_resolve, cache), entries)))
+        else:
+            resolved = ((e, _resolve(cache, e)) for e in found)
+
+        # Folded strictly in the order the readers yielded: that order IS sys.path
+        # precedence, and it alone decides which copy of a duplicate is the one
+        # that imports. Nothing below may depend on which thread finished first.
+        for (path, location, _read, read_modules), res in resolved:
+            if res is None:
+                continue
+            rec, fp, hit = res
+            if cache:
+                cache.note(path, fp, rec, hit)
+            if rec is None:
                 continue
-        except Exception:
-            continue
 
-        if _is_vendored(_location_of(dist)):
-            continue
-        name = canonicalize_name(raw)
-        try:
-            version = dist.version or "unknown"
-        except Exception:
-            version = "unknown"
-
-        d = Dist(
-            name=name,
-            raw_name=raw,
-            version=version,
-            location=_location_of(dist),
-            requires=list(dist.requires or []),
-            modules=_top_level_modules(dist),
-            owned_modules=_owned_modules(dist),
-        )
-
-        duplicates[name].append(d)
-        # importlib.metadata yields in sys.path order, so the first copy of a
-        # name is the one that actually wins an import. Keep that one as truth.
-        if name not in dists:
-            dists[name] = d
-        # Only OWNED modules count toward a conflict. A dist that merely drops
-        # files into a shared namespace (google/, nvidia/, opentelemetry/) is
-        # not fighting anyone.
-        for m in d.owned_modules:
-            if name not in module_owners[m]:
-                module_owners[m].append(name)
+            d = _dist_from(rec, location)
+            if "modules" not in rec:
+                d.record = read_modules
+                if cache and fp is not None:
+                    uncached.append((path, fp, d))
+            name = d.name
 
-    real_dupes = {k: v for k, v in duplicates.items() if len(v) > 1}
-    unsat = _check_requirements(dists)
+            copies.append(d)
+
+            duplicates[name].append(d)
+            # importlib.metadata yields in sys.path order, so the first copy of a
+            # name is the one that actually wins an import. Keep that one as truth.
+            if name not in dists:
+                dists[name] = d
+
+    if cache:
+        cache.save()
+
+    reqs = reqs if reqs is not None else RequirementCache()
+    real_dupes = {k: tuple(v) for k, v in duplicates.items() if len(v) > 1}
+    with profile.span("requirements check", cat="compute", dists=len(dists)):
+        unsat, dependents = _check_requirements(dists, reqs)
     return Inventory(
         dists=dists,
         duplicates=real_dupes,
-        module_owners=dict(module_owners),
         unsatisfied=unsat,
+        cache_stats=cache.stats() if cache else {},
+        requirements=reqs,
+        dependents=dependents,
+        copies=tuple(copies),
+        uncached=tuple(uncached),
+    )
+
+
+def _dist_from(rec: dict, location: str | None) -> Dist:
+    """A Dist from a dist-info record, every string in it interned."""
+    raw = rec["raw_name"]
+    d = Dist(
+        name=sys.intern(canonicalize_name(raw)),
+        raw_name=sys.intern(raw),
+        version=rec["version"],
+        location=sys.intern(location) if location else location,
+        requires=_interned(rec["requires"]),
     )
+    if "modules" in rec:
+        d.modules = _interned(rec["modules"])
+        d.owned_modules = _interned(rec["owned_modules"])
+    return d
+
+
+MAX_WORKERS = 16
+
+_Entry = Tuple[
+    Optional[str], Optional[str], Callable[[], Optional[dict]], Callable[[], Tuple[list, list]]
+]
+
+
+def _resolve(cache: _DistCache | None, entry: _Entry) -> tuple[dict | None, list[int] | None, bool] | None:
+    """One dist's record - from the cache when it is still valid, else read
+    from disk. Touches no shared state, so it is safe on any thread."""
+    path, location, read, _ = entry
+    if _is_vendored(location):
+        return None
+    fp = cache.fingerprint(path) if cache else None
+    rec = cache.cached(path, fp) if fp else None
+    if rec is not None:
+        return rec, fp, True
+    return read(), fp, False
+
+
+# Each reader yields (dist-info path, site dir, read, read_modules) in
+# import-precedence order; `read()` returns the record below, or None for an
+# entry to skip, and `read_modules()` the (modules, owned_modules) pair from
+# RECORD, called only if someone asks. The path is what the cache is keyed on,
+# so it must be spelled identically by both.
+
+
+def _metadata_entries(paths: list[str] | None) -> Iterator[_Entry]:
+    found = md.distributions(path=paths) if paths is not None else md.distributions()
+    for dist in found:
+        p = getattr(dist, "_path", None)
+        yield (str(p) if p else None), _location_of(dist), partial(_read_dist, dist), \
+            partial(_dist_modules, dist)
+
+
+def _read_dist(dist: md.Distribution) -> dict | None:
+    """Everything the inventory needs up front from one dist-info, as a plain
+    record - i.e. everything but the module lists, see `_dist_modules`.
+
+    None for entries with no usable Name - half-deleted installs leave those
+    behind, and they are not packages anyone can import.
+    """
+    try:
+        raw = dist.metadata["Name"]
+        if not raw:
+            return None
+    except Exception:
+        return None
+    try:
+        version = dist.version or "unknown"
+    except Exception:
+        version = "unknown"
+    return {
+        "raw_name": raw,
+        "version": version,
+        "requires": list(dist.requires or []),
+    }
+
+
+def _dist_modules(dist: md.Distribution) -> tuple[list[str], list[str]]:
+    def files() -> Iterator[str]:
+        for f in dist.files or []:
+            yield str(f)
+
+    try:
+        top_level = dist.read_text("top_level.txt")
+    except Exception:
+        top_level = None
+    return _modules_from_files(top_level, files())
+
+
+# --------------------------------------------------------------------------- #
+# Native dist-info reader
+# --------------------------------------------------------------------------- #
+
+# importlib.metadata builds a PathDistribution per entry and runs all of
+# METADATA - long description included, often 50 KB of README - through the
+# email parser, only for us to read three headers. This reader walks each site
+# dir with os.scandir, stops reading METADATA at the end of the header block,
+# and streams RECORD keeping only the first path segment of each row.
+#
+# Its answers must be the ones importlib.metadata gives, in the same order, or
+# "which copy wins the import" silently changes. So it mirrors importlib's own
+# directory lookup (entries grouped by normalised name, dist-info and egg-info
+# together, in directory order) and hands anything it does not fully
+# understand - egg-info, .egg dirs, zips, a dist-info with no METADATA - to
+# importlib.metadata itself.
+
+_HEADERS = ("name", "version", "requires-dist")
+_HEADER_LINE = re.compile(r"[\041-\071\073-\176]+:")
+
+
+def _native_entries(paths: list[str]) -> Iterator[_Entry]:
+    for root in paths:
+        if root.lower().endswith(".egg"):
+            yield from _metadata_entries([root])
+            continue
+        try:
+            with os.scandir(root or ".") as it:
+                children = [(e.name, e.is_dir()) for e in it]
+        except OSError:
+            yield from _metadata_entries([root])  # a zip on sys.path, or missing
+            continue
+
+        groups: dict[str, list[tuple[str, bool]]] = {}
+        for child, is_dir in children:
+            low = child.lower()
+            if low.endswith((".dist-info", ".egg-info")):
+                key = re.sub(r"[-_.]+", "_", low.rpartition(".")[0].partition("-")[0])
+                groups.setdefault(key, []).append((child, is_dir))
+
+        location = str(Path(root, "x").parent)
+        for group in groups.values():
+            for child, is_dir in group:
+                path = Path(root, child)
+                if is_dir and child.lower().endswith(".dist-info"):
+                    yield str(path), location, partial(_read_dist_native, str(path)), \
+                        partial(_native_modules, str(path))
+                else:
+                    dist = md.PathDistribution(path)
+                    yield str(path), location, partial(_read_dist, dist), \
+                        partial(_dist_modules, dist)
+
+
+def _read_dist_native(info: str) -> dict | None:
+    headers = _read_headers(os.path.join(info, "METADATA"))
+    if not headers:
+        return _read_dist(md.PathDistribution(Path(info)))
+
+    names = headers.get("name")
+    if not names or not names[0]:
+        return None
+    versions = headers.get("version")
+    requires = headers.get("requires-dist") or []
+    if not requires and os.path.exists(os.path.join(info, "requires.txt")):
+        requires = list(md.PathDistribution(Path(info)).requires or [])
+    return {
+        "raw_name": names[0],
+        "version": (versions[0] if versions else None) or "unknown",
+        "requires": requires,
+    }
+
+
+def _native_modules(info: str) -> tuple[list[str], list[str]]:
+    try:
+        with open(os.path.join(info, "top_level.txt"), encoding="utf-8") as f:
+            top_level = f.read()
+    except Exception:
+        top_level = None
+    return _modules_from_files(top_level, _record_paths(info))
+
+
+def _read_headers(path: str) -> dict[str, list[str]] | None:
+    """Name / Version / Requires-Dist from a METADATA header block.
+
+    Values come out exactly as the email parser importlib.metadata uses would
+    produce them (leading blanks stripped, folded lines kept), and reading
+    stops at the blank line before the long description.
+    """
+    out: dict[str, list[str]] = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            key: str | None = None
+            parts: list[str] = []
+            for line in f:
+                if line[:1] in (" ", "\t"):
+                    parts.append(line)
+                    continue
+                if key is not None:
+                    out[key].append("".join(parts).rstrip("\r\n"))
+                    key = None
+                if not _HEADER_LINE.match(line):
+                    break  # the blank separator line, or the body
+                name, value = line.split(":", 1)
+                name = name.lower()
+                if name in _HEADERS:
+                    key = name
+                    parts = [value.lstrip(" \t")]
+                    out.setdefault(key, [])
+            if key is not None:
+                out[key].append("".join(parts).rstrip("\r\n"))
+    except Exception:
+        return None
+    return out
+
+
+def _record_paths(info: str) -> Iterator[str]:
+    """RECORD, streamed: the file path of every row, normalised the way
+    importlib.metadata's PackagePath would print it."""
+    with open(os.path.join(info, "RECORD"), encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not 1 <= len(row) <= 3:
+                raise ValueError("malformed RECORD row")
+            p = row[0]
+            if "//" in p or "./" in p or p.endswith("/") or not p:
+                p = str(PurePosixPath(p))
+            yield p
+
+
+# --------------------------------------------------------------------------- #
+# Dist-info cache
+# --------------------------------------------------------------------------- #
+
+# Parsed dist-info records, persisted between scans. A render node with 600+
+# distributions on a network disk spends most of a scan re-reading METADATA and
+# walking RECORD files that have not changed since yesterday. Each record is
+# keyed by the dist-info directory's own path and validated against its mtime
+# and inode: pip never edits a dist-info in place - an upgrade or reinstall
+# removes the directory and writes a new one - so a matching (mtime, inode)
+# means the same files we parsed last time.
+#
+# One file serves every interpreter the user runs; keys are absolute paths, so
+# two Pythons can never read each other's records. It lives in the user's own
+# cache directory, not the shared temp dir: there any local account could
+# plant the file first - locking us out of it, or feeding us records for
+# packages that aren't installed. For the same reason a file owned by anyone
+# else is ignored, and ours is written 0600.
+def _user_cache_dir() -> str:
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(r"~\AppData\Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "comfydoctor")
+
+
+CACHE_FILE = os.path.join(_user_cache_dir(), "inventory_cache.json")
+CACHE_FORMAT = 1
+
+
+class _DistCache:
+    def __init__(self, entries: dict[str, dict]):
+        self._entries = entries
+        self._seen: set[str] = set()
+        self._visited_dirs: set[str] = set()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls) -> "_DistCache":
+        """A cache that can't be read is an empty cache, never a crash."""
+        try:
+            with open(CACHE_FILE, encoding="utf-8") as f:
+                if hasattr(os, "getuid") and os.fstat(f.fileno()).st_uid != os.getuid():
+                    return cls({})
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("format") == CACHE_FORMAT \
+                    and isinstance(data.get("entries"), dict):
+                return cls(data["entries"])
+        except Exception:
+            pass
+        return cls({})
+
+    @staticmethod
+    def fingerprint(dist_path: str | None) -> list[int] | None:
+        if not dist_path:
+            return None
+        try:
+            st = os.stat(dist_path)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_ino]
+
+    def cached(self, dist_path: str, fp: list[int]) -> dict | None:
+        """The stored record, if it was made from these exact files. Read-only."""
+        entry = self._entries.get(os.path.abspath(dist_path))
+        if isinstance(entry, dict) and entry.get("fp") == fp and isinstance(entry.get("rec"), dict):
+            return entry["rec"]
+        return None
+
+    def note(self, dist_path: str | None, fp: list[int] | None, rec: dict | None, hit: bool) -> None:
+        """Account for one dist, and keep what a miss had to read. Called from
+        the building thread only, in path order."""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if not dist_path or fp is None:
+            return
+        path = os.path.abspath(dist_path)
+        self._seen.add(path)
+        self._visited_dirs.add(os.path.dirname(path))
+        if not hit and rec is not None:
+            self._entries[path] = {"fp": fp, "rec": rec}
+            self._dirty = True
+
+    def fill_modules(self, dists: Iterable[tuple[str, list[int], Dist]]) -> None:
+        """Add module lists read after the build to the records they were
+        missing from - unless the dist-info has been replaced since."""
+        for path, fp, d in dists:
+            entry = self._entries.get(os.path.abspath(path))
+            rec = entry.get("rec") if isinstance(entry, dict) and entry.get("fp") == fp else None
+            if isinstance(rec, dict) and "modules" not in rec:
+                rec["modules"], rec["owned_modules"] = list(d.modules), list(d.owned_modules)
+                self._dirty = True
+
+    def save(self) -> None:
+        # Forget dists that were uninstalled from a directory we just walked.
+        # Records for directories this interpreter never looks at belong to
+        # some other Python and are left alone.
+        stale = [p for p in self._entries
+                 if os.path.dirname(p) in self._visited_dirs and p not in self._seen]
+        for p in stale:
+            del self._entries[p]
+        if not (self._dirty or stale):
+            return
+        try:
+            os.makedirs(os.path.dirname(CACHE_FILE), mode=0o700, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(CACHE_FILE), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                if hasattr(os, "fchmod"):
+                    os.fchmod(f.fileno(), 0o600)  # mkstemp's mode, stated
+                json.dump({"format": CACHE_FORMAT, "entries": self._entries}, f)
+            os.replace(tmp, CACHE_FILE)
+            self._dirty = False
+        except Exception:
+            pass  # a cache that can't be written is just a cache miss next time
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
 
 
 def _location_of(dist: md.Distribution) -> str | None:
@@ -190,67 +711,62 @@ def _location_of(dist: md.Distribution) -> str | None:
         return None
 
 
-def _top_level_modules(dist: md.Distribution) -> list[str]:
-    """Which import names does this distribution actually provide?
+def _modules_from_files(top_level: str | None, files: Iterable[str]) -> tuple[list[str], list[str]]:
+    """(import names provided, import names OWNED), from one pass over RECORD.
 
-    This is what lets us say "cv2 is claimed by both opencv-python and
+    Which import names does this distribution actually provide? This is what
+    lets us say "cv2 is claimed by both opencv-python and
     opencv-python-headless" - a conflict no version check would ever catch,
     and one that silently breaks insightface / GPU decoding for thousands of
     people.
-    """
-    mods: list[str] = []
-    try:
-        tl = dist.read_text("top_level.txt")
-        if tl:
-            mods = [ln.strip() for ln in tl.splitlines() if ln.strip() and not ln.startswith("_")]
-    except Exception:
-        pass
-
-    if not mods:
-        # No top_level.txt (modern wheels often omit it). Derive from RECORD.
-        try:
-            for f in dist.files or []:
-                s = str(f)
-                if s.startswith(("..", "__pycache__")) or "/" not in s.replace("\\", "/"):
-                    # A bare top-level .py module counts.
-                    if s.endswith(".py") and "/" not in s and "\\" not in s:
-                        stem = s[:-3]
-                        if stem not in ("setup", "conftest") and not stem.startswith("_"):
-                            mods.append(stem)
-                    continue
-                head = s.replace("\\", "/").split("/", 1)[0]
-                if head.endswith((".dist-info", ".data", ".egg-info")) or head.startswith("_"):
-                    continue
-                if head not in mods:
-                    mods.append(head)
-        except Exception:
-            pass
-    return sorted(set(mods))
-
 
-def _owned_modules(dist: md.Distribution) -> list[str]:
-    """Top-level packages this dist actually OWNS, i.e. ships `<mod>/__init__.py`.
+    A dist OWNS a top-level package when it ships `<mod>/__init__.py`. Two
+    dists owning the same module = a real, file-clobbering conflict. Two dists
+    merely *contributing* to the same module = a namespace package, which is
+    normal, intentional, and none of our business.
 
-    Two dists owning the same module = a real, file-clobbering conflict.
-    Two dists merely *contributing* to the same module = a namespace package,
-    which is normal, intentional, and none of our business.
+    `files` may raise part-way (a malformed RECORD); whatever was read before
+    that still counts.
     """
+    mods: list[str] = []
+    if top_level:
+        mods = [ln.strip() for ln in top_level.splitlines() if ln.strip() and not ln.startswith("_")]
+    # No top_level.txt (modern wheels often omit it): derive from RECORD.
+    derive = not mods
+
     owned: set[str] = set()
     try:
-        for f in dist.files or []:
-            parts = str(f).replace("\\", "/").split("/")
+        for s in files:
+            parts = s.replace("\\", "/").split("/")
             if len(parts) == 2 and parts[1] == "__init__.py":
                 head = parts[0]
                 if not head.startswith((".", "_")) and not head.endswith(
                     (".dist-info", ".egg-info", ".data")
                 ):
                     owned.add(head)
+
+            if not derive:
+                continue
+            if s.startswith(("..", "__pycache__")) or len(parts) == 1:
+                # A bare top-level .py module counts.
+                if s.endswith(".py") and "/" not in s and "\\" not in s:
+                    stem = s[:-3]
+                    if stem not in ("setup", "conftest") and not stem.startswith("_"):
+                        mods.append(stem)
+                continue
+            head = parts[0]
+            if head.endswith((".dist-info", ".data", ".egg-info")) or head.startswith("_"):
+                continue
+            if head not in mods:
+                mods.append(head)
     except Exception:
         pass
-    return sorted(owned)
+    return sorted(set(mods)), sorted(owned)
 
 
-def _check_requirements(dists: dict[str, Dist]) -> list[dict]:
+def _check_requirements(
+    dists: dict[str, Dist], reqs: RequirementCache
+) -> tuple[list[dict], dict[str, list[Pin]]]:
     """In-process `pip check`, plus the reason in words.
 
     We evaluate every installed distribution's own Requires-Dist against what is
@@ -260,31 +776,29 @@ def _check_requirements(dists: dict[str, Dist]) -> list[dict]:
     The parsed `target` name is carried in the result. Callers must never try to
     recover it by string-slicing the requirement - that is how you end up
     reporting a missing package called "numpy>=2-0".
+
+    The same walk builds the reverse-dependency index (Inventory.dependents),
+    so the rules' "who pins X" questions cost nothing extra.
     """
     if not HAVE_PACKAGING:
-        return []
+        return [], {}
 
     problems: list[dict] = []
+    dependents: dict[str, list[Pin]] = defaultdict(list)
     for name, d in dists.items():
         for req_str in d.requires:
-            try:
-                req = Requirement(req_str)
-            except InvalidRequirement:
+            pr = reqs.get(req_str)
+            if pr is None:
+                continue
+            # Requirements gated behind an extra are optional by definition.
+            if pr.extra:
+                continue
+            dependents[pr.target].append(Pin(name, pr.specifier, pr.applies))
+            if pr.applies is not True:
                 continue
 
-            if req.marker is not None:
-                try:
-                    # Requirements gated behind an extra are optional by definition.
-                    if "extra" in str(req.marker):
-                        continue
-                    if not req.marker.evaluate():
-                        continue
-                except UndefinedEnvironmentName:
-                    continue
-                except Exception:
-                    continue
-
-            target_name = canonicalize_name(req.name)
+            req = pr.req
+            target_name = pr.target
             target = dists.get(target_name)
 
             if target is None:
@@ -292,7 +806,7 @@ def _check_requirements(dists: dict[str, Dist]) -> list[dict]:
                     "dist": name,
                     "requirement": req_str,
                     "target": target_name,
-                    "specifier": str(req.specifier),
+                    "specifier": pr.specifier,
                     "installed": None,
                     "reason": f"{req.name} is not installed, but {name} requires it",
                 })
@@ -309,61 +823,174 @@ def _check_requirements(dists: dict[str, Dist]) -> list[dict]:
                     "dist": name,
                     "requirement": req_str,
                     "target": target_name,
-                    "specifier": str(req.specifier),
+                    "specifier": pr.specifier,
                     "installed": target.version,
                     "reason": (
                         f"{req.name} {target.version} is installed, but {name} "
                         f"requires {req.specifier}"
                     ),
                 })
-    return problems
+    return problems, dict(dependents)
 
 
-def parse_version(v: str):
-    """Version object from a possibly-local version string, or None."""
-    if not HAVE_PACKAGING or not v:
+class Pin(NamedTuple):
+    dist: str               # canonical name of the dist declaring the requirement
+    specifier: str          # "" when it requires the target without pinning it
+    applies: bool | None    # its marker's verdict here, as ParsedRequirement.applies
+
+
+class ParsedRequirement(NamedTuple):
+    req: Requirement
+    target: str             # canonical name of the package it asks for
+    specifier: str          # str(req.specifier), "" when unpinned
+    extra: bool             # gated behind an extra, i.e. optional
+    # The marker's verdict for THIS interpreter: True (applies, or no marker),
+    # False (does not apply here), None (could not be evaluated).
+    applies: bool | None
+
+
+class RequirementCache:
+    """Every requirement string parsed once, its marker evaluated once.
+
+    A scan meets the same strings over and over: `_check_requirements` parses
+    every Requires-Dist, rules ask each dist for its pins on numpy or torch,
+    and the node survey parses every requirements.txt line twice. Most of those
+    are repeats ("numpy", "torch>=2.0", "tqdm"). This interns them.
+
+    A cache lives for one scan and is threaded through it explicitly, never
+    held globally: marker verdicts are facts about one interpreter, and a
+    long-lived module cache would carry them across to the next.
+    """
+
+    def __init__(self) -> None:
+        self._parsed: dict[str, ParsedRequirement | None] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, req_str: str) -> ParsedRequirement | None:
+        """The parsed requirement, or None when the string is not one."""
+        with self._lock:
+            if req_str in self._parsed:
+                self.hits += 1
+                return self._parsed[req_str]
+            self.misses += 1
+        pr = _parse_requirement(req_str)
+        with self._lock:
+            self._parsed[req_str] = pr
+        return pr
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "unique": len(self._parsed)}
+
+
+def _parse_requirement(req_str: str) -> ParsedRequirement | None:
+    if not HAVE_PACKAGING:
         return None
     try:
-        return Version(v.split("+", 1)[0])
+        req = Requirement(req_str)
+    except InvalidRequirement:
+        return None
+    extra = False
+    applies: bool | None = True
+    if req.marker is not None:
+        extra = "extra" in str(req.marker)
+        try:
+            applies = bool(req.marker.evaluate())
+        except UndefinedEnvironmentName:
+            applies = None
+        except Exception:
+            applies = None
+    return ParsedRequirement(
+        req=req,
+        target=canonicalize_name(req.name),
+        specifier=str(req.specifier),
+        extra=extra,
+        applies=applies,
+    )
+
+
+# Version and SpecifierSet objects, memoised. A scan asks the same questions
+# thousands of times over - every node's "numpy>=1.21" against the installed
+# numpy, every dist's torch pin against the installed torch - and packaging
+# re-parses both strings on every call. Both types are immutable and parsing is
+# a pure function of the string, so unlike RequirementCache (whose marker
+# verdicts belong to one interpreter) these can live for the whole process.
+# Bounded, because a long-running server sees an unbounded stream of strings.
+VERSION_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=VERSION_CACHE_SIZE)
+def _version(v: str):
+    try:
+        return Version(v)
     except Exception:
         return None
 
 
+@lru_cache(maxsize=VERSION_CACHE_SIZE)
+def specifier_set(spec: str):
+    """SpecifierSet for `spec`, shared and memoised - or None if it is not one."""
+    if not HAVE_PACKAGING:
+        return None
+    try:
+        from packaging.specifiers import SpecifierSet
+
+        return SpecifierSet(spec)
+    except Exception:
+        return None
+
+
+def version_cache_stats() -> dict[str, dict[str, int]]:
+    """Hits, misses and size of the Version / SpecifierSet memos."""
+    out = {}
+    for name, fn in (("version", _version), ("specifier", specifier_set)):
+        info = fn.cache_info()
+        out[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+    return out
+
+
+def parse_version(v: str):
+    """Version object from a possibly-local version string, or None."""
+    if not HAVE_PACKAGING or not v:
+        return None
+    return _version(v.split("+", 1)[0])
+
+
 def satisfies(installed: str | None, specifier: str) -> bool | None:
     """True/False, or None when we genuinely cannot tell (don't guess)."""
     if not HAVE_PACKAGING or not installed or not specifier:
         return None
+    v = parse_version(installed)
+    spec = specifier_set(specifier)
+    if v is None or spec is None:
+        return None
     try:
-        from packaging.specifiers import SpecifierSet
-
-        v = Version(installed.split("+", 1)[0])
-        return SpecifierSet(specifier).contains(v, prereleases=True)
+        return spec.contains(v, prereleases=True)
     except Exception:
         return None
 
 
-def requirement_pins(dist: Dist, target: str) -> list[str]:
+def requirement_pins(dist: Dist, target: str, reqs: RequirementCache | None = None) -> list[str]:
     """Every specifier `dist` places on `target`.
 
     Used to catch the classic: xformers 0.0.28.post1 declares `torch==2.5.1`,
     you have torch 2.6.0, and the import aborts. The pin is right there in the
     metadata on disk - we never have to import xformers to find it.
+
+    Pass the scan's `reqs` (ctx.inv.requirements) so nothing is parsed twice.
     """
     if not HAVE_PACKAGING:
         return []
+    reqs = reqs if reqs is not None else RequirementCache()
     want = canonicalize_name(target)
     out: list[str] = []
     for r in dist.requires:
-        try:
-            req = Requirement(r)
-        except InvalidRequirement:
-            continue
-        if canonicalize_name(req.name) != want:
-            continue
-        if req.marker is not None and "extra" in str(req.marker):
+        pr = reqs.get(r)
+        if pr is None or pr.target != want or pr.extra:
             continue
-        if req.specifier:
-            out.append(str(req.specifier))
+        if pr.specifier:
+            out.append(pr.specifier)
     return out
 
 
@@ -0,0 +1,441 @@
+"""The time machine's journal on disk: append-only, gzip-compressed, long.
+
+The first format was a single JSON document rewritten on every scan, capped at
+the last 20 snapshots each carrying the full {package: version} map. On a box
+scanned hourly by cron, the evidence for "when did this break" was gone within
+a day. Here the history runs to thousands of scans in a few hundred KB:
+
+  {"t": "meta", "compacted": N, "index": {...}}   first line after a rewrite
+  {"t": "base", "n": seq, "ts": ..., "packages": {name: version}, "problems": [...]}
+  {"t": "delta", "ts": ..., "set": {name: version}, "del": [name], "problems": [...]}
+  {"t": "touch", "ts": ...}       an identical re-scan: only the newest timestamp moves
+  {"t": "clean", "ts": ..., "packages": {...}}   the pinned last clean state, written
+                                                 only once it has left the window
+
+A delta omits "set", "del" and "problems" when they are empty or unchanged.
+Entries are numbered (Entry.seq) in the order they were recorded; a base line
+carries its number and each delta is the one after.
+Every KEYFRAME_EVERY entries a full "base" snapshot is written again, so
+rebuilding any one snapshot applies at most that many deltas (Journal.packages)
+instead of replaying the whole history.
+
+The file is a multi-member gzip stream: recording a scan appends one small
+member. Past COMPACT_AT appended members the file is rewritten atomically as a
+single member - which compresses the near-identical keyframes to almost
+nothing - and the retention policy (count and age, see Journal) is applied.
+
+Alongside the entries, every problem id has an index entry (Seen): the first
+and last entry it was seen in, and the last entry it was absent from. "The
+newest snapshot from before this problem" is then a lookup, not a walk back
+through the history. First and last sightings outlive retention: the meta line
+of a rewrite carries them.
+
+The journal API - what timemachine asks of a journal - is the public methods
+of Journal below. journal_sqlite.SqliteJournal answers the same questions from
+a database. Scans are addressed by entry number (seq), which is contiguous.
+
+The file is read once per scan (Journal.load). A torn last member (a crash
+mid-append) ends the replay there and the next write compacts. The earlier
+formats - env_journal.jsonl, and before it env_journal.json - are read in its
+place and replaced by the first write.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from . import profile
+
+FILENAME = "env_journal.jsonl.gz"
+PLAIN = "env_journal.jsonl"
+LEGACY = "env_journal.json"
+COMPACT_AT = 200         # members appended before the file is rewritten as one
+KEYFRAME_EVERY = 100     # entries between full snapshots: bounds a lookup
+
+
+class Entry:
+    """One retained scan. Its packages are `keyframe` when it has one, else
+    the previous entry's packages with `set` applied and `removed` dropped."""
+
+    __slots__ = ("ts", "problems", "set", "removed", "keyframe", "seq")
+
+    def __init__(self, ts: str | None, problems: list[str], set: dict[str, str] | None = None,
+                 removed: tuple[str, ...] = (), keyframe: dict[str, str] | None = None):
+        self.ts = ts
+        self.problems = problems
+        self.set = set or {}
+        self.removed = removed
+        self.keyframe = keyframe
+        self.seq = 0
+
+
+class Seen:
+    """Where one problem id sits in the history, as entry numbers. `last_absent`
+    is the newest entry without it; None when there is none on record."""
+
+    __slots__ = ("first_seen", "first_ts", "last_seen", "last_ts", "last_absent")
+
+    def __init__(self, first_seen: int, first_ts: str | None, last_seen: int,
+                 last_ts: str | None, last_absent: int | None = None):
+        self.first_seen = first_seen
+        self.first_ts = first_ts
+        self.last_seen = last_seen
+        self.last_ts = last_ts
+        self.last_absent = last_absent
+
+
+class Journal:
+    """The retained scans, oldest first, and the last clean state.
+
+    Retention: the newest `keep` entries that are less than `max_age_days`
+    old (the newest entry is always kept). A clean entry leaving the window
+    stays addressable as the pinned clean state. A journal without a path (no
+    ComfyUI root) is always empty and never written."""
+
+    def __init__(self, path: Path | None, keep: int, max_age_days: float | None = None):
+        self.path = path
+        self.keep = keep
+        self.max_age_days = max_age_days
+        self.entries: list[Entry] = []
+        self.pinned: dict | None = None
+        self.index: dict[str, Seen] = {}
+        self._next_seq = 0
+        self._head: dict[str, str] = {}   # the newest entry's packages
+        self._since_key = 0               # entries since the last keyframe
+        self._lines = 0                   # lines in the file...
+        self._compacted = 0               # ...of which written by the last rewrite
+        self._rewrite = False             # the file on disk can't just be appended to
+
+    @classmethod
+    def load(cls, path: Path | None, keep: int, max_age_days: float | None = None) -> Journal:
+        """A journal that can't be read is an empty journal, never a crash."""
+        j = cls(path, keep, max_age_days)
+        if path is None:
+            return j
+        with profile.span("journal load", cat="io"):
+            if path.exists():
+                j._replay(lambda: gzip.open(path, "rt", encoding="utf-8"))
+            elif path.with_name(PLAIN).exists():
+                j._replay(lambda: open(path.with_name(PLAIN), encoding="utf-8"))
+                j._rewrite = True
+            else:
+                j._migrate(path.with_name(LEGACY))
+            try:
+                j._trim()
+            except Exception:
+                j._reset()
+        return j
+
+    def close(self) -> None:
+        """Nothing is held open between calls; SqliteJournal's counterpart."""
+
+    # -- questions ---------------------------------------------------------- #
+
+    def packages(self, i: int) -> dict[str, str]:
+        """Entry i's full package map: its keyframe plus the deltas after it."""
+        i %= len(self.entries)
+        if i == len(self.entries) - 1:
+            return dict(self._head)
+        k = i
+        while self.entries[k].keyframe is None:
+            k -= 1
+        current = dict(self.entries[k].keyframe)
+        for e in self.entries[k + 1:i + 1]:
+            current.update(e.set)
+            for name in e.removed:
+                current.pop(name, None)
+        return current
+
+    def snapshot(self, i: int) -> dict:
+        e = self.entries[i]
+        return {"ts": e.ts, "packages": self.packages(i), "problems": list(e.problems)}
+
+    def last_clean(self) -> dict | None:
+        """The newest snapshot with no problems, retained or pinned."""
+        for i in range(len(self.entries) - 1, -1, -1):
+            if not self.entries[i].problems:
+                return self.snapshot(i)
+        return self.pinned
+
+    def position(self, seq: int | None) -> int | None:
+        """The index in `entries` of entry number `seq`, if it is retained."""
+        if seq is None or not self.entries:
+            return None
+        i = seq - self.entries[0].seq
+        return i if 0 <= i < len(self.entries) else None
+
+    def before(self, problems: list[str]) -> int | None:
+        """The newest retained entry missing at least one of `problems` - one
+        lookup per problem. A problem never seen is missing from every entry."""
+        best = None
+        for pid in problems:
+            seen = self.index.get(pid)
+            seq = seen.last_absent if seen else self.newest()
+            if self.position(seq) is not None and (best is None or seq > best):
+                best = seq
+        return best
+
+    def newest(self) -> int | None:
+        return self.entries[-1].seq if self.entries else None
+
+    def snapshot_at(self, seq: int | None) -> dict | None:
+        i = self.position(seq)
+        return None if i is None else self.snapshot(i)
+
+    def span(self) -> tuple[int, str | None]:
+        """How many scans are retained, and the time of the oldest."""
+        return len(self.entries), self.entries[0].ts if self.entries else None
+
+    def seen(self, problem_id: str) -> Seen | None:
+        return self.index.get(problem_id)
+
+    def problem_index(self) -> dict[str, Seen]:
+        return dict(self.index)
+
+    def count_with(self, problem_id: str) -> int:
+        """Retained scans that had this problem."""
+        return sum(1 for e in self.entries if problem_id in e.problems)
+
+    def package_history(self, name: str) -> list[dict]:
+        """Each retained scan where `name` changed version, oldest first, as
+        {"seq", "ts", "version"}; version None while it was not installed.
+        The first item is its state in the oldest retained scan."""
+        out: list[dict] = []
+        for e in self.entries:
+            if e.keyframe is not None:
+                version = e.keyframe.get(name)
+            elif name in e.set:
+                version = e.set[name]
+            elif name in e.removed:
+                version = None
+            else:
+                continue
+            if not out or out[-1]["version"] != version:
+                out.append({"seq": e.seq, "ts": e.ts, "version": version})
+        return out
+
+    # -- recording ---------------------------------------------------------- #
+
+    def record(self, ts: str, packages: dict[str, str], problems: list[str]) -> None:
+        # Back-to-back scans of an unchanged environment just refresh the newest
+        # entry, so idle re-scans can't flush real history out of the window.
+        # Both packages AND problems must match: when a problem appears with no
+        # package change (driver update, edited launch script), the previous
+        # entry is the only proof the machine once ran this exact package set
+        # cleanly - overwriting it would silence broke_without_package_changes.
+        last = self.entries[-1] if self.entries else None
+        if last and last.problems == problems and self._head == packages:
+            self._touch(ts)
+            line: dict = {"t": "touch", "ts": ts}
+        else:
+            if last is None or self._since_key + 1 >= KEYFRAME_EVERY:
+                entry = Entry(ts, problems, keyframe=dict(packages))
+            else:
+                entry = Entry(ts, problems, *_delta(self._head, packages))
+            self._append(entry)
+            line = _line(entry, last.problems if last else None)
+            self._head = dict(packages)
+            self._trim()
+        self._write(line)
+
+    def _write(self, line: dict) -> None:
+        if self.path is None:
+            return
+        try:
+            if self._rewrite or self._lines - self._compacted + 1 > COMPACT_AT:
+                self.compact()
+                return
+            with profile.span("journal append", cat="io"):
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "ab") as raw:
+                    _gzip_lines(raw, [line])
+            self._lines += 1
+        except Exception:
+            pass  # a journal that can't be written is just a missing snapshot
+
+    def compact(self) -> None:
+        """Rewrite the file as exactly what is retained, in one gzip member.
+        Atomic: a crash leaves the old file, never half of the new one."""
+        if self.path is None:
+            return
+        lines: list[dict] = []
+        if self.pinned is not None and all(e.problems for e in self.entries):
+            lines.append({"t": "clean", "ts": self.pinned["ts"], "packages": self.pinned["packages"]})
+        prev: list[str] | None = None
+        for e in self.entries:
+            lines.append(_line(e, prev))
+            prev = e.problems
+        index = {pid: [p.first_seen, p.first_ts, p.last_seen, p.last_ts]
+                 for pid, p in self.index.items()}
+        lines.insert(0, {"t": "meta", "compacted": len(lines) + 1, "index": index})
+        with profile.span("journal compact", cat="io"):
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw:
+                _gzip_lines(raw, lines)
+            os.replace(tmp, str(self.path))
+        self._lines = self._compacted = len(lines)
+        self._rewrite = False
+        for old in (PLAIN, LEGACY):   # migrated: their content is in here now
+            try:
+                self.path.with_name(old).unlink()
+            except OSError:
+                pass
+
+    # -- reading ------------------------------------------------------------ #
+
+    def _replay(self, opener) -> None:
+        current: dict[str, str] = {}
+        try:
+            with opener() as f:
+                for raw in f:
+                    rec = json.loads(raw)
+                    kind = rec["t"]
+                    if kind == "touch":
+                        self._touch(rec["ts"])
+                    elif kind == "meta":
+                        self._compacted = int(rec["compacted"])
+                        for pid, (first, first_ts, last, last_ts) in (rec.get("index") or {}).items():
+                            self.index[pid] = Seen(int(first), first_ts, int(last), last_ts)
+                    elif kind == "clean":
+                        self.pinned = {"ts": rec["ts"], "packages": dict(rec["packages"]),
+                                       "problems": []}
+                    elif kind == "base":
+                        entry = Entry(rec["ts"], list(rec["problems"]), keyframe=dict(rec["packages"]))
+                        current = dict(entry.keyframe)
+                        self._append(entry, rec.get("n"))
+                    elif kind == "delta" and self.entries:
+                        problems = rec.get("problems")
+                        entry = Entry(rec["ts"],
+                                      self.entries[-1].problems if problems is None else list(problems),
+                                      dict(rec.get("set") or {}), tuple(rec.get("del") or ()))
+                        current.update(entry.set)
+                        for name in entry.removed:
+                            current.pop(name, None)
+                        self._append(entry)
+                    else:
+                        raise ValueError(kind)
+                    self._lines += 1
+        except Exception:
+            # Only the end can be torn (lines are appended whole, one gzip
+            # member each); everything before it is sound. Rewrite on the next
+            # record.
+            self._rewrite = True
+        self._head = current
+
+    def _migrate(self, legacy: Path) -> None:
+        if not legacy.exists():
+            return
+        self._rewrite = True   # the first record writes the new format
+        try:
+            with open(legacy, encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        if not isinstance(data, dict):
+            return
+        prev: dict[str, str] | None = None
+        for e in data.get("recent", []):
+            if isinstance(e, dict) and isinstance(e.get("packages"), dict):
+                problems = list(e.get("problems") or [])
+                if prev is None:
+                    self._append(Entry(e.get("ts"), problems, keyframe=dict(e["packages"])))
+                else:
+                    self._append(Entry(e.get("ts"), problems, *_delta(prev, e["packages"])))
+                prev = self._head = e["packages"]
+        clean = data.get("last_clean")
+        if isinstance(clean, dict) and isinstance(clean.get("packages"), dict):
+            self.pinned = {"ts": clean.get("ts"), "packages": clean["packages"], "problems": []}
+
+    def _reset(self) -> None:
+        self.entries, self.pinned, self._head, self._rewrite = [], None, {}, True
+        self.index = {}
+
+    # -- bookkeeping -------------------------------------------------------- #
+
+    def _append(self, entry: Entry, seq: int | None = None) -> None:
+        """Number the entry, add it, and bring the problem index up to date:
+        O(problem ids on record), not O(history)."""
+        entry.seq = self._next_seq if seq is None else int(seq)
+        self._next_seq = entry.seq + 1
+        self._since_key = 0 if entry.keyframe is not None else self._since_key + 1
+        previous = self.entries[-1].seq if self.entries else None
+        self.entries.append(entry)
+        present = set(entry.problems)
+        for pid, seen in self.index.items():
+            if pid not in present:
+                seen.last_absent = entry.seq
+        for pid in present:
+            seen = self.index.get(pid)
+            if seen is None:
+                self.index[pid] = Seen(entry.seq, entry.ts, entry.seq, entry.ts, previous)
+            elif entry.seq >= seen.last_seen:
+                seen.last_seen, seen.last_ts = entry.seq, entry.ts
+
+    def _touch(self, ts: str) -> None:
+        last = self.entries[-1]
+        last.ts = ts
+        for pid in last.problems:
+            self.index[pid].last_ts = ts
+
+    def _trim(self) -> None:
+        """Apply the retention policy. The new first entry becomes a keyframe,
+        and a clean entry leaving the window is pinned if no retained entry is
+        clean."""
+        cut = max(len(self.entries) - self.keep, 0)
+        if self.max_age_days is not None:
+            oldest = datetime.now(timezone.utc) - timedelta(days=self.max_age_days)
+            while cut < len(self.entries) - 1 and _before(self.entries[cut].ts, oldest):
+                cut += 1
+        if not cut:
+            return
+        if all(e.problems for e in self.entries[cut:]):
+            clean = next((i for i in range(cut - 1, -1, -1) if not self.entries[i].problems), None)
+            if clean is not None:
+                self.pinned = self.snapshot(clean)
+        first = self.entries[cut]
+        if first.keyframe is None:
+            first.keyframe = self.packages(cut)
+            first.set, first.removed = {}, ()
+        del self.entries[:cut]
+
+
+def _line(e: Entry, prev_problems: list[str] | None) -> dict:
+    if e.keyframe is not None:
+        return {"t": "base", "n": e.seq, "ts": e.ts, "packages": e.keyframe, "problems": e.problems}
+    line: dict = {"t": "delta", "ts": e.ts}
+    if e.set:
+        line["set"] = e.set
+    if e.removed:
+        line["del"] = list(e.removed)
+    if e.problems != prev_problems:
+        line["problems"] = e.problems
+    return line
+
+
+def _delta(old: dict[str, str], new: dict[str, str]) -> tuple[dict[str, str], tuple[str, ...]]:
+    return ({n: v for n, v in new.items() if old.get(n) != v},
+            tuple(sorted(n for n in old if n not in new)))
+
+
+def _before(ts: str | None, limit: datetime) -> bool:
+    try:
+        moment = datetime.fromisoformat(ts)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment < limit
+    except Exception:
+        return False   # an unreadable timestamp is never the reason to drop history
+
+
+def _gzip_lines(raw, lines: list[dict]) -> None:
+    """Append one gzip member holding `lines` to the open binary file `raw`.
+    No name or mtime in the header: members stay small and deterministic."""
+    with gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as gz:
+        gz.write("".join(json.dumps(line, separators=(",", ":")) + "\n"
+                         for line in lines).encode("utf-8"))
@@ -0,0 +1,347 @@
+"""The time machine's journal in SQLite, for when people want to ask it things.
+
+COMFYDOCTOR_JOURNAL=sqlite switches timemachine.load() to this backend. It
+answers the same questions as journal.Journal - record, last_clean, before,
+snapshot_at, seen, package_history... - from indexed tables instead of a
+replayed log, so "on which scans did torch change?", "how long has this
+problem been present?" and "every state where xformers was 0.0.28" stay
+single queries over years of scans (`comfydoctor history`):
+
+  scans     (seq, ts, clean)                            one row per recorded scan
+  versions  (name, version, since_seq, until_seq)       `name` was at `version` from scan
+                                                        since_seq to until_seq (NULL: still is)
+  problems  (id, since_seq, since_ts, until_seq, until_ts)   the same, per problem id
+  meta      (key, value)                                the pinned last clean state
+
+Versions and problems are intervals, so recording a scan writes only what
+changed - the same O(changes) as the file journal - and one transaction per
+scan. Scan numbers are contiguous. Retention (count and age) deletes old scans
+and the version intervals that no longer cover any; problem intervals are kept,
+so first sightings outlive it, as in the file journal.
+
+The first open of a database with no scans imports the file journal (any of
+its formats). The file is left in place: switching back loses nothing. A
+database that can't be opened is an empty journal that records nothing.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from . import profile
+from .journal import FILENAME, Journal, Seen, _delta
+
+SQLITE_NAME = "env_journal.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    seq   INTEGER PRIMARY KEY,
+    ts    TEXT,
+    clean INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scans_ts ON scans (ts);
+CREATE TABLE IF NOT EXISTS versions (
+    name      TEXT NOT NULL,
+    version   TEXT NOT NULL,
+    since_seq INTEGER NOT NULL,
+    until_seq INTEGER
+);
+CREATE INDEX IF NOT EXISTS versions_name ON versions (name, version);
+CREATE INDEX IF NOT EXISTS versions_span ON versions (since_seq, until_seq);
+CREATE INDEX IF NOT EXISTS versions_open ON versions (until_seq);
+CREATE TABLE IF NOT EXISTS problems (
+    id        TEXT NOT NULL,
+    since_seq INTEGER NOT NULL,
+    since_ts  TEXT,
+    until_seq INTEGER,
+    until_ts  TEXT
+);
+CREATE INDEX IF NOT EXISTS problems_id ON problems (id, since_seq);
+CREATE INDEX IF NOT EXISTS problems_open ON problems (until_seq);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SqliteJournal:
+    """journal.Journal's API over an SQLite database."""
+
+    def __init__(self, path: Path | None, keep: int, max_age_days: float | None = None):
+        self.path = path
+        self.keep = keep
+        self.max_age_days = max_age_days
+        self._db: sqlite3.Connection | None = None
+        self._head: dict[str, str] = {}          # the newest scan's packages...
+        self._present: list[str] = []            # ...and problems
+        self._newest: tuple[int, str | None] | None = None
+
+    @classmethod
+    def load(cls, path: Path | None, keep: int, max_age_days: float | None = None) -> SqliteJournal:
+        j = cls(path, keep, max_age_days)
+        if path is None:
+            return j
+        try:
+            with profile.span("journal load", cat="io"):
+                j._open(path)
+        except Exception:
+            j.close()
+        return j
+
+    @classmethod
+    def open_readonly(cls, path: Path) -> SqliteJournal:
+        """Someone else's journal (fleet.py), to read: no schema, no import,
+        nothing written. Raises when it can't be opened or isn't a journal."""
+        j = cls(path, keep=0)
+        j._db = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True,
+                                check_same_thread=False)
+        try:
+            j._read_head()
+        except Exception:
+            j.close()
+            raise
+        return j
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # -- questions ---------------------------------------------------------- #
+
+    def newest(self) -> int | None:
+        return self._newest[0] if self._newest else None
+
+    def snapshot_at(self, seq: int | None) -> dict | None:
+        if seq is None or self._db is None:
+            return None
+        row = self._db.execute("SELECT ts FROM scans WHERE seq = ?", (seq,)).fetchone()
+        if row is None:
+            return None
+        if seq == self.newest():
+            return {"ts": row[0], "packages": dict(self._head), "problems": list(self._present)}
+        packages = dict(self._db.execute(
+            "SELECT name, version FROM versions WHERE since_seq <= ?1 "
+            "AND (until_seq IS NULL OR until_seq >= ?1)", (seq,)))
+        problems = sorted(r[0] for r in self._db.execute(
+            "SELECT id FROM problems WHERE since_seq <= ?1 "
+            "AND (until_seq IS NULL OR until_seq >= ?1)", (seq,)))
+        return {"ts": row[0], "packages": packages, "problems": problems}
+
+    def last_clean(self) -> dict | None:
+        if self._db is None:
+            return None
+        (seq,) = self._db.execute("SELECT MAX(seq) FROM scans WHERE clean = 1").fetchone()
+        if seq is not None:
+            return self.snapshot_at(seq)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'pinned'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def before(self, problems: list[str]) -> int | None:
+        oldest = self._oldest()
+        best = None
+        for pid in problems:
+            seen = self.seen(pid)
+            seq = seen.last_absent if seen else self.newest()
+            if seq is not None and oldest is not None and seq >= oldest \
+                    and (best is None or seq > best):
+                best = seq
+        return best
+
+    def span(self) -> tuple[int, str | None]:
+        if self._db is None:
+            return 0, None
+        (count,) = self._db.execute("SELECT COUNT(*) FROM scans").fetchone()
+        row = self._db.execute("SELECT ts FROM scans ORDER BY seq LIMIT 1").fetchone()
+        return count, row[0] if row else None
+
+    def seen(self, problem_id: str) -> Seen | None:
+        if self._db is None:
+            return None
+        rows = self._db.execute(
+            "SELECT since_seq, since_ts, until_seq, until_ts FROM problems "
+            "WHERE id = ? ORDER BY since_seq", (problem_id,)).fetchall()
+        return self._seen(rows) if rows else None
+
+    def problem_index(self) -> dict[str, Seen]:
+        if self._db is None:
+            return {}
+        spans: dict[str, list] = {}
+        for pid, *row in self._db.execute(
+                "SELECT id, since_seq, since_ts, until_seq, until_ts FROM problems "
+                "ORDER BY id, since_seq"):
+            spans.setdefault(pid, []).append(row)
+        return {pid: self._seen(rows) for pid, rows in spans.items()}
+
+    def count_with(self, problem_id: str) -> int:
+        oldest, newest = self._oldest(), self.newest()
+        if self._db is None or oldest is None:
+            return 0
+        (n,) = self._db.execute(
+            "SELECT SUM(MIN(COALESCE(until_seq, :n), :n) - MAX(since_seq, :o) + 1) FROM problems "
+            "WHERE id = :id AND COALESCE(until_seq, :n) >= :o",
+            {"n": newest, "o": oldest, "id": problem_id}).fetchone()
+        return n or 0
+
+    def package_history(self, name: str) -> list[dict]:
+        oldest, newest = self._oldest(), self.newest()
+        if self._db is None or oldest is None:
+            return []
+        out: list[dict] = []
+        cursor = oldest
+        for version, since, until in self._db.execute(
+                "SELECT version, since_seq, until_seq FROM versions WHERE name = ?1 "
+                "AND COALESCE(until_seq, ?2) >= ?3 ORDER BY since_seq", (name, newest, oldest)):
+            start = max(since, oldest)
+            if start > cursor:
+                out.append({"seq": cursor, "version": None})   # not installed in between
+            out.append({"seq": start, "version": version})
+            cursor = (newest if until is None else until) + 1
+        if cursor <= newest:
+            out.append({"seq": cursor, "version": None})
+        ts = dict(self._db.execute(
+            f"SELECT seq, ts FROM scans WHERE seq IN ({','.join('?' * len(out))})",
+            [c["seq"] for c in out]))
+        for c in out:
+            c["ts"] = ts.get(c["seq"])
+        return out
+
+    # -- recording ---------------------------------------------------------- #
+
+    def record(self, ts: str, packages: dict[str, str], problems: list[str]) -> None:
+        if self._db is None:
+            return
+        try:
+            with profile.span("journal append", cat="io"), self._db:
+                state = self._record(ts, packages, problems)
+                self._trim(state[2][0])
+        except Exception:
+            return  # a journal that can't be written is just a missing snapshot
+        # Only once the transaction is in: a rolled-back scan never happened.
+        self._head, self._present, self._newest = state
+
+    def _record(self, ts: str, packages: dict[str, str], problems: list[str],
+                seq: int | None = None) -> tuple[dict[str, str], list[str], tuple[int, str | None]]:
+        """Write one scan. Returns the journal's new (head, present, newest),
+        for the caller to take on once the transaction commits."""
+        db = self._db
+        newest = self._newest
+        # Unchanged since the newest scan: just move its timestamp (see
+        # Journal.record for why both packages and problems must match).
+        if newest and self._present == problems and self._head == packages:
+            db.execute("UPDATE scans SET ts = ? WHERE seq = ?", (ts, newest[0]))
+            return self._head, self._present, (newest[0], ts)
+        prev = newest[0] if newest else None
+        if seq is None:
+            seq = prev + 1 if prev is not None else 0
+        db.execute("INSERT INTO scans (seq, ts, clean) VALUES (?, ?, ?)", (seq, ts, int(not problems)))
+        changed, removed = _delta(self._head, packages)
+        db.executemany("UPDATE versions SET until_seq = ? WHERE name = ? AND until_seq IS NULL",
+                       [(prev, n) for n in (*changed, *removed) if n in self._head])
+        db.executemany("INSERT INTO versions (name, version, since_seq) VALUES (?, ?, ?)",
+                       [(n, v, seq) for n, v in changed.items()])
+        now, before = set(problems), set(self._present)
+        db.executemany("UPDATE problems SET until_seq = ?, until_ts = ? "
+                       "WHERE id = ? AND until_seq IS NULL",
+                       [(prev, newest[1] if newest else None, pid) for pid in before - now])
+        db.executemany("INSERT INTO problems (id, since_seq, since_ts) VALUES (?, ?, ?)",
+                       [(pid, seq, ts) for pid in sorted(now - before)])
+        return dict(packages), list(problems), (seq, ts)
+
+    def _trim(self, newest: int) -> None:
+        """Retention, as in the file journal: the newest `keep` scans, none
+        older than `max_age_days`, the newest always kept, the last clean
+        state pinned when it leaves. `newest` is the scan just written."""
+        oldest = self._oldest()
+        cut = newest - self.keep + 1
+        if self.max_age_days is not None:
+            # Timestamps are timemachine's UTC isoformat: they sort as text.
+            limit = (datetime.now(timezone.utc)
+                     - timedelta(days=self.max_age_days)).isoformat(timespec="seconds")
+            (young,) = self._db.execute("SELECT MIN(seq) FROM scans WHERE ts >= ?", (limit,)).fetchone()
+            cut = max(cut, newest if young is None else young)
+        if cut <= oldest:
+            return
+        clean_kept = self._db.execute("SELECT 1 FROM scans WHERE clean = 1 AND seq >= ?",
+                                      (cut,)).fetchone()
+        if not clean_kept:
+            (clean,) = self._db.execute("SELECT MAX(seq) FROM scans WHERE clean = 1 AND seq < ?",
+                                        (cut,)).fetchone()
+            if clean is not None:
+                self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pinned', ?)",
+                                 (json.dumps(self.snapshot_at(clean)),))
+        self._db.execute("DELETE FROM scans WHERE seq < ?", (cut,))
+        self._db.execute("DELETE FROM versions WHERE until_seq < ?", (cut,))
+
+    # -- plumbing ----------------------------------------------------------- #
+
+    def _open(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._db = sqlite3.connect(str(path), check_same_thread=False)
+        db.executescript(_SCHEMA)
+        if not self._read_head():
+            with db:
+                self._import(path.with_name(FILENAME))
+
+    def _read_head(self) -> bool:
+        """Load the newest scan's state. False when there are no scans."""
+        db = self._db
+        row = db.execute("SELECT seq, ts FROM scans ORDER BY seq DESC LIMIT 1").fetchone()
+        if row is None:
+            return False
+        self._newest = (row[0], row[1])
+        self._head = dict(db.execute("SELECT name, version FROM versions WHERE until_seq IS NULL"))
+        self._present = sorted(r[0] for r in db.execute(
+            "SELECT id FROM problems WHERE until_seq IS NULL"))
+        return True
+
+    def _import(self, file_path: Path) -> None:
+        """Bring the file journal's history in, keeping its scan numbers,
+        first sightings and pinned clean state."""
+        old = Journal.load(file_path, self.keep, self.max_age_days)
+        if not old.entries:
+            return
+        # One transaction (see _open): a failed import leaves no journal at all.
+        for i, e in enumerate(old.entries):
+            self._head, self._present, self._newest = \
+                self._record(e.ts, old.packages(i), list(e.problems), seq=e.seq)
+        # Problems first seen before the retained scans: the index has their
+        # first and last sighting, not the gaps in between. One still present
+        # in the oldest retained scan is taken to have been there all along.
+        first, at_first = old.entries[0].seq, set(old.entries[0].problems)
+        for pid, s in old.index.items():
+            if s.first_seen >= first:
+                continue
+            if pid in at_first:
+                self._db.execute("UPDATE problems SET since_seq = ?, since_ts = ? "
+                                 "WHERE id = ? AND since_seq = ?", (s.first_seen, s.first_ts, pid, first))
+            else:
+                gone = s.last_seen < first
+                self._db.execute(
+                    "INSERT INTO problems (id, since_seq, since_ts, until_seq, until_ts) "
+                    "VALUES (?, ?, ?, ?, ?)", (pid, s.first_seen, s.first_ts,
+                                               s.last_seen if gone else first - 1,
+                                               s.last_ts if gone else None))
+        if old.pinned is not None:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pinned', ?)",
+                             (json.dumps(old.pinned),))
+
+    def _oldest(self) -> int | None:
+        if self._db is None:
+            return None
+        (seq,) = self._db.execute("SELECT MIN(seq) FROM scans").fetchone()
+        return seq
+
+    def _seen(self, rows: list) -> Seen:
+        """One problem's intervals, oldest first, as a Seen."""
+        newest = self._newest or (None, None)
+        first_seq, first_ts = rows[0][0], rows[0][1]
+        since, _, until, until_ts = rows[-1]
+        if until is None:   # still present
+            return Seen(first_seq, first_ts, newest[0], newest[1], since - 1 if since > 0 else None)
+        return Seen(first_seq, first_ts, until, until_ts,
+                    newest[0] if newest[0] is not None and newest[0] > until else None)
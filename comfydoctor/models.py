@@ -109,6 +109,16 @@ class ScanResult:
     comfy_runtime: bool     # False when run from the CLI outside ComfyUI
     # Grouped inventory for the Environment view (see facts.py)
     facts: dict[str, Any] = field(default_factory=dict)
+    # Where the time went: [{stage, ms, serial_ms, parts: {job: ms}}], in
+    # order. `serial_ms` is what the stage would have cost run one job at a
+    # time; the probes stage runs its jobs side by side.
+    stages: list[dict[str, Any]] = field(default_factory=list)
+    # The finer breakdown: {spans: [...], by_category: {...}} - every probe,
+    # rule, subprocess and journal read/write (see profile.py).
+    profile: dict[str, Any] = field(default_factory=dict)
+    # The rule groups a partial scan was narrowed to (scan(only=...)); None
+    # for a full scan.
+    only: list[str] | None = None
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -123,8 +133,19 @@ class ScanResult:
             "comfy_runtime": self.comfy_runtime,
             "counts": self.counts(),
             "facts": self.facts,
+            "stages": self.stages,
+            "speedup": self.speedup(),
+            "profile": self.profile,
+            "only": self.only,
         }
 
+    def speedup(self) -> float | None:
+        """Serial-equivalent time over actual time, across every stage."""
+        wall = sum(st["ms"] for st in self.stages)
+        if not wall:
+            return None
+        return round(sum(st["serial_ms"] for st in self.stages) / wall, 2)
+
     def counts(self) -> dict[str, int]:
         out = {s.value: 0 for s in Severity}
         for f in self.findings:
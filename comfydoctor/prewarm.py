@@ -0,0 +1,125 @@
+"""A background scan shortly after ComfyUI starts, so that the first time the
+Doctor tab is opened it is answered from the scan cache instead of waiting
+for a cold scan.
+
+It is careful not to cost anything that matters:
+
+  - it waits PREWARM_DELAY seconds after registration, then for the prompt
+    queue to be empty - it never starts while a render is running or queued.
+    It asks again before every scan stage: a prompt queued mid-scan stops the
+    scan at the next stage, and it goes back to waiting (up to GIVE_UP in all);
+  - the scan is a BACKGROUND job on ComfyDoctor's pool (executor.py): a
+    panel request queued at the same time starts first;
+  - the job scans on a thread of its own at reduced priority (nice NICE on
+    Linux, below-normal on Windows), never on the pool's worker, which would
+    stay niced for the panel's next request. The probe threads it starts
+    inherit that on Linux, and so do the nvidia-smi and torch subprocesses;
+  - if anyone has scanned by then, it does nothing.
+
+Its result is held in the scan cache until it is first served (or the
+fingerprint moves), not just for SCAN_TTL: the panel is usually opened
+minutes after start-up, not seconds.
+
+COMFYDOCTOR_PREWARM=0 turns it off.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+
+from . import executor
+
+PREWARM_DELAY = 20.0   # seconds after register()
+POLL = 5.0             # how often to re-check a busy prompt queue
+GIVE_UP = 600.0        # a queue busy for this long: skip the pre-warm
+NICE = 10
+
+
+def enabled() -> bool:
+    return os.environ.get("COMFYDOCTOR_PREWARM", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def schedule(busy: Callable[[], bool], delay: float = PREWARM_DELAY,
+             poll: float = POLL, give_up: float = GIVE_UP) -> threading.Thread | None:
+    """Start the pre-warm thread. `busy` says whether ComfyUI is executing (or
+    has queued) a prompt; it is polled, never waited on. Returns the thread,
+    or None when pre-warming is turned off."""
+    if not enabled():
+        return None
+    t = threading.Thread(target=_run, args=(busy, delay, poll, give_up), daemon=True,
+                         name="comfydoctor-prewarm")
+    t.start()
+    return t
+
+
+def _run(busy: Callable[[], bool], delay: float, poll: float, give_up: float) -> None:
+    time.sleep(delay)
+    deadline = time.monotonic() + give_up
+    while True:
+        while _is_busy(busy):
+            if time.monotonic() > deadline:
+                return
+            time.sleep(poll)
+
+        from .scan import Cancelled, last
+
+        if last() is not None:
+            return  # somebody opened the panel first; the cache is already warm
+        if time.monotonic() > deadline:
+            return
+        try:
+            job = executor.default().submit(_scan, busy, priority=executor.BACKGROUND)
+        except executor.Busy:
+            time.sleep(poll)   # the panel has the pool; it is warming the cache itself
+            continue
+        try:
+            job.result()
+            return
+        except Cancelled:
+            continue
+        except Exception:
+            return  # a pre-warm that fails is just a cold first open
+
+
+def _scan(busy: Callable[[], bool]) -> None:
+    """The pre-warm's executor job. A nice value can't be raised back without
+    privileges, so the scan runs on a throwaway thread that lowers its own."""
+    from .scan import scan_cached
+
+    with ThreadPoolExecutor(1, thread_name_prefix="comfydoctor-prewarm-scan",
+                            initializer=_lower_priority) as pool:
+        # `busy` is asked again before every stage: a prompt queued mid-scan
+        # stops it there, and _run waits for the queue again.
+        # `hold`: the first panel open is served it past the TTL.
+        pool.submit(scan_cached, cancel=partial(_is_busy, busy), hold=True).result()
+
+
+def _is_busy(busy: Callable[[], bool]) -> bool:
+    try:
+        return bool(busy())
+    except Exception:
+        return False
+
+
+def _lower_priority() -> None:
+    """Lower the calling thread's scheduling priority, best effort."""
+    try:
+        if sys.platform.startswith("linux"):
+            # On Linux a thread id is a valid PRIO_PROCESS target and the nice
+            # value is per thread; threads and processes started from here
+            # inherit it. Never raise it: that needs privileges.
+            tid = threading.get_native_id()
+            os.setpriority(os.PRIO_PROCESS, tid, max(os.getpriority(os.PRIO_PROCESS, tid), NICE))
+        elif os.name == "nt":
+            import ctypes
+
+            k = ctypes.windll.kernel32
+            k.SetThreadPriority(k.GetCurrentThread(), -1)   # THREAD_PRIORITY_BELOW_NORMAL
+    except Exception:
+        pass
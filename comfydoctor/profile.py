@@ -0,0 +1,168 @@
+"""Where did the scan's time go?
+
+`duration_ms` is one number. When a scan takes 8 s on somebody's render node
+the question is always *which* part: nvidia-smi, the torch subprocess, the
+dist-info reads, a slow rule, the journal. Every one of those runs inside a
+`span()`, and the scan collects the spans into a Profile that ships with the
+result (ScanResult.profile), prints as a table (`--profile`) and exports as a
+Chrome trace-event file (`--trace`) for chrome://tracing or ui.perfetto.dev.
+
+Recording is always on during a scan - a few dozen spans cost microseconds -
+and is a no-op everywhere else, so instrumented code never has to care whether
+anyone is listening. The active profile travels in a ContextVar; work handed
+to another thread must be started with `contextvars.copy_context().run` (see
+`propagate`) for its spans to land in the right profile.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+_ACTIVE: contextvars.ContextVar[Profile | None] = contextvars.ContextVar(
+    "comfydoctor_profile", default=None)
+
+# Set by executor.py around each job: (queued at, started at, pool name).
+_QUEUED: contextvars.ContextVar[tuple[float, float, str] | None] = contextvars.ContextVar(
+    "comfydoctor_queued", default=None)
+
+
+class Profile:
+    """Spans recorded during one scan. Thread-safe to add to.
+
+    Made inside an executor job, the profile starts when the job was queued,
+    with the time spent waiting as its first span ("queue wait", cat "queue").
+    """
+
+    def __init__(self) -> None:
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans: list[dict[str, Any]] = []
+        queued_at = _QUEUED.get()
+        if queued_at is not None:
+            self._t0 = queued_at[0]
+            self.add("queue wait", "queue", queued_at[0], queued_at[1], {"executor": queued_at[2]})
+
+    def add(self, name: str, cat: str, start: float, end: float, args: dict | None = None) -> None:
+        t = threading.current_thread()
+        span = {
+            "name": name,
+            "cat": cat,
+            "start_ms": round((start - self._t0) * 1000, 3),
+            "ms": round((end - start) * 1000, 3),
+            "thread": t.name,
+        }
+        if args:
+            span["args"] = args
+        with self._lock:
+            self._spans.append(span)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            spans = sorted(self._spans, key=lambda s: s["start_ms"])
+        return {"spans": spans, "by_category": _by_category(spans)}
+
+
+@contextmanager
+def recording(profile: Profile) -> Iterator[Profile]:
+    """Make `profile` the one spans are recorded into, for this context."""
+    token = _ACTIVE.set(profile)
+    try:
+        yield profile
+    finally:
+        _ACTIVE.reset(token)
+
+
+@contextmanager
+def queued(queued_at: float, started_at: float, executor: str) -> Iterator[None]:
+    """Mark the block as a job that waited in `executor`'s queue from
+    `queued_at` to `started_at` (perf_counter times)."""
+    token = _QUEUED.set((queued_at, started_at, executor))
+    try:
+        yield
+    finally:
+        _QUEUED.reset(token)
+
+
+@contextmanager
+def span(name: str, cat: str = "scan", **args: Any) -> Iterator[None]:
+    """Time the block into the active profile; free when there is none."""
+    profile = _ACTIVE.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, cat, start, time.perf_counter(), args or None)
+
+
+def propagate(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """`fn`, bound to the caller's context - hand this, not `fn`, to a thread
+    pool so that spans inside it are recorded. Each call runs in its own copy:
+    a Context can't be entered by two threads at once."""
+    ctx = contextvars.copy_context()
+
+    def run(*a: Any, **kw: Any) -> Any:
+        return ctx.copy().run(fn, *a, **kw)
+
+    return run
+
+
+def _by_category(spans: list[dict]) -> dict[str, float]:
+    """Total time per category. Spans of one category never nest, so these
+    add up; categories do nest (a subprocess inside a probe), so they don't."""
+    out: dict[str, float] = {}
+    for s in spans:
+        out[s["cat"]] = round(out.get(s["cat"], 0.0) + s["ms"], 3)
+    return out
+
+
+# --------------------------------------------------------------------------- #
+# Output
+# --------------------------------------------------------------------------- #
+
+def chrome_trace(profile: dict[str, Any]) -> dict[str, Any]:
+    """A profile (Profile.to_dict() / ScanResult.profile) in the Chrome
+    trace-event format: one complete ("X") event per span, one track per
+    thread, timestamps in microseconds."""
+    pid = os.getpid()
+    tids: dict[str, int] = {}
+    events: list[dict[str, Any]] = []
+    for s in profile.get("spans", []):
+        tid = tids.setdefault(s["thread"], len(tids) + 1)
+        events.append({
+            "name": s["name"],
+            "cat": s["cat"],
+            "ph": "X",
+            "ts": round(s["start_ms"] * 1000, 1),
+            "dur": round(s["ms"] * 1000, 1),
+            "pid": pid,
+            "tid": tid,
+            "args": s.get("args", {}),
+        })
+    for thread, tid in tids.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                       "args": {"name": thread}})
+    events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                   "args": {"name": "comfydoctor scan"}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def format_table(profile: dict[str, Any], slowest: int = 15) -> list[str]:
+    """The profile as plain lines for a terminal: totals per category, then
+    the slowest individual spans."""
+    spans = profile.get("spans", [])
+    lines = ["Time by category (categories nest, so these overlap):"]
+    for cat, ms in sorted(profile.get("by_category", {}).items(), key=lambda kv: -kv[1]):
+        lines.append(f"  {cat:<12} {ms:10.1f} ms")
+    lines.append("")
+    lines.append(f"Slowest {min(slowest, len(spans))} spans:")
+    for s in sorted(spans, key=lambda s: -s["ms"])[:slowest]:
+        lines.append(f"  {s['ms']:10.1f} ms  {s['cat']:<10} {s['name']}  [{s['thread']}]")
+    return lines
@@ -7,14 +7,32 @@ safely and make a call.
 
 Keeping them as small independent functions means each one can be tested against
 a captured snapshot of a broken machine, without needing a broken machine.
+
+A rule may declare which parts of the Context it reads:
+
+    @rule(reads=("env", "inv"))
+
+Inside ComfyUI the panel re-scans after every fix, and usually only one input
+moved (a node was added; the GPU was not). `run_all(ctx, incremental=True)`
+keeps each rule's findings from the previous run and re-runs only the rules
+whose declared inputs changed since. A rule that declares nothing, or that
+reads "live" state the Context doesn't hold (free disk, RAM, os.environ),
+runs every time.
+
+The same declarations drive partial scans: `select(["torch_stack"])` names
+the rules a selector covers, and `inputs_of` tells the scan which probes those
+rules need - so a torch-only scan never surveys custom nodes.
 """
 
 from __future__ import annotations
 
+import json
+import threading
 import traceback
 from dataclasses import dataclass
-from typing import Callable, Iterable
+from typing import Any, Callable, Iterable
 
+from .. import profile
 from ..custom_nodes import NodeSurvey
 from ..env import Environment
 from ..gpu import GPUInfo
@@ -39,25 +57,129 @@ Rule = Callable[[Context], Iterable[Finding]]
 
 _RULES: list[tuple[str, Rule]] = []
 
+# What a rule may declare it reads: the four Context fields, plus "live" for
+# state read at call time that no Context field holds.
+INPUTS = ("env", "gpu", "inv", "nodes", "live")
+
+# rule name -> its declared inputs; None = undeclared, always re-run.
+_READS: dict[str, frozenset[str] | None] = {}
+
+# rule name -> (input fingerprints it last ran against, the findings it gave).
+_PREVIOUS: dict[str, tuple[dict[str, Any], list[Finding]]] = {}
+_PREVIOUS_LOCK = threading.Lock()
 
-def rule(fn: Rule) -> Rule:
-    _RULES.append((fn.__name__, fn))
-    return fn
 
+def rule(fn: Rule | None = None, *, reads: Iterable[str] | None = None):
+    """Register a rule. Bare `@rule`, or `@rule(reads=(...))` naming the
+    Context inputs it depends on (see INPUTS)."""
+    if reads is not None:
+        reads = frozenset(reads)
+        unknown = reads - set(INPUTS)
+        if unknown:
+            raise ValueError(f"unknown rule input(s): {', '.join(sorted(unknown))}")
 
-def run_all(ctx: Context) -> list[Finding]:
+    def register(fn: Rule) -> Rule:
+        _RULES.append((fn.__name__, fn))
+        _READS[fn.__name__] = reads
+        return fn
+
+    return register(fn) if fn is not None else register
+
+
+def _modules() -> dict[str, Any]:
     # Import for side effect: each module registers its rules on import.
-    from . import attention, node_health, opportunities, packages, system, torch_stack  # noqa: F401
+    from . import attention, node_health, opportunities, packages, system, torch_stack
+
+    return {m.__name__.rsplit(".", 1)[-1]: m
+            for m in (attention, node_health, opportunities, packages, system, torch_stack)}
+
+
+def select(only: Iterable[str]) -> set[str]:
+    """The names of the rules `only` covers. Each selector is a rule module
+    ("torch_stack") or a report category ("PyTorch"), case-insensitive.
+    Raises ValueError naming anything that matches neither."""
+    by_key: dict[str, str] = {}
+    for short, mod in _modules().items():
+        by_key[short.lower()] = short
+        if getattr(mod, "CAT", None):
+            by_key[mod.CAT.lower()] = short
+    wanted, unknown = set(), []
+    for sel in only:
+        short = by_key.get(sel.strip().lower())
+        if short is None:
+            unknown.append(sel)
+        else:
+            wanted.add(short)
+    if unknown:
+        raise ValueError(
+            f"unknown rule group(s): {', '.join(unknown)} "
+            f"(choose from {', '.join(sorted(_modules()))})")
+    return {name for name, fn in _RULES if _group(fn) in wanted}
+
+
+def groups_of(names: Iterable[str]) -> list[str]:
+    """The rule modules the named rules live in, sorted."""
+    names = set(names)
+    return sorted({_group(fn) for name, fn in _RULES if name in names})
+
+
+def _group(fn: Rule) -> str:
+    return fn.__module__.rsplit(".", 1)[-1]
+
+
+def inputs_of(names: Iterable[str]) -> set[str]:
+    """Everything the named rules read. A rule that never declared what it
+    reads might read anything."""
+    _modules()
+    out: set[str] = set()
+    for name in names:
+        reads = _READS.get(name)
+        out |= set(INPUTS) if reads is None else reads
+    return out
+
+
+def names() -> list[str]:
+    """Every rule, in the order run_all runs them."""
+    _modules()
+    return [name for name, _ in _RULES]
+
+
+def run_all(ctx: Context, incremental: bool = False, only: set[str] | None = None,
+            on_rule: Callable[[str, list[Finding]], None] | None = None) -> list[Finding]:
+    """Every rule's findings, sorted - or, given `only` (see select()), just
+    those rules' findings. `incremental` reuses a rule's findings from the
+    previous incremental run when none of its declared inputs has changed;
+    each rule that does run records why in its profile span. `on_rule` is
+    told each rule's findings as soon as it has them."""
+    _modules()
+
+    seen = _fingerprints(ctx) if incremental else {}
+    with _PREVIOUS_LOCK:
+        previous = dict(_PREVIOUS) if incremental else {}
 
     findings: list[Finding] = []
+    kept: dict[str, tuple[dict[str, Any], list[Finding]]] = {}
     for name, fn in _RULES:
+        if only is not None and name not in only:
+            continue
+        reads = _READS.get(name)
+        reason = _rerun_reason(reads, previous.get(name), seen) if incremental else "full run"
+        if reason is None:
+            kept[name] = previous[name]
+            findings.extend(previous[name][1])
+            if on_rule:
+                on_rule(name, previous[name][1])
+            continue
+        out: list[Finding] = []
         try:
-            findings.extend(fn(ctx) or [])
+            with profile.span(name, cat="rule", module=_group(fn),
+                              reason=reason):
+                out.extend(fn(ctx) or [])
         except Exception:
             # A rule that crashes is a bug in ComfyDoctor, not in the user's
             # environment. Say so plainly rather than silently dropping a check
             # and letting them believe that area is healthy.
-            findings.append(Finding(
+            out.append(Finding(
                 id=f"internal.rule_failed.{name}",
                 severity=Severity.INFO,
                 category="ComfyDoctor",
@@ -65,11 +187,68 @@ def run_all(ctx: Context) -> list[Finding]:
                 detail=traceback.format_exc(limit=3),
                 impact="That one check was skipped. Everything else in this report is still valid.",
             ))
+        if incremental and reads is not None:
+            kept[name] = ({k: seen[k] for k in reads if k in seen}, out)
+        findings.extend(out)
+        if on_rule:
+            on_rule(name, out)
+
+    if incremental:
+        with _PREVIOUS_LOCK:
+            if only is None:
+                _PREVIOUS.clear()
+            else:
+                # A partial run says nothing about the rules it skipped.
+                for name in only:
+                    _PREVIOUS.pop(name, None)
+            _PREVIOUS.update(kept)
     findings.sort(key=lambda f: (f.severity.rank, f.category, f.id))
     return findings
 
 
-def rule_count() -> int:
-    from . import attention, node_health, opportunities, packages, system, torch_stack  # noqa: F401
+def _rerun_reason(reads: frozenset[str] | None, previous: tuple | None,
+                  seen: dict[str, Any]) -> str | None:
+    """Why this rule has to run again - or None if its last findings stand."""
+    if reads is None:
+        return "undeclared inputs"
+    if "live" in reads:
+        return "reads live state"
+    if previous is None:
+        return "first run"
+    changed = [k for k in sorted(reads) if previous[0].get(k) != seen[k]]
+    return f"{', '.join(changed)} changed" if changed else None
+
 
+class _Same:
+    """Equal only to a wrapper around the very same object. The inventory is
+    kept between scans while nothing under the site dirs moves (see scan.py),
+    so identity is exactly "unchanged" - and far cheaper than comparing it."""
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Same) and other.obj is self.obj
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+def _fingerprints(ctx: Context) -> dict[str, Any]:
+    # env, gpu and the node survey are small and re-probed every scan (which
+    # nodes loaded is re-checked even on a kept survey): compare by content.
+    def content(obj: Any) -> str:
+        return json.dumps(obj.to_dict(), sort_keys=True, default=str)
+
+    return {
+        "env": content(ctx.env),
+        "gpu": content(ctx.gpu),
+        "inv": _Same(ctx.inv),
+        "nodes": content(ctx.nodes),
+    }
+
+
+def rule_count() -> int:
+    _modules()
     return len(_RULES)
@@ -18,7 +18,7 @@ import sys
 from typing import Iterator
 
 from .. import remedy
-from ..inventory import requirement_pins, satisfies
+from ..inventory import canonicalize_name, satisfies
 from ..models import Finding, Severity
 from . import Context, rule
 
@@ -47,7 +47,7 @@ def _mm(v: str | None) -> str | None:
     return f"{parts[0]}.{parts[1]}" if len(parts) >= 2 else v
 
 
-@rule
+@rule(reads=("env", "inv"))
 def abi_pin_mismatch(ctx: Context) -> Iterator[Finding]:
     torch_d = ctx.inv.get("torch")
     if not torch_d:
@@ -58,7 +58,7 @@ def abi_pin_mismatch(ctx: Context) -> Iterator[Finding]:
         if not dist:
             continue
 
-        pins = requirement_pins(dist, "torch")
+        pins = [p.specifier for p in ctx.inv.pins_on("torch") if p.dist == canonicalize_name(pkg)]
         for spec in pins:
             ok = satisfies(torch_d.version, spec)
             if ok is not False:
@@ -183,7 +183,7 @@ def _ships_windows_binaries(dist_name: str) -> bool:
         return False
 
 
-@rule
+@rule(reads=("env", "inv"))
 def triton_on_windows(ctx: Context) -> Iterator[Finding]:
     """`triton` proper has no Windows wheels (as of 2026). Windows users need
     triton-windows.
@@ -240,7 +240,7 @@ _ATTENTION_FLAGS = (
 )
 
 
-@rule
+@rule(reads=("gpu", "inv", "nodes"))
 def attention_summary(ctx: Context) -> Iterator[Finding]:
     """Which attention speed-ups exist on this machine, and — the part everyone
     misses — whether ComfyUI is actually set to use them. Installing one changes
@@ -19,7 +19,7 @@ from . import Context, rule
 CAT = "Custom nodes"
 
 
-@rule
+@rule(reads=("env", "inv", "nodes"))
 def failed_imports(ctx: Context) -> Iterator[Finding]:
     """Nodes ComfyUI tried to load and couldn't - joined to *why*.
 
@@ -90,7 +90,7 @@ def failed_imports(ctx: Context) -> Iterator[Finding]:
         )
 
 
-@rule
+@rule(reads=("env", "inv", "nodes"))
 def node_requirements_unmet(ctx: Context) -> Iterator[Finding]:
     """Nodes that *did* load but whose requirements aren't actually met.
 
@@ -144,7 +144,7 @@ def node_requirements_unmet(ctx: Context) -> Iterator[Finding]:
         )
 
 
-@rule
+@rule(reads=("inv", "nodes"))
 def irreconcilable_pins(ctx: Context) -> Iterator[Finding]:
     """Two nodes whose version demands have no overlap. No install satisfies both.
 
@@ -189,7 +189,7 @@ def irreconcilable_pins(ctx: Context) -> Iterator[Finding]:
         )
 
 
-@rule
+@rule(reads=("nodes",))
 def nodes_that_can_break_torch(ctx: Context) -> Iterator[Finding]:
     """Custom nodes whose requirements.txt lists torch.
 
@@ -239,7 +239,7 @@ def nodes_that_can_break_torch(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("nodes",))
 def node_inventory(ctx: Context) -> Iterator[Finding]:
     total = len([n for n in ctx.nodes.nodes if not n.disabled])
     if not total:
@@ -44,7 +44,7 @@ def _compute_capability(ctx: Context) -> float:
         return 0.0
 
 
-@rule
+@rule(reads=("env", "gpu", "inv"))
 def sage_attention(ctx: Context) -> Iterator[Finding]:
     """SageAttention is the single biggest free win for most ComfyUI users."""
     if not _gpu_healthy(ctx):
@@ -91,7 +91,7 @@ def sage_attention(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("gpu", "inv", "nodes"))
 def sage_installed_but_off(ctx: Context) -> Iterator[Finding]:
     """The saddest configuration: the speed-up installed, sitting idle.
 
@@ -137,7 +137,7 @@ def sage_installed_but_off(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("env", "gpu", "inv"))
 def triton_for_compile(ctx: Context) -> Iterator[Finding]:
     if not _gpu_healthy(ctx):
         return
@@ -171,7 +171,7 @@ def triton_for_compile(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("env", "gpu", "inv"))
 def onnx_gpu_for_face_nodes(ctx: Context) -> Iterator[Finding]:
     """insightface on CPU onnxruntime is the classic 'why is face-swap so slow'."""
     if not _gpu_healthy(ctx):
@@ -217,7 +217,7 @@ def onnx_gpu_for_face_nodes(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("gpu", "live"))
 def cuda_malloc_fragmentation(ctx: Context) -> Iterator[Finding]:
     """A free fix for a whole class of 'out of memory' that isn't really OOM."""
     import os
@@ -261,7 +261,7 @@ def cuda_malloc_fragmentation(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("gpu",))
 def bf16_capable(ctx: Context) -> Iterator[Finding]:
     if not _gpu_healthy(ctx):
         return
@@ -48,7 +48,7 @@ _NOISY_MODULES = {
 }
 
 
-@rule
+@rule(reads=("env", "gpu", "inv"))
 def broken_dependencies(ctx: Context) -> Iterator[Finding]:
     """The in-process equivalent of `pip check`, but it explains itself.
 
@@ -73,8 +73,6 @@ def broken_dependencies(ctx: Context) -> Iterator[Finding]:
     for u in ctx.inv.unsatisfied:
         by_target[u["target"]].append(u)
 
-    from ..inventory import requirement_pins
-
     for target, items in sorted(by_target.items(), key=lambda kv: -len(kv[1])):
         complainers = sorted({u["dist"] for u in items})
         installed = ctx.inv.version(target)
@@ -95,11 +93,10 @@ def broken_dependencies(ctx: Context) -> Iterator[Finding]:
         # is why the remedy also says that doing nothing is a valid choice on a
         # working machine.)
         bystander_pins: list[tuple[str, str]] = []
-        for name, dist in ctx.inv.dists.items():
-            if name == target or name in complainers:
+        for pin in ctx.inv.pins_on(target):
+            if pin.dist == target or pin.dist in complainers:
                 continue
-            for pin in requirement_pins(dist, target):
-                bystander_pins.append((name, pin))
+            bystander_pins.append((pin.dist, pin.specifier))
 
         if bystander_pins and not missing:
             shown = sorted({n for n, _ in bystander_pins})
@@ -191,9 +188,14 @@ def _combined_specifier(specs: list[str]) -> str:
     try:
         from packaging.specifiers import SpecifierSet
 
+        from ..inventory import specifier_set
+
         combined = SpecifierSet()
         for s in specs:
-            combined &= SpecifierSet(s)
+            one = specifier_set(s)
+            if one is None:
+                return specs[0]
+            combined &= one
         return str(combined)
     except Exception:
         return specs[0]
@@ -212,7 +214,7 @@ _OPENCV_KEEP_ORDER = [
 ]
 
 
-@rule
+@rule(reads=("env", "inv"))
 def opencv_pileup(ctx: Context) -> Iterator[Finding]:
     present = [v for v in OPENCV_VARIANTS if ctx.inv.has(v)]
     if len(present) < 2:
@@ -242,7 +244,7 @@ def opencv_pileup(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("env", "gpu", "inv"))
 def onnxruntime_pileup(ctx: Context) -> Iterator[Finding]:
     present = [v for v in ONNX_VARIANTS if ctx.inv.has(v)]
     if len(present) < 2:
@@ -305,7 +307,7 @@ def onnxruntime_pileup(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("env", "inv"))
 def numpy_abi_break(ctx: Context) -> Iterator[Finding]:
     """numpy 2.x vs packages compiled against numpy 1.x.
 
@@ -322,7 +324,7 @@ def numpy_abi_break(ctx: Context) -> Iterator[Finding]:
     if not v or v.major < 2:
         return
 
-    from ..inventory import requirement_pins, satisfies
+    from ..inventory import satisfies
 
     # 1.26.4 is the final numpy 1.x ever released — a fixed historical fact, so
     # baking it cannot rot. It stands in for "does this spec accept ANY numpy 1?".
@@ -330,16 +332,20 @@ def numpy_abi_break(ctx: Context) -> Iterator[Finding]:
 
     blocked: list[tuple[str, str]] = []       # rejects installed numpy, accepts 1.x
     need_np2: list[tuple[str, str]] = []      # rejects every numpy 1.x
-    for name, dist in ctx.inv.dists.items():
-        for spec in requirement_pins(dist, "numpy"):
-            ok_installed = satisfies(np.version, spec)
-            ok_np1 = satisfies(LAST_NUMPY1, spec)
-            if ok_installed is False and ok_np1 is not False:
-                blocked.append((name, spec))
-                break
-            if ok_np1 is False:
-                need_np2.append((name, spec))
-                break
+    # Only the first deciding pin per dist counts, as it always has.
+    decided: set[str] = set()
+    for pin in ctx.inv.pins_on("numpy"):
+        name, spec = pin.dist, pin.specifier
+        if name in decided:
+            continue
+        ok_installed = satisfies(np.version, spec)
+        ok_np1 = satisfies(LAST_NUMPY1, spec)
+        if ok_installed is False and ok_np1 is not False:
+            blocked.append((name, spec))
+            decided.add(name)
+        elif ok_np1 is False:
+            need_np2.append((name, spec))
+            decided.add(name)
 
     if not blocked:
         return
@@ -404,7 +410,7 @@ def numpy_abi_break(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("env", "gpu", "inv"))
 def shadowed_installs(ctx: Context) -> Iterator[Finding]:
     """The same package installed twice, in two different site directories.
 
@@ -485,7 +491,7 @@ def _shadowed_remedy(ctx: Context, name: str, copies, winner) -> remedy.Remedy:
     )
 
 
-@rule
+@rule(reads=("inv",))
 def contested_module_names(ctx: Context) -> Iterator[Finding]:
     """Two distributions that each OWN the same import name.
 
@@ -21,7 +21,7 @@ CAT = "System"
 PY_SWEET_SPOT = ((3, 10), (3, 13))
 
 
-@rule
+@rule(reads=("env",))
 def python_version(ctx: Context) -> Iterator[Finding]:
     v = sys.version_info[:2]
     lo, hi = PY_SWEET_SPOT
@@ -67,7 +67,7 @@ def python_version(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("env",))
 def interpreter_kind(ctx: Context) -> Iterator[Finding]:
     """Tell people which pip is the right pip. Half of all failed installs are
     'I installed it into a different Python'."""
@@ -91,7 +91,7 @@ def interpreter_kind(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("env",))
 def system_python_warning(ctx: Context) -> Iterator[Finding]:
     if ctx.env.kind != "system":
         return
@@ -117,7 +117,7 @@ def system_python_warning(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("env", "live"))
 def disk_space(ctx: Context) -> Iterator[Finding]:
     """Check the drive ComfyUI is actually on.
 
@@ -153,7 +153,7 @@ def disk_space(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("live",))
 def memory(ctx: Context) -> Iterator[Finding]:
     try:
         import psutil
@@ -180,7 +180,7 @@ def memory(ctx: Context) -> Iterator[Finding]:
         )
 
 
-@rule
+@rule(reads=("gpu",))
 def vram(ctx: Context) -> Iterator[Finding]:
     if not ctx.gpu.torch_devices:
         return
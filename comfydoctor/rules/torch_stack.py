@@ -13,7 +13,7 @@ from . import Context, rule
 CAT = "PyTorch"
 
 
-@rule
+@rule(reads=("env", "gpu"))
 def torch_present(ctx: Context) -> Iterator[Finding]:
     if ctx.gpu.torch_ok:
         return
@@ -32,7 +32,7 @@ def torch_present(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("env", "gpu"))
 def cpu_torch_on_gpu_machine(ctx: Context) -> Iterator[Finding]:
     """The silent killer: a working ComfyUI that is 30x too slow.
 
@@ -101,7 +101,7 @@ def cpu_torch_on_gpu_machine(ctx: Context) -> Iterator[Finding]:
     )
 
 
-@rule
+@rule(reads=("env", "gpu", "inv"))
 def triplet_mismatch(ctx: Context) -> Iterator[Finding]:
     """torch / torchvision / torchaudio must be one matched release.
 
@@ -220,7 +220,7 @@ def triplet_mismatch(ctx: Context) -> Iterator[Finding]:
         )
 
 
-@rule
+@rule(reads=("env", "gpu"))
 def driver_too_old(ctx: Context) -> Iterator[Finding]:
     if not ctx.gpu.has_nvidia_hardware or not ctx.gpu.torch_local_tag:
         return
@@ -287,7 +287,7 @@ def _older_tag(tag: str) -> str:
     return ladder[max(0, i - 1)]
 
 
-@rule
+@rule(reads=("gpu",))
 def torch_healthy(ctx: Context) -> Iterator[Finding]:
     """Say what's *right*, too. A report that only lists problems gives the user
     no way to tell 'checked and fine' from 'never checked'."""
@@ -2,10 +2,17 @@
 
 from __future__ import annotations
 
+import os
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
 from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Callable, Iterable
 
-from . import custom_nodes, env, facts, gpu, inventory, timemachine
+from . import custom_nodes, env, facts, gpu, inventory, profile, rules, timemachine, watch
 from .models import ScanResult, health_score
 from .rules import Context, run_all
 
@@ -13,46 +20,248 @@ from .rules import Context, run_all
 # The browser never sends us a command to run - it sends an id, and we execute
 # only the command we ourselves generated for it. That's the whole security
 # model, and it's why there is no way to turn this panel into a remote shell.
+# The two always change together, under _FLIGHTS_LOCK.
 _LAST: ScanResult | None = None
 _LAST_CTX: Context | None = None
 
 
-def scan() -> ScanResult:
+# Inside ComfyUI (reuse=True) the inventory and node survey are kept between
+# scans, each tagged with its area's change generation (see watch.py) at the
+# moment it was built, and reused until that generation moves.
+# Reuse scans with different `only` are separate flights and run side by side
+# on the executor's threads, so all three are read and written under the lock.
+_WATCH: watch.Watcher | None = None
+_WATCH_KEY: tuple | None = None
+_KEPT: dict[str, tuple[tuple, object]] = {}
+_WATCH_LOCK = threading.Lock()
+
+# The panel and the node ask for a scan far more often than the environment
+# changes. scan_cached() answers from the last result while the environment's
+# fingerprint still matches it and it is younger than the TTL - the TTL is for
+# what no fingerprint sees (free disk, RAM, a GPU that fell off the bus).
+# The start-up pre-warm (prewarm.py) scans long before anyone looks, so its
+# result is held: the first call after it is answered on the fingerprint
+# alone, however old it is, and from then on the TTL applies as usual.
+# Executor workers, the pre-warm and the node all go through it, so it is
+# read and written under _FLIGHTS_LOCK.
+SCAN_TTL = 30.0   # seconds; COMFYDOCTOR_SCAN_TTL overrides, 0 turns caching off
+# (only, fingerprint, at, result, its Context, held)
+_CACHED: tuple[Any, tuple, float, ScanResult, Context | None, bool] | None = None
+
+# Scans in progress, by (reuse, selected rules) - see scan()'s single-flight.
+_FLIGHTS: dict[tuple, _Flight] = {}
+_FLIGHTS_LOCK = threading.Lock()
+_FLIGHT_STATS = {"scans": 0, "coalesced": 0}
+
+
+class Cancelled(Exception):
+    """A scan stopped at a stage boundary because its `cancel` said so."""
+
+
+def scan(workers: int = 0, reuse: bool = False, only: Iterable[str] | None = None,
+         on_event: Callable[[dict], None] | None = None,
+         cancel: Callable[[], bool] | None = None) -> ScanResult:
+    """`workers` > 1 reads the dist-info directories on a thread pool of that
+    size (see inventory.build) - for slow disks and very large environments.
+
+    `reuse` is for long-lived processes (the ComfyUI extension): keep the
+    inventory and node survey from the previous scan while nothing under the
+    site dirs or custom_nodes has changed. The CLI scans once and never asks.
+
+    `only` narrows the scan to some rule groups - rule modules or report
+    categories, e.g. ["torch_stack", "packages"] (see rules.select). Only the
+    probes those rules read are run, and a partial scan is not journaled: the
+    time machine compares whole scans. An unknown group raises ValueError.
+
+    `on_event` streams the scan as it happens (api.py's /scan/stream): it is
+    called, from the scanning threads, with {"event": "probe", "name", "ms"}
+    as each probe finishes and {"event": "rule", "name", "findings"} as each
+    rule does. A streaming scan runs every rule as soon as the probes it reads
+    are in, instead of waiting for all of them - the disk and Python checks
+    don't wait on a slow torch import. The result is the same either way.
+
+    Every stage, probe, rule, subprocess and journal read/write is timed into
+    the result's `profile` (see profile.py).
+
+    Single-flight: a call made while an identical scan (same `reuse` and
+    `only`) is running joins it and gets its result - or its exception -
+    instead of starting a second nvidia-smi, a second torch subprocess and a
+    second journal write. A joiner's `on_event` hears what the scan it joined
+    reports, replayed from the start; if that scan isn't streaming, nothing.
+    `flight_stats()` counts both.
+
+    `cancel` is polled before each stage; when it returns True the scan stops
+    there and raises Cancelled (the pre-warm uses it to get out of a render's
+    way). A stage already running finishes first. Once anyone has joined the
+    scan it is wanted, and `cancel` is no longer asked; a caller arriving after
+    it said stop starts a scan of its own."""
+    selected = rules.select(only) if only is not None else None
+    key = (reuse, frozenset(selected) if selected is not None else None)
+    with _FLIGHTS_LOCK:
+        flight = _FLIGHTS.get(key)
+        leader = flight is None or flight.cancelled
+        if leader:
+            flight = _FLIGHTS[key] = _Flight()
+            _FLIGHT_STATS["scans"] += 1
+        else:
+            _FLIGHT_STATS["coalesced"] += 1
+            flight.joined += 1
+    if on_event is not None:
+        flight.listen(on_event)
+    if not leader:
+        return flight.wait()
+
+    try:
+        prof = profile.Profile()
+        with profile.recording(prof):
+            result = _scan(workers, reuse, selected, flight.emit if on_event is not None else None,
+                           flight.cancel_hook(cancel))
+        result.profile = prof.to_dict()
+        flight.result = result
+        return result
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _FLIGHTS_LOCK:
+            if _FLIGHTS.get(key) is flight:   # not yet replaced after a cancel
+                del _FLIGHTS[key]
+        flight.done.set()
+
+
+def flight_stats() -> dict[str, int]:
+    """Scans actually run, and calls that joined one already running."""
+    with _FLIGHTS_LOCK:
+        return dict(_FLIGHT_STATS)
+
+
+class _Flight:
+    """One scan in progress, and everyone waiting on it."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: ScanResult | None = None
+        self.error: BaseException | None = None
+        self.joined = 0          # callers that joined instead of scanning (under _FLIGHTS_LOCK)
+        self.cancelled = False   # its cancel said stop; nobody joins it now (ditto)
+        self._lock = threading.Lock()
+        self._events: list[dict] = []
+        self._listeners: list[Callable[[dict], None]] = []
+
+    def listen(self, fn: Callable[[dict], None]) -> None:
+        with self._lock:
+            for event in self._events:
+                _tell(fn, event)
+            self._listeners.append(fn)
+
+    def emit(self, event: dict) -> None:
+        with self._lock:
+            self._events.append(event)
+            for fn in self._listeners:
+                _tell(fn, event)
+
+    def cancel_hook(self, cancel: Callable[[], bool] | None) -> Callable[[], bool] | None:
+        if cancel is None:
+            return None
+
+        def hook() -> bool:
+            # Under the lock joins are made under: a caller either joined
+            # before the check, and the scan goes on, or comes after it and
+            # starts a scan of its own instead of joining one that stops.
+            with _FLIGHTS_LOCK:
+                if not self.joined and cancel():
+                    self.cancelled = True
+                return self.cancelled
+        return hook
+
+    def wait(self) -> ScanResult:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _tell(fn: Callable[[dict], None], event: dict) -> None:
+    try:
+        fn(event)
+    except Exception:
+        pass  # a listener that went away must not take the scan, or the others, with it
+
+
+def _scan(workers: int, reuse: bool, selected: set[str] | None,
+          on_event: Callable[[dict], None] | None,
+          cancel: Callable[[], bool] | None = None) -> ScanResult:
     global _LAST, _LAST_CTX
     t0 = time.perf_counter()
+    stages: list[dict] = []
+    needs = rules.inputs_of(selected) if selected is not None else set(rules.INPUTS)
+
+    (e,) = _stage(stages, "environment", [("env", env.detect)], cancel=cancel)
+    if reuse:
+        _watch(e)
 
-    e = env.detect()
-    g = gpu.probe()
-    inv = inventory.build()
-    nodes = custom_nodes.survey(e.custom_nodes_dir)
+    # One requirement cache for the whole scan: the inventory, the node survey
+    # and the rules all parse the same strings, and each only needs doing once.
+    reqs = inventory.RequirementCache()
 
-    ctx = Context(env=e, gpu=g, inv=inv, nodes=nodes)
-    findings = run_all(ctx)
+    # The three probes only need the environment, not each other. The GPU
+    # probe spends seconds waiting on nvidia-smi and a torch subprocess, which
+    # is time the dist-info reads and the node survey can use.
+    jobs = [(job, fn) for job, fn in (
+        ("gpu", gpu.probe),
+        ("inventory", partial(_inventory, workers, reqs, reuse)),
+        ("custom_nodes", partial(_survey, e, reqs, reuse)),
+    ) if _PROBE_INPUT[job] in needs]
+    pipe = _Pipeline(e, selected, reuse, on_event) if on_event is not None else None
+    got = dict(zip([job for job, _ in jobs], _stage(
+        stages, "probes", jobs, on_done=pipe.probed if pipe else None, cancel=cancel))) if jobs else {}
+
+    ctx = _context(e, got)
+    g, inv, nodes = ctx.gpu, ctx.inv, ctx.nodes
+    if pipe is not None:
+        (findings,) = _stage(stages, "rules", [("rules", partial(pipe.finish, ctx))], cat="engine",
+                             cancel=cancel)
+    else:
+        # With reuse, a rule whose inputs haven't moved since the last scan keeps
+        # its findings instead of running again (see rules/__init__.py).
+        (findings,) = _stage(stages, "rules", [("rules", partial(run_all, ctx, reuse, selected))],
+                             cat="engine", cancel=cancel)
 
     # Time machine: when a problem is NEW, say what changed alongside it (the
     # journal on disk still holds the previous state at this point) - then
     # record today's state for next time. Guarded: history must never be able
     # to take down a live diagnosis.
-    try:
-        tm = timemachine.what_changed_finding(e, inv, findings)
-        if tm:
-            findings.append(tm)
-            findings.sort(key=lambda f: (f.severity.rank, f.category, f.id))
-        timemachine.record(e, inv, findings)
-    except Exception:
-        pass
+    if selected is None:
+        t_history = time.perf_counter()
+        with profile.span("history", cat="stage"):
+            try:
+                with closing(timemachine.load(e)) as journal:
+                    tm = timemachine.what_changed_finding(e, inv, findings, journal)
+                    if tm:
+                        findings.append(tm)
+                        findings.sort(key=lambda f: (f.severity.rank, f.category, f.id))
+                    timemachine.record(e, inv, findings, journal)
+            except Exception:
+                pass
+        ms = _ms(time.perf_counter() - t_history)
+        stages.append({"stage": "history", "ms": ms, "serial_ms": ms, "parts": {"history": ms}})
 
-    snapshot = {
-        "environment": e.to_dict(),
-        "gpu": g.to_dict(),
-        "packages": inv.to_dict(),
-        "custom_nodes": nodes.to_dict(),
-    }
+    # Only what was actually probed: a placeholder would read as "nothing
+    # installed".
+    snapshot = {"environment": e.to_dict()}
+    if "gpu" in got:
+        snapshot["gpu"] = g.to_dict()
+    if "inventory" in got:
+        # A partial scan reports the package map without module ownership:
+        # that is a RECORD read per dist, which only a whole scan pays for.
+        snapshot["packages"] = inv.to_dict(modules=None if selected is None else False)
+    if "custom_nodes" in got:
+        snapshot["custom_nodes"] = nodes.to_dict()
 
     # The inventory view: what you have, what you don't, grouped so it reads.
     # This is the half of v1 worth keeping - being able to see your whole stack
     # on one screen - rebuilt so that it is actually correct.
-    facts_block = facts.build(e, g, inv)
+    facts_block = facts.build(e, g, inv) if {"gpu", "inventory"} <= set(got) else {}
 
     result = ScanResult(
         findings=findings,
@@ -62,11 +271,287 @@ def scan() -> ScanResult:
         duration_ms=int((time.perf_counter() - t0) * 1000),
         comfy_runtime=ctx.comfy_runtime,
         facts=facts_block,
+        stages=stages,
+        only=rules.groups_of(selected) if selected is not None else None,
     )
-    _LAST, _LAST_CTX = result, ctx
+    with _FLIGHTS_LOCK:
+        _LAST, _LAST_CTX = result, ctx
     return result
 
 
+def scan_cached(workers: int = 0, only: Iterable[str] | None = None,
+                force: bool = False,
+                on_event: Callable[[dict], None] | None = None,
+                cancel: Callable[[], bool] | None = None,
+                hold: bool = False) -> tuple[ScanResult, bool]:
+    """scan(reuse=True), or the previous result if nothing it was built from
+    has visibly changed. Returns (result, served_from_cache). `force` always
+    scans. `on_event` and `cancel` are passed to scan(); a cached answer sends
+    no events. `hold` (the pre-warm) keeps the new result past the TTL for
+    the first call that is served it."""
+    global _CACHED, _LAST, _LAST_CTX
+    key = tuple(rules.groups_of(rules.select(only))) if only is not None else None
+    fp = fingerprint(env.detect())
+    now = time.monotonic()
+    ttl = _ttl()
+    with _FLIGHTS_LOCK:
+        hit = _CACHED
+        if (not force and hit is not None and hit[0] == key and hit[1] == fp
+                and (now - hit[2] <= ttl or (hit[5] and ttl > 0))):
+            # /fix looks remedies up in _LAST: it must be the result being shown.
+            _LAST, _LAST_CTX = hit[3], hit[4]
+            if hit[5]:
+                _CACHED = hit[:5] + (False,)
+            return hit[3], True
+    result = scan(workers, reuse=True, only=only, on_event=on_event, cancel=cancel)
+    with _FLIGHTS_LOCK:
+        # Another scan may have finished since; then this one's Context is gone.
+        ctx = _LAST_CTX if _LAST is result else None
+        # Stamped with the fingerprint taken BEFORE scanning: a change that
+        # lands mid-scan makes the next call scan again.
+        _CACHED = (key, fp, now, result, ctx, hold)
+    return result, False
+
+
+def fingerprint(e) -> tuple:
+    """Cheap evidence of change: the site dirs', sys.path's and custom_nodes'
+    mtimes (and each node's requirements.txt), how many dist-infos there are,
+    the NVIDIA driver version and the environment variables the rules and the
+    report look at. A few hundred stat calls; no metadata is read. The driver
+    version comes from /proc (Linux); elsewhere only the TTL notices a driver
+    update."""
+    roots = _roots(e)
+    nodes_dir = [str(e.custom_nodes_dir)] if e.custom_nodes_dir else []
+    return (
+        tuple(p or "." for p in sys.path),
+        watch.signature(watch.Area(roots)),
+        watch.signature(watch.Area(nodes_dir, children=True, files=("requirements.txt",))),
+        _dist_info_count(roots),
+        _driver_version(),
+        # hashed: HF_TOKEN is one of them, and this tuple lives in memory
+        hash(tuple(os.environ.get(name) for name, _, _ in facts.ENV_VARS)),
+    )
+
+
+def _dist_info_count(roots: list[str]) -> int:
+    n = 0
+    for root in roots:
+        try:
+            with os.scandir(root) as it:
+                n += sum(1 for entry in it if entry.name.endswith((".dist-info", ".egg-info")))
+        except OSError:
+            continue
+    return n
+
+
+def _driver_version() -> str | None:
+    try:
+        with open("/proc/driver/nvidia/version", encoding="utf-8", errors="replace") as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def _ttl() -> float:
+    try:
+        return float(os.environ.get("COMFYDOCTOR_SCAN_TTL", SCAN_TTL))
+    except ValueError:
+        return SCAN_TTL
+
+
+# Which Context input each probe fills.
+_PROBE_INPUT = {"gpu": "gpu", "inventory": "inv", "custom_nodes": "nodes"}
+
+
+def _context(e, got: dict[str, Any]) -> Context:
+    # A probe that was skipped (a partial scan), or hasn't finished yet (a
+    # streaming scan), is an empty placeholder; no rule that runs reads it.
+    return Context(
+        env=e,
+        gpu=got.get("gpu") or gpu.GPUInfo(),
+        inv=got.get("inventory") or inventory.Inventory(
+            dists={}, duplicates={}, module_owners={}, unsatisfied=[]),
+        nodes=got.get("custom_nodes") or custom_nodes.NodeSurvey(),
+    )
+
+
+class _Pipeline:
+    """A streaming scan's rule runner: judges as the probes come in, and
+    reports every probe and rule to `emit` the moment it is done."""
+
+    def __init__(self, e, selected: set[str] | None, reuse: bool, emit: Callable[[dict], None]):
+        self.e = e
+        self.got: dict[str, Any] = {}
+        self.pending = [n for n in rules.names() if selected is None or n in selected]
+        self.reuse = reuse
+        self.emit = emit
+        self.findings: list = []
+
+    def probed(self, job: str | None, value: Any, secs: float) -> None:
+        if job is not None:
+            self.got[job] = value
+            self.emit({"event": "probe", "name": job, "ms": _ms(secs)})
+        have = {"env", "live", *(_PROBE_INPUT[j] for j in self.got)}
+        self._judge([n for n in self.pending if rules.inputs_of([n]) <= have], _context(self.e, self.got))
+
+    def finish(self, ctx: Context) -> list:
+        self._judge(list(self.pending), ctx)
+        self.findings.sort(key=lambda f: (f.severity.rank, f.category, f.id))
+        return self.findings
+
+    def _judge(self, batch: list[str], ctx: Context) -> None:
+        if not batch:
+            return
+        self.pending = [n for n in self.pending if n not in batch]
+        self.findings.extend(run_all(ctx, self.reuse, set(batch), on_rule=self._rule))
+
+    def _rule(self, name: str, findings: list) -> None:
+        self.emit({"event": "rule", "name": name, "findings": [f.to_dict() for f in findings]})
+
+
+def _stage(stages: list[dict], name: str, jobs: list[tuple[str, Callable[[], Any]]],
+           cat: str = "probe",
+           on_done: Callable[[str | None, Any, float], None] | None = None,
+           cancel: Callable[[], bool] | None = None) -> list:
+    """Run one stage's jobs side by side and record how long it took.
+
+    Results come back in `jobs` order. Each job runs isolated: one raising
+    does not stop the others. Once all have finished, the first exception in
+    `jobs` order is re-raised. That is the one a serial run would have hit
+    first, so a failing probe fails the scan exactly as it always did.
+
+    The stage is one "stage" span in the profile, each job one `cat` span.
+
+    `on_done` is called on this thread: once with job None when every job has
+    been started, then with (job, result, seconds) as each job succeeds.
+
+    Raises Cancelled, before starting anything, when `cancel` returns True.
+    """
+    if cancel is not None and cancel():
+        raise Cancelled(name)
+    t0 = time.perf_counter()
+    with profile.span(name, cat="stage"):
+        if len(jobs) == 1:
+            if on_done:
+                on_done(None, None, 0.0)
+            outcomes = [_timed(jobs[0][1], jobs[0][0], cat)]
+            if on_done and outcomes[0][2] is None:
+                on_done(jobs[0][0], *outcomes[0][:2])
+        else:
+            with ThreadPoolExecutor(len(jobs), thread_name_prefix="comfydoctor-probe") as pool:
+                futures = {pool.submit(profile.propagate(_timed), fn, job, cat): job
+                           for job, fn in jobs}
+                if on_done:
+                    on_done(None, None, 0.0)
+                    for f in as_completed(futures):
+                        value, secs, err = f.result()
+                        if err is None:
+                            on_done(futures[f], value, secs)
+            outcomes = [f.result() for f in futures]
+    parts = {job: _ms(secs) for (job, _), (_, secs, _) in zip(jobs, outcomes)}
+    stages.append({
+        "stage": name,
+        "ms": _ms(time.perf_counter() - t0),
+        "serial_ms": sum(parts.values()),
+        "parts": parts,
+    })
+    for _, _, err in outcomes:
+        if err is not None:
+            raise err
+    return [value for value, _, _ in outcomes]
+
+
+def _timed(fn: Callable[[], Any], name: str, cat: str) -> tuple[Any, float, Exception | None]:
+    t0 = time.perf_counter()
+    with profile.span(name, cat=cat):
+        try:
+            return fn(), time.perf_counter() - t0, None
+        except Exception as exc:
+            return None, time.perf_counter() - t0, exc
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _watch(e) -> None:
+    """Start, or re-aim, the watcher behind reuse=True. Every reuse scan
+    calls this from the thread it runs on, so two flights can get here at
+    once: only one of them starts a watcher."""
+    global _WATCH, _WATCH_KEY
+    roots = _roots(e)
+    nodes_dir = str(e.custom_nodes_dir) if e.custom_nodes_dir else None
+    key = (tuple(roots), nodes_dir)
+    with _WATCH_LOCK:
+        if _WATCH is not None and _WATCH_KEY == key:
+            return
+        if _WATCH is not None:
+            _WATCH.close()
+        _KEPT.clear()
+        _WATCH = watch.Watcher({
+            "site": watch.Area(roots),
+            "nodes": watch.Area([nodes_dir] if nodes_dir else [], children=True,
+                                files=("requirements.txt",)),
+        })
+        _WATCH_KEY = key
+
+
+def _roots(e) -> list[str]:
+    # dist-infos can sit in any sys.path entry, not just the site dirs.
+    path = tuple(p or "." for p in sys.path)
+    return list(dict.fromkeys([*e.site_dirs, *(p for p in path if os.path.isdir(p))]))
+
+
+# Both read the generation BEFORE building: a change that lands mid-build
+# leaves the stored tag behind, so the next scan rebuilds. And both keep what
+# they built only if the watcher they tagged it with is still the one in
+# place: a re-aim mid-build started the generations over.
+
+def _kept(area: str) -> tuple[watch.Watcher, tuple[tuple, object] | None]:
+    with _WATCH_LOCK:
+        return _WATCH, _KEPT.get(area)
+
+
+def _keep(w: watch.Watcher, area: str, tag: tuple, value: object) -> None:
+    with _WATCH_LOCK:
+        if _WATCH is w:
+            _KEPT[area] = (tag, value)
+
+
+# The os.scandir reader: the same answers as importlib.metadata (the parity
+# tests in test_inventory.py hold it to that), over the same search path -
+# sys.path, in sys.path order, since that order decides which copy of a
+# duplicate imports. It hands zips, eggs and egg-infos to importlib.metadata.
+READER = "native"
+
+
+def _inventory(workers: int, reqs: inventory.RequirementCache, reuse: bool) -> inventory.Inventory:
+    if not reuse:
+        return inventory.build(reader=READER, workers=workers, reqs=reqs)
+    # A custom node that appends to sys.path changes what the inventory sees
+    # without touching a single file, so sys.path is part of the tag.
+    w, kept = _kept("inv")
+    tag = (w.generation("site"), tuple(p or "." for p in sys.path))
+    if kept and kept[0] == tag:
+        return kept[1]
+    inv = inventory.build(reader=READER, workers=workers, reqs=reqs)
+    _keep(w, "inv", tag, inv)
+    return inv
+
+
+def _survey(e, reqs: inventory.RequirementCache, reuse: bool) -> custom_nodes.NodeSurvey:
+    if not reuse:
+        return custom_nodes.survey(e.custom_nodes_dir, reqs=reqs)
+    w, kept = _kept("nodes")
+    tag = (w.generation("nodes"),)
+    if kept and kept[0] == tag:
+        custom_nodes.refresh_loaded(kept[1])
+        return kept[1]
+    nodes = custom_nodes.survey(e.custom_nodes_dir, reqs=reqs)
+    _keep(w, "nodes", tag, nodes)
+    return nodes
+
+
 def last() -> ScanResult | None:
     return _LAST
 
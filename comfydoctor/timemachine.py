@@ -26,24 +26,27 @@ Contracts this feature lives under (same as everything else here):
     CPU-wheel trap). Their restore carries the --index-url derived from the
     recorded build tag.
 
-Storage: <comfy_root>/user/comfydoctor/env_journal.json - ComfyUI's user-data
-convention, so it survives extension updates. With no comfy_root (bare CLI in
-an unusual layout) the feature quietly does nothing.
+Storage: <comfy_root>/user/comfydoctor/env_journal.jsonl.gz - ComfyUI's user-data
+convention, so it survives extension updates. It is an append-only log of
+package deltas (journal.py); a scan loads it once (load) and hands that to
+what_changed_finding and record. With no comfy_root (bare CLI in an unusual
+layout) the feature quietly does nothing.
 """
 
 from __future__ import annotations
 
-import json
 import os
-import tempfile
+from contextlib import closing, contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 
 from .env import Environment
-from .inventory import Inventory
+from .inventory import Inventory, canonicalize_name
+from .journal import FILENAME, Journal
 from .models import Finding, Remedy, Severity
 
-MAX_RECENT = 20          # rolling window of snapshots kept
+MAX_RECENT = 5000        # retention: at most this many snapshots...
+MAX_AGE_DAYS = 365       # ...none older than this (the newest is always kept)
 MAX_SHOWN = 12           # diff lines shown before "...and N more"
 TORCH_FAMILY = ("torch", "torchvision", "torchaudio")
 TORCH_INDEX = "https://download.pytorch.org/whl/{tag}"
@@ -57,32 +60,31 @@ CAT = "What changed"
 def journal_path(env: Environment) -> Path | None:
     if not env.comfy_root:
         return None
-    return Path(env.comfy_root) / "user" / "comfydoctor" / "env_journal.json"
+    return Path(env.comfy_root) / "user" / "comfydoctor" / FILENAME
 
 
-def _load(path: Path | None) -> dict:
-    """A journal that can't be read is an empty journal, never a crash."""
-    if path is None:
-        return {}
-    try:
-        with open(path, encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, dict) else {}
-    except Exception:
-        return {}
+def load(env: Environment) -> Journal:
+    """The journal, read once. Pass it to what_changed_finding and record so
+    a scan never reads the file twice. COMFYDOCTOR_JOURNAL=sqlite keeps it in
+    an SQLite database beside the file instead (journal_sqlite.py); both
+    answer the same questions."""
+    path = journal_path(env)
+    if os.environ.get("COMFYDOCTOR_JOURNAL", "").strip().lower() == "sqlite":
+        from .journal_sqlite import SQLITE_NAME, SqliteJournal
 
+        return SqliteJournal.load(path and path.with_name(SQLITE_NAME), MAX_RECENT, MAX_AGE_DAYS)
+    return Journal.load(path, MAX_RECENT, MAX_AGE_DAYS)
 
-def _save(path: Path | None, journal: dict) -> None:
-    if path is None:
+
+@contextmanager
+def _journal(env: Environment, journal: Journal | None):
+    """The caller's journal, or one loaded for this call and closed after it:
+    the SQLite backend holds a connection open until then."""
+    if journal is not None:
+        yield journal
         return
-    try:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(journal, f)
-        os.replace(tmp, str(path))
-    except Exception:
-        pass  # a journal that can't be written is just a missing snapshot
+    with closing(load(env)) as j:
+        yield j
 
 
 def _packages_of(inv: Inventory) -> dict[str, str]:
@@ -128,72 +130,44 @@ def problem_ids(findings: list[Finding]) -> list[str]:
     )
 
 
-def _entries(journal: dict) -> list[dict]:
-    return [e for e in journal.get("recent", []) if isinstance(e, dict)
-            and isinstance(e.get("packages"), dict)]
-
-
-def record(env: Environment, inv: Inventory, findings: list[Finding]) -> None:
+def record(env: Environment, inv: Inventory, findings: list[Finding],
+           journal: Journal | None = None) -> None:
     """Journal this scan. Called at the END of a scan, after the what-changed
     finding has been computed against the PREVIOUS journal state."""
-    path = journal_path(env)
-    if path is None or not inv.dists:
+    if journal_path(env) is None or not inv.dists:
         return
+    # The last fully clean state outlives the rolling window (journal.py pins
+    # it). Nothing consumes it automatically (see reference_point on why the
+    # diff must stay inside the retained window); it is the durable "this
+    # machine was perfect on <date>, here is exactly what it looked like"
+    # record, which is what the user is really asking for when they restore by
+    # hand.
+    with _journal(env, journal) as j:
+        j.record(datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                 _packages_of(inv), problem_ids(findings))
 
-    journal = _load(path)
-    packages = _packages_of(inv)
-    problems = problem_ids(findings)
-    entry = {
-        "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
-        "packages": packages,
-        "problems": problems,
-    }
 
-    recent = _entries(journal)
-    # Back-to-back scans of an unchanged environment just refresh the newest
-    # entry, so idle re-scans can't flush real history out of the window.
-    # Both packages AND problems must match: when a problem appears with no
-    # package change (driver update, edited launch script), the previous entry
-    # is the only proof the machine once ran this exact package set cleanly -
-    # overwriting it would silence broke_without_package_changes after one scan.
-    if recent and recent[-1].get("packages") == packages \
-            and recent[-1].get("problems") == problems:
-        recent[-1] = entry
-    else:
-        recent.append(entry)
-    journal["recent"] = recent[-MAX_RECENT:]
-
-    # The last fully clean state is pinned separately from the rolling window.
-    # Nothing consumes it automatically (see reference_point on why the diff
-    # must stay inside the retained window); it is the durable "this machine
-    # was perfect on <date>, here is exactly what it looked like" record, which
-    # is what the user is really asking for when they restore by hand.
-    if not problems:
-        journal["last_clean"] = entry
-
-    _save(path, journal)
-
-
-def last_clean(env: Environment) -> dict | None:
-    entry = _load(journal_path(env)).get("last_clean")
-    if isinstance(entry, dict) and isinstance(entry.get("packages"), dict):
-        return entry
-    return None
+def last_clean(env: Environment, journal: Journal | None = None) -> dict | None:
+    with _journal(env, journal) as j:
+        return j.last_clean()
 
 
 # --------------------------------------------------------------------------- #
 # Finding the moment a problem appeared
 # --------------------------------------------------------------------------- #
 
-def reference_point(env: Environment, current: list[str]) -> tuple[dict | None, list[str]]:
+def reference_point(env: Environment, current: list[str],
+                    journal: Journal | None = None) -> tuple[dict | None, list[str]]:
     """The newest snapshot from BEFORE one of today's problems existed.
 
     Returns (entry, new_problem_ids). `new_problem_ids` are the problems that
     exist now and did not exist in that snapshot - i.e. what regressed.
 
-    Searching newest-first means we land on the tightest window around the
-    regression, so the package diff stays small and readable rather than
-    dragging in months of unrelated churn.
+    Taking the NEWEST such snapshot means we land on the tightest window
+    around the regression, so the package diff stays small and readable
+    rather than dragging in months of unrelated churn. It is a lookup in the
+    journal's problem index (each problem's last absence), not a walk back
+    through the history.
 
     If EVERY retained snapshot already had all of today's problems, we return
     nothing and the feature stays quiet. We deliberately do not fall back to
@@ -204,12 +178,12 @@ def reference_point(env: Environment, current: list[str]) -> tuple[dict | None,
     """
     if not current:
         return None, []
-    for entry in reversed(_entries(_load(journal_path(env)))):
-        had = set(entry.get("problems") or [])
-        new = [p for p in current if p not in had]
-        if new:
-            return entry, new
-    return None, []
+    with _journal(env, journal) as j:
+        entry = j.snapshot_at(j.before(current))
+    if entry is None:
+        return None, []
+    had = set(entry["problems"])
+    return entry, [p for p in current if p not in had]
 
 
 def diff(old: dict[str, str], new: dict[str, str]) -> dict:
@@ -220,8 +194,88 @@ def diff(old: dict[str, str], new: dict[str, str]) -> dict:
     return {"changed": changed, "removed": removed, "added": added}
 
 
+def diff_lines(d: dict, limit: int = MAX_SHOWN) -> list[str]:
+    """A diff as "~ name: old -> new" / "- name old (removed)" / "+ name new
+    (newly installed)" lines, at most `limit` of them."""
+    lines = [f"  ~ {n}: {old_v} -> {new_v}" for n, old_v, new_v in d["changed"]]
+    lines += [f"  - {n} {old_v} (removed)" for n, old_v in d["removed"]]
+    lines += [f"  + {n} {new_v} (newly installed)" for n, new_v in d["added"]]
+    if len(lines) > limit:
+        lines = lines[:limit] + [f"  ...and {len(lines) - limit} more"]
+    return lines
+
+
+# --------------------------------------------------------------------------- #
+# One problem's story (`comfydoctor history`)
+# --------------------------------------------------------------------------- #
+
+def history(env: Environment, problem_id: str, journal: Journal | None = None) -> dict | None:
+    """What the journal knows about one problem id: first and last seen,
+    whether the newest scan still has it, and - while the scans on either
+    side are still on record - what changed when it last appeared or went
+    away. None if it was never recorded."""
+    with _journal(env, journal) as j:
+        return _history(j, problem_id)
+
+
+def _history(journal: Journal, problem_id: str) -> dict | None:
+    seen = journal.seen(problem_id)
+    if seen is None:
+        return None
+    scans, oldest = journal.span()
+    present = seen.last_seen == journal.newest()
+    out: dict = {
+        "id": problem_id,
+        "present": present,
+        "first_seen": seen.first_ts,
+        "last_seen": seen.last_ts,
+        "last_absent": None,
+        "scans": scans,
+        "scans_with": journal.count_with(problem_id),
+        "oldest": oldest,
+    }
+    # The change it came with (still present) or left with (gone): the two
+    # neighbouring snapshots around that edge.
+    edge = seen.last_absent if present else seen.last_seen
+    before = journal.snapshot_at(edge)
+    if before is not None:
+        if present:
+            out["last_absent"] = before["ts"]
+        after = journal.snapshot_at(edge + 1)
+        if after is not None:
+            out["appeared" if present else "resolved"] = {
+                "ts": after["ts"], "diff": diff(before["packages"], after["packages"])}
+    return out
+
+
+def problem_index(env: Environment, journal: Journal | None = None) -> list[dict]:
+    """Every problem id on record, most recently seen first."""
+    with _journal(env, journal) as j:
+        newest = j.newest()
+        ordered = sorted(j.problem_index().items(), key=lambda kv: (-kv[1].last_seen, kv[0]))
+    return [{"id": pid, "present": seen.last_seen == newest, "first_seen": seen.first_ts,
+             "last_seen": seen.last_ts} for pid, seen in ordered]
+
+
+def package_history(env: Environment, name: str, journal: Journal | None = None) -> list[dict]:
+    """"On which scans did torch change?" - each version `name` had, with the
+    scan it first showed up in; version None while it was not installed."""
+    with _journal(env, journal) as j:
+        return j.package_history(canonicalize_name(name))
+
+
+def states_with(env: Environment, name: str, version: str,
+                journal: Journal | None = None) -> list[dict]:
+    """"Every state where xformers was 0.0.28" - the stretches of history
+    with `name` at exactly `version`: {"since": ts, "until": ts or None while
+    it still is}."""
+    changes = package_history(env, name, journal)
+    return [{"since": c["ts"], "until": changes[i + 1]["ts"] if i + 1 < len(changes) else None}
+            for i, c in enumerate(changes) if c["version"] == version]
+
+
 def what_changed_finding(
-    env: Environment, inv: Inventory, findings: list[Finding],
+    env: Environment, inv: Inventory, findings: list[Finding], journal: Journal | None = None,
 ) -> Finding | None:
     """When a problem is NEW since a recorded snapshot, show what changed with
     it - and offer the way back."""
@@ -234,7 +288,7 @@ def what_changed_finding(
         # the same reason; diffing against it would offer a full reinstall.
         return None
 
-    entry, new_problems = reference_point(env, current)
+    entry, new_problems = reference_point(env, current, journal)
     if entry is None or not new_problems:
         return None  # no history, or nothing has regressed since we've been watching
 
@@ -269,24 +323,7 @@ def what_changed_finding(
         lines.append(f"  ! {titles.get(pid, pid)}")
     lines.append("")
     lines.append("What changed on your machine in between:")
-    shown = 0
-    for n, old_v, new_v in d["changed"]:
-        if shown >= MAX_SHOWN:
-            break
-        lines.append(f"  ~ {n}: {old_v} -> {new_v}")
-        shown += 1
-    for n, old_v in d["removed"]:
-        if shown >= MAX_SHOWN:
-            break
-        lines.append(f"  - {n} {old_v} (removed)")
-        shown += 1
-    for n, new_v in d["added"]:
-        if shown >= MAX_SHOWN:
-            break
-        lines.append(f"  + {n} {new_v} (newly installed)")
-        shown += 1
-    if n_changes > shown:
-        lines.append(f"  ...and {n_changes - shown} more")
+    lines.extend(diff_lines(d))
 
     thing = "package" if n_changes == 1 else "packages"
     return Finding(
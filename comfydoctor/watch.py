@@ -0,0 +1,236 @@
+"""Has anything under site-packages or custom_nodes changed since last time?
+
+Inside ComfyUI the panel re-scans on demand, and almost always nothing has
+changed in between: the inventory and the node survey it would rebuild are
+the ones it already has. A Watcher keeps a change *generation* per area - a
+counter that goes up whenever something in that area changes - so the scan can
+keep the previous Inventory / NodeSurvey for as long as its generation holds.
+
+Two backends, same answers:
+
+  - inotify (Linux), through ctypes. Non-blocking: nothing runs in the
+    background, pending events are drained when somebody asks.
+  - mtime polling everywhere else, or when inotify is unavailable or out of
+    watches. A pip install or uninstall creates or removes a directory in the
+    site dir, which moves the site dir's own mtime; a node's requirements.txt
+    is stat-ed directly. A few hundred stat calls per question.
+
+What is watched is deliberately shallow: each root itself and, for areas with
+`children`, each directory directly under a root. pip never edits a dist-info
+in place (see inventory's dist-info cache), so nothing deeper is needed.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import threading
+from dataclasses import dataclass, field
+
+# inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+
+_DIR_EVENTS = (_IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_ATTRIB
+               | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_FILE_EVENTS = _IN_MODIFY | _IN_CLOSE_WRITE
+_EVENT = struct.Struct("iIII")
+
+
+@dataclass
+class Area:
+    roots: list[str]
+    # Also watch every directory directly under a root (custom_nodes/<node>/),
+    # and count writes to these file names inside them.
+    children: bool = False
+    files: tuple[str, ...] = ()
+
+
+@dataclass
+class _State:
+    area: Area
+    generation: int = 0
+    signature: tuple | None = None           # polling only
+    missing: set[str] = field(default_factory=set)  # inotify: roots to (re)watch
+
+
+class Watcher:
+    """Change generations for named areas. Thread-safe; cheap to ask often."""
+
+    def __init__(self, areas: dict[str, Area], backend: str = "auto"):
+        self._areas = {name: _State(area) for name, area in areas.items()}
+        self._lock = threading.Lock()
+        self._fd: int | None = None
+        self._wds: dict[int, tuple[str, str, bool]] = {}   # wd -> (area, path, is_root)
+        self._libc = None
+        if backend in ("auto", "inotify"):
+            self._start_inotify()
+        if self._fd is None:
+            for st in self._areas.values():
+                st.signature = signature(st.area)
+        self.backend = "inotify" if self._fd is not None else "poll"
+
+    def generation(self, area: str) -> int:
+        """The area's current generation. Any change since the previous call
+        (or since the watcher started) has bumped it by at least one."""
+        with self._lock:
+            if self._fd is not None:
+                self._drain()
+            else:
+                st = self._areas[area]
+                sig = signature(st.area)
+                if sig != st.signature:
+                    st.signature = sig
+                    st.generation += 1
+            return self._areas[area].generation
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop_inotify()
+
+    # -- inotify ----------------------------------------------------------- #
+
+    def _start_inotify(self) -> None:
+        if not sys.platform.startswith("linux"):
+            return
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        except Exception:
+            return
+        if fd < 0:
+            return
+        self._libc, self._fd = libc, fd
+        for name, st in self._areas.items():
+            for root in st.area.roots:
+                if not self._watch_root(name, root):
+                    st.missing.add(root)
+        if self._fd is not None and not self._wds:
+            # Nothing could be watched (no such dirs, or out of watches): a
+            # watcher that sees nothing would call everything unchanged forever.
+            self._stop_inotify()
+
+    def _stop_inotify(self) -> None:
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+        self._fd = None
+        self._wds.clear()
+
+    def _add_watch(self, area: str, path: str, mask: int, is_root: bool) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask | _IN_ONLYDIR)
+        if wd < 0:
+            return False
+        self._wds[wd] = (area, path, is_root)
+        return True
+
+    def _watch_root(self, area: str, root: str) -> bool:
+        if not self._add_watch(area, root, _DIR_EVENTS, True):
+            return False
+        st = self._areas[area]
+        if st.area.children:
+            try:
+                with os.scandir(root) as it:
+                    subdirs = [e.path for e in it if e.is_dir()]
+            except OSError:
+                subdirs = []
+            for sub in subdirs:
+                self._add_watch(area, sub, _DIR_EVENTS | _FILE_EVENTS, False)
+        return True
+
+    def _drain(self) -> None:
+        bumped: set[str] = set()
+        while self._fd is not None:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            except OSError:
+                # The descriptor is gone: fall back to polling from here on.
+                self._stop_inotify()
+                for st in self._areas.values():
+                    st.signature = signature(st.area)
+                    st.generation += 1
+                self.backend = "poll"
+                return
+            offset = 0
+            while offset + _EVENT.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+                name = buf[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+                self._event(wd, mask, os.fsdecode(name), bumped)
+
+        # A root that was deleted, or never existed, comes back into view.
+        for area, st in self._areas.items():
+            for root in list(st.missing):
+                if os.path.isdir(root) and self._watch_root(area, root):
+                    st.missing.discard(root)
+                    bumped.add(area)
+        for area in bumped:
+            self._areas[area].generation += 1
+
+    def _event(self, wd: int, mask: int, name: str, bumped: set[str]) -> None:
+        if mask & _IN_Q_OVERFLOW:
+            bumped.update(self._areas)  # events were lost: assume everything changed
+            return
+        if wd not in self._wds:
+            return
+        area, path, is_root = self._wds[wd]
+        st = self._areas[area]
+        if mask & _IN_IGNORED:
+            del self._wds[wd]
+            if is_root:
+                st.missing.add(path)
+            bumped.add(area)
+            return
+        if not is_root and mask & _FILE_EVENTS and not mask & _IN_ISDIR:
+            if name in st.area.files:
+                bumped.add(area)
+            return
+        if is_root and st.area.children and mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+            self._add_watch(area, os.path.join(path, name), _DIR_EVENTS | _FILE_EVENTS, False)
+        if mask & _DIR_EVENTS:
+            bumped.add(area)
+
+
+def signature(area: Area) -> tuple:
+    """Everything polling compares: root mtimes, and for `children` areas each
+    subdirectory's mtime and the mtimes of the named files inside it."""
+    out: list = []
+    for root in area.roots:
+        out.append(_mtime(root))
+        if not area.children:
+            continue
+        try:
+            with os.scandir(root) as it:
+                subdirs = sorted(e.path for e in it if e.is_dir())
+        except OSError:
+            continue
+        for sub in subdirs:
+            out.append((sub, _mtime(sub), *(_mtime(os.path.join(sub, f)) for f in area.files)))
+    return tuple(out)
+
+
+def _mtime(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
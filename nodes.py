@@ -14,7 +14,6 @@ relying on that output was relying on a bug.
 from __future__ import annotations
 
 from . import comfydoctor
-from .comfydoctor import report as report_mod
 
 
 class ComfyDoctorReport:
@@ -43,7 +42,12 @@ class ComfyDoctorReport:
         return float("nan")
 
     def run(self, format: str):
-        result = comfydoctor.scan()
+        # Several of these in one workflow, or re-queued, share one scan while
+        # the environment is unchanged (see scan.scan_cached). Like the report
+        # module, the engine is imported here on first use, not at ComfyUI start.
+        from .comfydoctor import report as report_mod
+
+        result, _ = comfydoctor.scan_cached()
 
         if format == "markdown":
             text = report_mod.to_markdown(result, include_snapshot=False)
@@ -56,6 +60,7 @@ class ComfyDoctorReport:
 
 
 def _plain(result, problems_only: bool) -> str:
+    from .comfydoctor import report as report_mod
     from .comfydoctor.models import Severity
 
     lines = [
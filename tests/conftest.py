@@ -1,19 +1,50 @@
 """Test bootstrap: force the shipped-version resolver offline and onto a
 throwaway cache so every test run is deterministic (baked snapshot only) and
-never touches pypi.org or a cache left by a previous live run."""
+never touches pypi.org or a cache left by a previous live run. The dist-info
+cache gets the same treatment, so no test ever reads records from a real scan."""
 
 import os
+import sqlite3
 import sys
 import tempfile
 from pathlib import Path
 
+import pytest
+
 os.environ["COMFYDOCTOR_NO_NETWORK"] = "1"
 
 ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(ROOT))
 
-from comfydoctor import shipped  # noqa: E402
+from comfydoctor import inventory, shipped  # noqa: E402
 
 shipped.CACHE_FILE = os.path.join(tempfile.mkdtemp(prefix="comfydoctor_test_"),
                                   "shipped_cache.json")
 shipped.clear_caches()
+
+inventory.CACHE_FILE = os.path.join(tempfile.mkdtemp(prefix="comfydoctor_test_"),
+                                    "inventory_cache.json")
+
+
+class _TrackedConnection(sqlite3.Connection):
+    closed = False
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+@pytest.fixture
+def sqlite_connections(monkeypatch):
+    """Every sqlite3 connection opened during the test, to check each one was
+    closed."""
+    opened = []
+    real = sqlite3.connect
+
+    def connect(*a, **kw):
+        conn = real(*a, factory=_TrackedConnection, **kw)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(sqlite3, "connect", connect)
+    return opened
@@ -0,0 +1,243 @@
+"""The bisection planner: it finds the one changed package in ~log2(n) steps,
+moves torch as a family through its own index, never uninstalls, survives a
+restart mid-step, and says "inconclusive" rather than naming an innocent."""
+
+import importlib
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor import bisect                             # noqa: E402
+from comfydoctor import timemachine as tm                  # noqa: E402
+from comfydoctor.env import Environment                    # noqa: E402
+from comfydoctor.inventory import Dist, Inventory          # noqa: E402
+from comfydoctor.models import Finding, Severity           # noqa: E402
+
+
+def _env(root) -> Environment:
+    env = Environment.__new__(Environment)
+    env.comfy_root = root
+    env.python_exe = "C:/x/python.exe"
+    env.kind = "venv"
+    env.is_windows = True
+    return env
+
+
+def _inv(pkgs: dict) -> Inventory:
+    dists = {name: Dist(name=name, raw_name=name, version=v, location="/site")
+             for name, v in pkgs.items()}
+    return Inventory(dists=dists, duplicates={}, module_owners={}, unsatisfied=[])
+
+
+def _diff(n: int, removed=()) -> dict:
+    return {"changed": [(f"pkg{i:02d}", "1.0", "2.0") for i in range(n)],
+            "removed": [(name, "1.0") for name in removed], "added": [("newcomer", "1.0")]}
+
+
+class Machine:
+    """Installed versions, changed only by running a step's remedy. The
+    problem is there while `broken(installed)` says so."""
+
+    def __init__(self, plan, broken):
+        self.installed = {name: new for pkgs in plan.units.values() for name, _, new in pkgs
+                          if new is not None}
+        self.broken = broken
+        self.commands: list[list[str]] = []
+
+    def apply(self, remedy):
+        for argv in remedy.commands:
+            self.commands.append(argv)
+            assert argv[1:4] == ["-m", "pip", "install"], argv
+            for pin in argv[4:]:
+                if "==" in pin:
+                    name, version = pin.split("==")
+                    self.installed[name] = version
+
+
+def _run(plan, machine, env, restart=None):
+    steps = 0
+    while plan.next() is not None:
+        remedy = plan.remedy(env)
+        if remedy is not None:
+            machine.apply(remedy)
+        plan.mark_applied()
+        if restart:
+            plan = restart(plan)
+        plan.observe(not machine.broken(machine.installed))
+        steps += 1
+    return plan, steps
+
+
+class TestSearch:
+    @pytest.mark.parametrize("culprit", [0, 13, 36])
+    def test_finds_one_package_among_37_in_log_steps(self, tmp_path, culprit):
+        plan = bisect.Plan.new("p", _diff(37), None, ["packages"])
+        assert plan.steps_left() == 7
+        machine = Machine(plan, lambda inst: inst[f"pkg{culprit:02d}"] == "2.0")
+        plan, steps = _run(plan, machine, _env(tmp_path))
+        assert plan.status == "found" and plan.culprit == [f"pkg{culprit:02d}"]
+        assert steps <= 7
+        # Left with only the culprit put back.
+        assert [n for n, v in machine.installed.items() if v == "1.0"] == [f"pkg{culprit:02d}"]
+
+    def test_no_single_culprit_is_inconclusive(self, tmp_path):
+        plan = bisect.Plan.new("p", _diff(8), None, ["packages"])
+        machine = Machine(plan, lambda inst: True)
+        plan, steps = _run(plan, machine, _env(tmp_path))
+        assert plan.status == "inconclusive" and plan.culprit is None and steps == 4
+
+    def test_torch_family_moves_as_one_through_its_index(self, tmp_path):
+        diff = {"changed": [("torch", "2.8.0+cu128", "2.9.1+cu130"),
+                            ("torchvision", "0.23.0+cu128", "0.24.1+cu130"),
+                            ("a", "1.0", "2.0"), ("x", "1.0", "2.0"), ("y", "1.0", "2.0")],
+                "removed": [], "added": []}
+        plan = bisect.Plan.new("p", diff, None, ["torch_stack"])
+        assert plan.candidates == ["a", "torch", "x", "y"]
+        machine = Machine(plan, lambda inst: inst["x"] == "2.0")
+        plan, _ = _run(plan, machine, _env(tmp_path))
+        assert plan.culprit == ["x"]
+        # Back to the cu128 build with the first half, then forward to cu130.
+        torch_cmds = [c for c in machine.commands if any(a.startswith("torch") for a in c)]
+        assert [c[c.index("--index-url") + 1].rsplit("/", 1)[-1] for c in torch_cmds] == \
+            ["cu128", "cu130"]
+        for c in torch_cmds:
+            assert {a.split("==")[0] for a in c if "==" in a} == {"torch", "torchvision"}
+
+    def test_never_uninstalls_and_leaves_additions_alone(self, tmp_path):
+        plan = bisect.Plan.new("p", _diff(4, removed=["gone1", "gone2"]), None, ["packages"])
+        machine = Machine(plan, lambda inst: inst["pkg03"] == "2.0")
+        plan, _ = _run(plan, machine, _env(tmp_path))
+        assert plan.culprit == ["pkg03"]
+        assert all("uninstall" not in c and not any("newcomer" in a for a in c)
+                   for c in machine.commands)
+        # gone1/gone2 were put back by the first step and stay.
+        assert machine.installed["gone1"] == machine.installed["gone2"] == "1.0"
+
+    def test_resumes_from_disk_after_a_restart(self, tmp_path):
+        env = _env(tmp_path)
+        plan = bisect.Plan.new("p", _diff(20), None, ["packages"])
+        machine = Machine(plan, lambda inst: inst["pkg07"] == "2.0")
+
+        def restart(p):
+            bisect.save(env, p)
+            return bisect.load(env)
+
+        plan, _ = _run(plan, machine, env, restart)
+        assert plan.culprit == ["pkg07"]
+
+    def test_a_step_that_could_not_be_checked_ends_it_inconclusive(self, tmp_path):
+        plan = bisect.Plan.new("p", _diff(8), None, ["packages"])
+        plan.next()
+        plan.mark_applied()
+        plan.observe(None)
+        assert plan.status == "inconclusive" and plan.culprit is None
+        assert plan.steps == [{"restored": ["pkg00", "pkg01", "pkg02", "pkg03"], "fixed": None}]
+
+    def test_nothing_to_bisect(self):
+        with pytest.raises(ValueError):
+            bisect.Plan.new("p", {"changed": [], "removed": [], "added": [("x", "1")]}, None, [])
+
+
+class TestCheck:
+    """Absent is not gone: the problem's finding can only vanish because its
+    rule judged the restored packages and found nothing."""
+
+    def _plan(self):
+        return bisect.Plan.new("torch.broken", _diff(4), None, ["torch_stack"])
+
+    def _scan(self, monkeypatch, findings=(), raises=None):
+        def fake_scan(only=None, **kw):
+            assert only == ["torch_stack"]
+            if raises is not None:
+                raise raises
+            return SimpleNamespace(findings=[Finding(id=fid, severity=Severity.ERROR,
+                                                     category="c", title="t") for fid in findings])
+
+        monkeypatch.setattr(importlib.import_module("comfydoctor.scan"), "scan", fake_scan)
+
+    def test_gone_and_still_there(self, monkeypatch):
+        self._scan(monkeypatch, ["other.problem"])
+        assert bisect.check(self._plan()) is True
+        self._scan(monkeypatch, ["torch.broken"])
+        assert bisect.check(self._plan()) is False
+
+    def test_a_rule_the_restore_crashed_is_not_a_fix(self, monkeypatch):
+        from comfydoctor import rules
+
+        crashed = sorted(rules.select(["torch_stack"]))[0]
+        self._scan(monkeypatch, [f"internal.rule_failed.{crashed}"])
+        assert bisect.check(self._plan()) is None
+
+    def test_a_rule_outside_the_problems_groups_crashing_does_not_matter(self, monkeypatch):
+        self._scan(monkeypatch, ["internal.rule_failed.not_a_torch_rule"])
+        assert bisect.check(self._plan()) is True
+
+    def test_a_failed_probe_is_not_a_fix(self, monkeypatch):
+        self._scan(monkeypatch, raises=RuntimeError("the torch probe died"))
+        assert bisect.check(self._plan()) is None
+
+    def test_the_restore_makes_the_real_rule_crash(self, monkeypatch):
+        """Through run_all: the rule that reports the problem blows up on what
+        the restore installed, so its finding is missing - and that is not
+        taken for the problem being gone."""
+        from comfydoctor import rules
+
+        scan = importlib.import_module("comfydoctor.scan")
+        rules.names()
+        i, name = next((i, n) for i, (n, _) in enumerate(rules._RULES)
+                       if n in rules.select(["torch_stack"]))
+
+        def crash(ctx):
+            raise ImportError("torch/_C.so: undefined symbol")
+
+        crash.__module__ = rules._RULES[i][1].__module__
+        monkeypatch.setattr(rules, "_RULES", rules._RULES[:i] + [(name, crash)] + rules._RULES[i + 1:])
+        monkeypatch.setattr(scan, "_scan", lambda workers, reuse, selected, *a: SimpleNamespace(
+            findings=rules.run_all(scan._context(_env(None), {}), only=selected)))
+        assert bisect.check(self._plan()) is None
+
+
+class TestStart:
+    def _scan(self, tmp_path):
+        env = _env(tmp_path)
+        tm.record(env, _inv({"torch": "2.8.0+cu128", "numpy": "1.26.4"}), [])
+        inv = _inv({"torch": "2.9.1+cu130", "numpy": "2.1.0"})
+        problem = Finding(id="torch.broken", severity=Severity.ERROR, category="PyTorch", title="t")
+        wc = tm.what_changed_finding(env, inv, [problem])
+        return env, SimpleNamespace(findings=[problem, wc])
+
+    def test_plans_from_the_what_changed_finding(self, tmp_path):
+        env, result = self._scan(tmp_path)
+        plan = bisect.start(env, result)
+        assert plan.problem == "torch.broken" and plan.only == ["torch_stack"]
+        assert plan.candidates == ["numpy", "torch"]
+        with pytest.raises(ValueError):
+            bisect.start(env, result, "something.else")
+        with pytest.raises(ValueError):
+            bisect.start(env, SimpleNamespace(findings=result.findings[:1]))
+
+    def test_cli(self, tmp_path, monkeypatch, capsys):
+        from comfydoctor import cli
+
+        env, result = self._scan(tmp_path)
+        monkeypatch.setattr("comfydoctor.env.detect", lambda: env)
+        monkeypatch.setattr(cli, "run_scan", lambda: result)
+        machine = {}
+        monkeypatch.setattr(cli, "_run_remedy", lambda fid, r, yes: machine.update(
+            {a.split("==")[0]: a.split("==")[1] for c in r.commands for a in c if "==" in a}) or 0)
+        monkeypatch.setattr(bisect, "check", lambda plan: machine.get("numpy") == "1.26.4")
+
+        assert cli.main(["bisect", "start"]) == 0
+        assert "2 suspects left" in capsys.readouterr().out
+        assert cli.main(["bisect", "start"]) == 2
+        for _ in range(3):
+            assert cli.main(["bisect", "step", "--yes"]) == 0
+        out = capsys.readouterr().out
+        assert "Found it: restoring numpy 1.26.4 alone" in out
+        assert bisect.load(env).status == "found"
+        assert cli.main(["bisect", "reset"]) == 0 and bisect.load(env) is None
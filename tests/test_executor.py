@@ -0,0 +1,81 @@
+"""ComfyDoctor's own executor: bounded, interactive work first, and the time
+a job waited shows up in the profile of the scan it ran."""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor import executor, profile  # noqa: E402
+
+
+def _blocked(pool: executor.PriorityExecutor):
+    """Occupy the pool's only worker until the returned event is set."""
+    release, started = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        assert release.wait(5)
+
+    fut = pool.submit(hold)
+    assert started.wait(5)
+    return release, fut
+
+
+class TestPriorityExecutor:
+    def test_interactive_jobs_jump_queued_background_ones(self):
+        pool = executor.PriorityExecutor(workers=1, max_queue=8, name="t-prio")
+        release, _ = _blocked(pool)
+        order = []
+        futs = [pool.submit(order.append, "bg1", priority=executor.BACKGROUND),
+                pool.submit(order.append, "bg2", priority=executor.BACKGROUND),
+                pool.submit(order.append, "ui1"),
+                pool.submit(order.append, "ui2", priority=executor.INTERACTIVE)]
+        release.set()
+        for f in futs:
+            f.result(5)
+        assert order == ["ui1", "ui2", "bg1", "bg2"]
+
+    def test_a_full_queue_refuses_instead_of_piling_up(self):
+        pool = executor.PriorityExecutor(workers=1, max_queue=2, name="t-full")
+        release, _ = _blocked(pool)
+        a, b = pool.submit(lambda: 1), pool.submit(lambda: 2)
+        with pytest.raises(executor.Busy):
+            pool.submit(lambda: 3)
+        release.set()
+        assert (a.result(5), b.result(5)) == (1, 2)
+        assert pool.stats()["rejected"] == 1
+
+    def test_exceptions_and_thread_names(self):
+        pool = executor.PriorityExecutor(workers=2, name="t-names")
+        assert pool.submit(lambda: threading.current_thread().name).result(5).startswith("t-names-")
+        with pytest.raises(ZeroDivisionError):
+            pool.submit(lambda: 1 / 0).result(5)
+        assert pool.stats()["workers"] <= 2
+
+    def test_queue_wait_is_the_first_span_of_a_profile_made_in_the_job(self):
+        pool = executor.PriorityExecutor(workers=1, name="t-wait")
+        release, _ = _blocked(pool)
+
+        def job():
+            prof = profile.Profile()
+            with profile.recording(prof), profile.span("work", cat="probe"):
+                pass
+            return prof.to_dict()
+
+        fut = pool.submit(job)
+        threading.Event().wait(0.02)
+        release.set()
+        spans = fut.result(5)["spans"]
+        assert spans[0]["name"] == "queue wait" and spans[0]["cat"] == "queue"
+        assert spans[0]["args"] == {"executor": "t-wait"}
+        assert spans[0]["start_ms"] == 0 and spans[0]["ms"] >= 15
+        assert spans[1]["start_ms"] >= spans[0]["ms"]
+        assert pool.stats()["wait_ms_max"] >= 15
+
+    def test_no_queue_wait_outside_the_executor(self):
+        assert profile.Profile().to_dict()["spans"] == []
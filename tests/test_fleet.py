@@ -0,0 +1,148 @@
+"""The fleet store: many machines' journals merged, package sets stored once,
+and "which machines differ from the majority" answered from it."""
+
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor import fleet                              # noqa: E402
+from comfydoctor.journal import Journal                    # noqa: E402
+from comfydoctor.journal_sqlite import SQLITE_NAME, SqliteJournal  # noqa: E402
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+BASE = {"torch": "2.9.1", "xformers": "0.0.28", "numpy": "1.26.4", "pillow": "11.0.0"}
+
+
+def _ts(k: int) -> str:
+    return (START + timedelta(hours=k)).isoformat(timespec="seconds")
+
+
+def _machine(fleet_dir: Path, host: str, states: list[dict], sqlite=False) -> Path:
+    folder = fleet_dir / host / "ComfyUI" / "user" / "comfydoctor"
+    folder.mkdir(parents=True)
+    j = (SqliteJournal.load(folder / SQLITE_NAME, 5000) if sqlite
+         else Journal(folder / "env_journal.jsonl.gz", 5000))
+    for k, pkgs in enumerate(states):
+        j.record(_ts(k), dict(pkgs), [] if pkgs.get("numpy") != "2.1.0" else ["numpy.abi"])
+    return folder
+
+
+def _export(path: Path, pkgs: dict, findings=()) -> Path:
+    path.write_text(json.dumps({
+        "scanned_at": _ts(1000),
+        "findings": [{"id": fid, "severity": sev} for fid, sev in findings],
+        "snapshot": {"packages": {"packages": {n: {"name": n, "version": v} for n, v in pkgs.items()}}},
+    }), encoding="utf-8")
+    return path
+
+
+def _ingest(db, *paths):
+    return [fleet.ingest(db, m, s) for m, s in fleet.sources(list(paths))]
+
+
+class TestIngest:
+    def test_identical_package_sets_are_stored_once(self, tmp_path):
+        for host in ("a", "b", "c"):
+            _machine(tmp_path / "fleet", host, [BASE] * 3 + [{**BASE, "pillow": "11.1.0"}] * 3)
+        db = fleet.open_store(tmp_path / "store.sqlite3")
+        added = _ingest(db, tmp_path / "fleet")
+        assert [r["machine"] for r in added] == ["a/ComfyUI", "b/ComfyUI", "c/ComfyUI"]
+        assert sum(r["sets"] for r in added) == 2
+        (sets,) = db.execute("SELECT COUNT(*) FROM package_sets").fetchone()
+        (rows,) = db.execute("SELECT COUNT(*) FROM set_versions").fetchone()
+        assert sets == 2 and rows == 2 * len(BASE)
+
+    def test_ingesting_again_adds_only_new_scans(self, tmp_path):
+        folder = _machine(tmp_path / "fleet", "a", [BASE, {**BASE, "torch": "2.9.2"}])
+        db = fleet.open_store(tmp_path / "store.sqlite3")
+        assert _ingest(db, tmp_path / "fleet")[0]["snapshots"] == 2
+        assert _ingest(db, tmp_path / "fleet")[0]["snapshots"] == 0
+        Journal.load(folder / "env_journal.jsonl.gz", 5000).record(_ts(9), dict(BASE), [])
+        assert _ingest(db, tmp_path / "fleet")[0] == {
+            "machine": "a/ComfyUI", "source": str(folder / "env_journal.jsonl.gz"),
+            "snapshots": 1, "sets": 0}
+
+    def test_sqlite_journals_and_json_exports(self, tmp_path):
+        _machine(tmp_path / "fleet", "a", [BASE], sqlite=True)
+        _export(tmp_path / "fleet" / "b.json", BASE, [("numpy.abi", "error"), ("x", "warning")])
+        (tmp_path / "fleet" / "notes.json").write_text("{}")
+        db = fleet.open_store(tmp_path / "store.sqlite3")
+        added = _ingest(db, tmp_path / "fleet")
+        assert {r["machine"] for r in added} == {"a/ComfyUI", "b"}
+        assert all("error" not in r for r in added)
+        assert db.execute("SELECT problems FROM snapshots WHERE machine = 'b'").fetchone() == \
+            ('["numpy.abi"]',)
+        (sets,) = db.execute("SELECT COUNT(*) FROM package_sets").fetchone()
+        assert sets == 1
+
+    def test_an_unreadable_source_is_reported_not_fatal(self, tmp_path):
+        bad = tmp_path / "env_journal.jsonl.gz"
+        bad.write_bytes(b"garbage")
+        db = fleet.open_store(tmp_path / "store.sqlite3")
+        r = fleet.ingest(db, "x", bad)
+        assert "error" in r and r["snapshots"] == 0
+        assert db.execute("SELECT COUNT(*) FROM machines").fetchone() == (0,)
+
+    def test_sqlite_sources_are_opened_read_only(self, tmp_path):
+        folder = _machine(tmp_path / "fleet", "a", [BASE, {**BASE, "torch": "2.9.2"}], sqlite=True)
+        path = folder / SQLITE_NAME
+        before = path.read_bytes()
+        db = fleet.open_store(tmp_path / "store.sqlite3")
+        assert fleet.ingest(db, "a", path)["snapshots"] == 2
+        assert path.read_bytes() == before
+        assert sorted(p.name for p in folder.iterdir()) == [SQLITE_NAME]
+
+    def test_sqlite_sources_are_closed_after_reading(self, tmp_path, sqlite_connections):
+        folder = _machine(tmp_path / "fleet", "a", [BASE, {**BASE, "torch": "2.9.2"}], sqlite=True)
+        db = fleet.open_store(tmp_path / "store.sqlite3")
+        del sqlite_connections[:]
+        assert fleet.ingest(db, "a", folder / SQLITE_NAME)["snapshots"] == 2
+        assert len(sqlite_connections) == 1 and sqlite_connections[0].closed
+
+    def test_an_sqlite_source_that_cannot_be_opened_is_an_error(self, tmp_path):
+        db = fleet.open_store(tmp_path / "store.sqlite3")
+        bad = tmp_path / "bad" / SQLITE_NAME
+        bad.parent.mkdir()
+        bad.write_bytes(b"not a database" * 100)
+        for source in (bad, tmp_path / "missing" / SQLITE_NAME):
+            r = fleet.ingest(db, "x", source)
+            assert "error" in r and r["snapshots"] == 0
+        assert not (tmp_path / "missing").exists()
+
+
+class TestDrift:
+    def test_machines_that_differ_from_the_majority(self, tmp_path):
+        hosts = {"a": BASE, "b": BASE, "c": BASE,
+                 "d": {**BASE, "torch": "2.8.0"},
+                 "e": {k: v for k, v in BASE.items() if k != "xformers"}}
+        for host, pkgs in hosts.items():
+            # An older state first: only the newest snapshot counts.
+            _machine(tmp_path / "fleet", host, [{**BASE, "numpy": "2.1.0"}, pkgs])
+        db = fleet.open_store(tmp_path / "store.sqlite3")
+        _ingest(db, tmp_path / "fleet")
+        rows = {r["package"]: r for r in fleet.drift(db)}
+        assert rows["torch"]["majority"] == "2.9.1" and rows["torch"]["with_majority"] == 4
+        assert rows["torch"]["differ"] == {"d/ComfyUI": "2.8.0"}
+        assert rows["xformers"]["differ"] == {"e/ComfyUI": None}
+        assert rows["numpy"]["differ"] == {} and rows["numpy"]["machines"] == 5
+
+    def test_cli(self, tmp_path, capsys):
+        from comfydoctor import cli
+
+        _machine(tmp_path / "fleet", "a", [BASE])
+        _machine(tmp_path / "fleet", "b", [BASE])
+        _export(tmp_path / "c.json", {**BASE, "Torch": "2.8.0"})
+        store = str(tmp_path / "store.sqlite3")
+        assert cli.main(["fleet", "--store", store, "ingest", str(tmp_path / "fleet")]) == 0
+        assert cli.main(["fleet", "--store", store, "ingest", str(tmp_path / "c.json"),
+                         "--machine", "gpu-box-3"]) == 0
+        capsys.readouterr()
+        assert cli.main(["fleet", "--store", store, "drift", "torch"]) == 0
+        out = capsys.readouterr().out
+        assert "torch: 2.9.1 on 2 of 3 machines" in out and "gpu-box-3" in out
+        assert cli.main(["fleet", "--store", store, "drift", "--json"]) == 0
+        assert len(json.loads(capsys.readouterr().out)) == 3
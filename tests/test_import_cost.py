@@ -0,0 +1,75 @@
+"""What loading the extension costs ComfyUI at start-up: the routes and the
+node mappings, not the engine. Measured with `python -X importtime` in a fresh
+interpreter, loading the folder the way ComfyUI loads a custom node."""
+
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# A cold load is ~40 ms here; importing the engine eagerly made it ~150 ms.
+# Loose enough for a slow runner, tight enough to catch the engine coming back.
+BUDGET_MS = 100
+
+ENGINE = ("scan", "rules", "gpu", "inventory", "remedy", "custom_nodes", "timemachine",
+          "watch", "report", "runner")
+
+_LOAD = """
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location(
+    "comfydoctor_ext", sys.argv[1] + "/__init__.py", submodule_search_locations=[sys.argv[1]])
+mod = importlib.util.module_from_spec(spec)
+sys.modules["comfydoctor_ext"] = mod
+print("--- load ---", file=sys.stderr, flush=True)
+spec.loader.exec_module(mod)
+print(" ".join(m for m in sys.modules if m.startswith("comfydoctor_ext")))
+"""
+
+_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def _load():
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _LOAD, str(ROOT)],
+                          capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0, proc.stderr
+    after = proc.stderr.split("--- load ---", 1)[1]
+    # Top-level lines carry the cumulative time of everything they pulled in.
+    total_us = sum(int(m.group(1)) for m in map(_LINE.match, after.splitlines())
+                   if m and not m.group(2))
+    return proc.stdout.splitlines()[-1].split(), total_us / 1000  # the last line is ours
+
+
+class TestImportCost:
+    def test_loading_the_extension_does_not_import_the_engine(self):
+        modules, _ = _load()
+        assert "comfydoctor_ext.comfydoctor.api" in modules
+        loaded = {m.rsplit(".", 1)[-1] for m in modules}
+        assert not loaded & set(ENGINE), sorted(loaded & set(ENGINE))
+
+    def test_loading_the_extension_fits_the_budget(self):
+        _, ms = _load()
+        assert ms < BUDGET_MS, f"extension import took {ms:.0f} ms (budget {BUDGET_MS} ms)"
+
+    def test_the_lazy_names_resolve_through_the_package(self):
+        code = ("import comfydoctor, sys; "
+                "assert 'comfydoctor.scan' not in sys.modules; "
+                "assert comfydoctor.scan_cached.__module__ == 'comfydoctor.scan'; "
+                "assert comfydoctor.last() is None; "
+                "from comfydoctor import scan; "
+                "assert callable(scan) and scan is sys.modules['comfydoctor.scan'].scan")
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, timeout=60)
+
+    def test_scan_is_the_function_whichever_lazy_name_is_looked_up_first(self):
+        for first in ("last", "scan_cached"):
+            # The scan itself is stubbed out: this is about what the name calls.
+            code = ("import comfydoctor, sys\n"
+                    f"comfydoctor.{first}\n"
+                    "def stub(*a): raise LookupError('scanned')\n"
+                    "sys.modules['comfydoctor.scan']._scan = stub\n"
+                    "try:\n    comfydoctor.scan()\n"
+                    "except LookupError:\n    pass\n"
+                    "else:\n    raise AssertionError('scan() did not scan')\n"
+                    "assert callable(comfydoctor.last) and callable(comfydoctor.scan_cached)\n")
+            subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, timeout=60)
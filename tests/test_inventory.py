@@ -0,0 +1,411 @@
+"""The installed-package inventory, built against synthetic site-packages.
+
+Everything here runs on dist-info directories written into tmp_path, never on
+the interpreter running the tests, so the expected answer is always known.
+"""
+
+import gc
+import importlib
+import json
+import os
+import sys
+import tracemalloc
+import weakref
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks import synth  # noqa: E402
+from comfydoctor import inventory  # noqa: E402
+
+
+def _make_dist(site: Path, name: str, version: str, requires=(), packages=(), modules=()):
+    """A minimal wheel-style install: METADATA, RECORD and the files it lists."""
+    info = site / f"{name.replace('-', '_')}-{version}.dist-info"
+    info.mkdir(parents=True)
+    meta = ["Metadata-Version: 2.1", f"Name: {name}", f"Version: {version}"]
+    meta += [f"Requires-Dist: {r}" for r in requires]
+    (info / "METADATA").write_text("\n".join(meta) + "\n\nA long description.\n")
+    record = []
+    for pkg in packages:
+        (site / pkg).mkdir(exist_ok=True)
+        (site / pkg / "__init__.py").write_text("")
+        record.append(f"{pkg}/__init__.py,,")
+    for mod in modules:
+        (site / f"{mod}.py").write_text("")
+        record.append(f"{mod}.py,,")
+    record += [f"{info.name}/METADATA,,", f"{info.name}/RECORD,,"]
+    (info / "RECORD").write_text("\n".join(record) + "\n")
+    return info
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    monkeypatch.setattr(inventory, "CACHE_FILE", str(tmp_path / "cache.json"))
+    s = tmp_path / "site-packages"
+    s.mkdir()
+    _make_dist(s, "numpy", "2.1.0", packages=["numpy"])
+    _make_dist(s, "opencv-python", "4.10.0", requires=["numpy>=1.21"], packages=["cv2"])
+    _make_dist(s, "six", "1.16.0", modules=["six"])
+    return s
+
+
+class TestDistInfoCache:
+    def test_cold_build_is_all_misses_then_warm_build_all_hits(self, site):
+        cold = inventory.build(paths=[str(site)])
+        assert cold.cache_stats == {"hits": 0, "misses": 3}
+        warm = inventory.build(paths=[str(site)])
+        assert warm.cache_stats == {"hits": 3, "misses": 0}
+
+    def test_cached_build_is_identical_to_a_fresh_one(self, site):
+        inventory.build(paths=[str(site)])
+        warm = inventory.build(paths=[str(site)])
+        fresh = inventory.build(paths=[str(site)], use_cache=False)
+        assert warm.to_dict()["packages"] == fresh.to_dict()["packages"]
+        assert warm.module_owners == fresh.module_owners
+        assert warm.dists["six"].modules == ("six",)
+        assert warm.dists["opencv-python"].requires == ("numpy>=1.21",)
+
+    def test_only_the_changed_dist_is_reparsed(self, site):
+        inventory.build(paths=[str(site)])
+        # pip upgrades by removing the old dist-info and writing a new one.
+        import shutil
+
+        shutil.rmtree(site / "numpy-2.1.0.dist-info")
+        _make_dist(site, "numpy", "2.2.0", packages=["numpy"])
+        inv = inventory.build(paths=[str(site)])
+        assert inv.cache_stats == {"hits": 2, "misses": 1}
+        assert inv.version("numpy") == "2.2.0"
+
+    def test_uninstalled_dists_are_forgotten(self, site):
+        import json
+        import shutil
+
+        inventory.build(paths=[str(site)])
+        shutil.rmtree(site / "six-1.16.0.dist-info")
+        inventory.build(paths=[str(site)])
+        with open(inventory.CACHE_FILE, encoding="utf-8") as f:
+            keys = json.load(f)["entries"]
+        assert not any("six-" in k for k in keys)
+
+    def test_touched_dist_info_is_a_miss(self, site):
+        inventory.build(paths=[str(site)])
+        info = site / "six-1.16.0.dist-info"
+        st = os.stat(info)
+        os.utime(info, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert inventory.build(paths=[str(site)]).cache_stats["misses"] == 1
+
+    @pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX ownership")
+    def test_a_cache_file_owned_by_someone_else_is_ignored(self, site, monkeypatch):
+        inventory.build(paths=[str(site)])
+        assert os.stat(inventory.CACHE_FILE).st_mode & 0o777 == 0o600
+        uid = os.getuid()
+        monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+        inv = inventory.build(paths=[str(site)])
+        assert inv.cache_stats == {"hits": 0, "misses": 3}
+        assert inv.has("numpy")
+
+    def test_the_cache_is_per_user_not_in_the_temp_dir(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(os, "name", "posix")
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        assert inventory._user_cache_dir() == os.path.join(str(tmp_path), "comfydoctor")
+        monkeypatch.delenv("XDG_CACHE_HOME")
+        monkeypatch.setenv("HOME", str(tmp_path / "home"))
+        assert inventory._user_cache_dir() == os.path.join(
+            str(tmp_path / "home"), ".cache", "comfydoctor")
+
+    def test_corrupt_cache_is_a_cold_start_not_a_crash(self, site):
+        Path(inventory.CACHE_FILE).write_text("{not json")
+        inv = inventory.build(paths=[str(site)])
+        assert inv.cache_stats == {"hits": 0, "misses": 3}
+        assert inv.has("numpy")
+
+
+class TestNativeReader:
+    """The os.scandir reader must give importlib.metadata's answers exactly -
+    including which copy of a duplicated package wins the import."""
+
+    @pytest.fixture
+    def sites(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(inventory, "CACHE_FILE", str(tmp_path / "cache.json"))
+        a, b = tmp_path / "site-a", tmp_path / "site-b"
+        _make_dist(a, "numpy", "2.1.0", packages=["numpy"])
+        _make_dist(a, "google-auth", "2.30.0", requires=["cachetools>=2.0", "rsa<5,>=3.1"],
+                   packages=["google_auth_shim"])
+        (a / "google" / "auth").mkdir(parents=True)
+        rec = a / "google_auth-2.30.0.dist-info" / "RECORD"
+        rec.write_text(rec.read_text() + "google/auth/__init__.py,,\n")
+        _make_dist(a, "typing_extensions", "4.12.2", modules=["typing_extensions"])
+        _make_dist(a, "torch", "2.6.0+cu124",
+                   requires=['filelock', 'sympy==1.13.1; python_version >= "3.9"',
+                             "opt-einsum>=3.3; extra == 'opt-einsum'"],
+                   packages=["torch", "functorch"])
+        (a / "torch-2.6.0+cu124.dist-info" / "top_level.txt").write_text("functorch\ntorch\n")
+        # Vendored copies under pip/_vendor can end up on the path, but they
+        # are cargo, not installs, and must never count.
+        _make_dist(a / "pip" / "_vendor", "packaging", "24.0", packages=["packaging"])
+        # A second, older numpy further down the path: shadowed, but reported.
+        _make_dist(b, "numpy", "1.26.4", packages=["numpy"])
+        _make_dist(b, "six", "1.16.0", modules=["six"])
+        # Legacy egg-info installs are handed to importlib.metadata as-is.
+        egg = b / "legacy_pkg-0.1.egg-info"
+        egg.mkdir()
+        (egg / "PKG-INFO").write_text("Metadata-Version: 1.0\nName: legacy-pkg\nVersion: 0.1\n")
+        (egg / "requires.txt").write_text("six\n")
+        # Folded header lines, trailing junk after the header block.
+        info = _make_dist(b, "folded", "1.0")
+        (info / "METADATA").write_text(
+            "Metadata-Version: 2.1\nName: folded\nVersion: 1.0\n"
+            "Summary: one\n  two\nRequires-Dist: six\n\nName: not-a-header\n")
+        return [str(a), str(a / "pip" / "_vendor"), str(b), str(tmp_path / "missing")]
+
+    def test_identical_to_importlib_metadata(self, sites):
+        ref = inventory.build(paths=sites, use_cache=False)
+        fast = inventory.build(paths=sites, use_cache=False, reader="native")
+        assert fast.to_dict() == ref.to_dict()
+        assert fast.module_owners == ref.module_owners
+        assert [d.requires for d in fast.dists.values()] == [d.requires for d in ref.dists.values()]
+        assert fast.unsatisfied == ref.unsatisfied
+
+    def test_identical_on_this_interpreters_sys_path(self):
+        # What the scan actually reads: no `paths`, so sys.path itself, with
+        # whatever zips, eggs and .pth entries this interpreter has.
+        ref = inventory.build(use_cache=False)
+        fast = inventory.build(use_cache=False, reader="native")
+        assert fast.to_dict() == ref.to_dict()
+        assert fast.module_owners == ref.module_owners
+
+    def test_the_scan_uses_it(self, monkeypatch):
+        scan = importlib.import_module("comfydoctor.scan")
+        seen = []
+        monkeypatch.setattr(inventory, "build", lambda **kw: seen.append(kw) or "inv")
+        assert scan._inventory(0, inventory.RequirementCache(), False) == "inv"
+        assert seen[0]["reader"] == "native" and seen[0].get("paths") is None
+
+    def test_first_on_the_path_wins_and_vendored_is_ignored(self, sites):
+        inv = inventory.build(paths=sites, use_cache=False, reader="native")
+        assert inv.version("numpy") == "2.1.0"
+        assert [d.version for d in inv.duplicates["numpy"]] == ["2.1.0", "1.26.4"]
+        assert "packaging" not in inv.dists
+        assert inv.get("legacy-pkg").requires == ("six",)
+        assert inv.get("folded").requires == ("six",)
+
+    def test_shares_the_cache_with_the_metadata_reader(self, sites):
+        inventory.build(paths=sites)
+        warm = inventory.build(paths=sites, reader="native")
+        assert warm.cache_stats["misses"] == 0
+
+
+class TestParallelBuild:
+    @pytest.mark.parametrize("reader", ["metadata", "native"])
+    def test_same_answer_and_same_winners_as_serial(self, tmp_path, monkeypatch, reader):
+        monkeypatch.setattr(inventory, "CACHE_FILE", str(tmp_path / "cache.json"))
+        sites = []
+        for i in range(3):
+            s = tmp_path / f"site-{i}"
+            for j in range(12):
+                _make_dist(s, f"pkg-{j}", f"{i}.{j}", requires=[f"pkg-{(j + 1) % 12}>={i}"],
+                           packages=[f"pkg_{j}"])
+            sites.append(str(s))
+        serial = inventory.build(paths=sites, use_cache=False, reader=reader)
+        parallel = inventory.build(paths=sites, use_cache=False, reader=reader, workers=8)
+        assert parallel.to_dict() == serial.to_dict()
+        assert parallel.version("pkg-3") == "0.3"          # site-0 is first on the path
+        assert [d.location for d in parallel.duplicates["pkg-3"]] == sites
+        assert parallel.module_owners["pkg_3"] == ("pkg-3",)
+
+    def test_parallel_build_fills_and_reads_the_cache(self, site):
+        assert inventory.build(paths=[str(site)], workers=4).cache_stats == {"hits": 0, "misses": 3}
+        assert inventory.build(paths=[str(site)], workers=4).cache_stats == {"hits": 3, "misses": 0}
+
+
+class TestRequirementCache:
+    def test_each_string_is_parsed_once_per_scan(self, site):
+        reqs = inventory.RequirementCache()
+        inv = inventory.build(paths=[str(site)], reqs=reqs)
+        assert inv.requirements is reqs
+        assert reqs.stats() == {"hits": 0, "misses": 1, "unique": 1}
+        assert inventory.requirement_pins(inv.get("opencv-python"), "numpy", reqs) == [">=1.21"]
+        assert reqs.stats()["hits"] == 1
+
+    def test_verdicts_are_cached_alongside_the_parse(self):
+        reqs = inventory.RequirementCache()
+        assert reqs.get("not a requirement!!") is None
+        assert reqs.get("not a requirement!!") is None
+        extra = reqs.get("opt-einsum>=3.3; extra == 'opt-einsum'")
+        assert extra.extra and extra.target == "opt-einsum"
+        never = reqs.get('pywin32; sys_platform == "nonexistent"')
+        assert never.applies is False and not never.extra
+        plain = reqs.get("Typing_Extensions")
+        assert plain.applies is True and plain.target == "typing-extensions" and plain.specifier == ""
+        assert reqs.stats() == {"hits": 1, "misses": 4, "unique": 4}
+
+    def test_pins_without_a_cache_still_work(self, site):
+        inv = inventory.build(paths=[str(site)])
+        assert inventory.requirement_pins(inv.get("opencv-python"), "NumPy") == [">=1.21"]
+
+
+class TestReverseIndex:
+    def test_pins_on_matches_requirement_pins_for_every_dist(self, site):
+        _make_dist(site, "numba", "0.60.0", requires=[
+            "numpy<2.1,>=1.22", "llvmlite", "numpy; extra == 'x'",
+            'numpy>=1.0; sys_platform == "nonexistent"'])
+        inv = inventory.build(paths=[str(site)])
+        expect = [(n, s) for n, d in inv.dists.items()
+                  for s in inventory.requirement_pins(d, "numpy")]
+        assert [(p.dist, p.specifier) for p in inv.pins_on("NumPy")] == expect
+        assert [p.applies for p in inv.pins_on("numpy") if p.dist == "numba"] == [True, False]
+        assert inv.pins_on("llvmlite") == []          # required, but not pinned
+        assert [p.dist for p in inv.dependents["llvmlite"]] == ["numba"]
+
+    def test_hand_built_inventory_indexes_on_first_use(self):
+        d = inventory.Dist(name="opencv-python", raw_name="opencv-python", version="4.10.0",
+                           location="/x", requires=["numpy>=1.21"])
+        inv = inventory.Inventory(dists={d.name: d}, duplicates={}, module_owners={},
+                                  unsatisfied=[])
+        assert inv.dependents is None
+        assert [p.specifier for p in inv.pins_on("numpy")] == [">=1.21"]
+
+
+class TestLazyModules:
+    @pytest.fixture
+    def record_reads(self, monkeypatch):
+        reads = []
+        real = inventory._native_modules
+        monkeypatch.setattr(inventory, "_native_modules", lambda info: reads.append(info) or real(info))
+        return reads
+
+    def test_record_is_not_read_unless_asked(self, site, record_reads):
+        inv = inventory.build(paths=[str(site)], reader="native")
+        assert inv.version("numpy") == "2.1.0" and inv.unsatisfied == []
+        assert record_reads == []
+        assert inv.get("six").modules == ("six",)
+        assert len(record_reads) == 1
+        assert inv.get("six").owned_modules == ()     # same pass filled both
+        assert len(record_reads) == 1
+
+    def test_module_owners_match_an_eager_read_and_are_cached(self, site, record_reads):
+        _make_dist(site, "opencv-python-headless", "4.10.0", packages=["cv2"])
+        inv = inventory.build(paths=[str(site)], reader="native")
+        assert sorted(inv.module_owners["cv2"]) == ["opencv-python", "opencv-python-headless"]
+        assert len(record_reads) == 4
+        # The lists were written back to the dist-info cache: no RECORD next time.
+        warm = inventory.build(paths=[str(site)], reader="native")
+        assert warm.to_dict(modules=True)["packages"] == inv.to_dict()["packages"]
+        assert len(record_reads) == 4
+
+    def test_hand_built_dists_without_modules_have_none(self):
+        d = inventory.Dist(name="x", raw_name="x", version="1", location=None)
+        assert d.modules == () and d.owned_modules == ()
+        inv = inventory.Inventory(dists={"x": d}, duplicates={})
+        assert inv.module_owners == {}
+
+
+@dataclass
+class _ListDist:
+    """Dist as it was before it was slotted: a __dict__, lists, no interning."""
+    name: str
+    raw_name: str
+    version: str
+    location: Optional[str]
+    requires: list = field(default_factory=list)
+    modules: list = field(default_factory=list)
+    owned_modules: list = field(default_factory=list)
+
+
+class TestCompactDist:
+    def test_slotted_dists_have_no_instance_dict(self):
+        d = inventory.Dist(name="x", raw_name="x", version="1", location=None, modules=["x"])
+        assert not hasattr(d, "__dict__")
+        assert d.modules == ["x"] and d.owned_modules == ()
+        with pytest.raises(AttributeError):
+            d.extra = 1
+
+    def test_resident_size_of_a_1000_dist_environment(self, tmp_path):
+        site = synth.site_packages(tmp_path, 1000)
+        recs = []
+        for _path, location, read, read_modules in inventory._native_entries([str(site)]):
+            rec = read()
+            rec["modules"], rec["owned_modules"] = read_modules()
+            recs.append((rec, location))
+        # Every record arrives as fresh strings, as a scan reads them off disk.
+        blob = json.dumps(recs)
+
+        def resident(make) -> int:
+            gc.collect()
+            tracemalloc.start()
+            try:
+                base = tracemalloc.get_traced_memory()[0]
+                kept = make(json.loads(blob))  # noqa: F841 - measured while alive
+                gc.collect()
+                return tracemalloc.get_traced_memory()[0] - base
+            finally:
+                tracemalloc.stop()
+
+        def before(loaded):
+            dists = [_ListDist(name=inventory.canonicalize_name(r["raw_name"]), raw_name=r["raw_name"],
+                               version=r["version"], location=loc, requires=r["requires"],
+                               modules=r["modules"], owned_modules=r["owned_modules"])
+                     for r, loc in loaded]
+            owners: dict = {}
+            for d in dists:
+                for m in d.owned_modules:
+                    owners.setdefault(m, []).append(d.name)
+            return dists, owners
+
+        def after(loaded):
+            inv = inventory.Inventory(dists={}, duplicates={},
+                                      copies=tuple(inventory._dist_from(r, loc) for r, loc in loaded))
+            inv.module_owners
+            return inv.copies, inv.module_owners
+
+        old, new = resident(before), resident(after)
+        assert new < 0.75 * old
+
+    def test_a_built_inventory_keeps_neither_the_cache_nor_its_records(self, site, monkeypatch):
+        # What the measurement above leaves out: build() attaches a RECORD
+        # reader to each dist. It must not pin the machine-wide cache (or its
+        # record dicts) for as long as a server keeps the inventory.
+        inventory.build(paths=[str(site)], reader="native")
+        loaded = []
+        real = inventory._DistCache.load.__func__
+
+        def load(cls):
+            cache = real(cls)
+            loaded.append(weakref.ref(cache))
+            return cache
+
+        monkeypatch.setattr(inventory._DistCache, "load", classmethod(load))
+        inv = inventory.build(paths=[str(site)], reader="native")
+        gc.collect()
+        assert loaded[0]() is None
+        assert inv.uncached and not any(isinstance(a, dict) for _, _, d in inv.uncached
+                                        for a in d.record.args)
+        inv.module_owners
+        assert inv.uncached == () and all(d.record is None for d in inv.copies)
+
+
+class TestVersionCache:
+    def test_answers_are_unchanged(self):
+        assert inventory.satisfies("2.6.0+cu124", "==2.6.0") is True
+        assert inventory.satisfies("2.1.0", "<2") is False
+        assert inventory.satisfies("2.1.0rc1", ">=2.0") is True
+        assert inventory.satisfies("not-a-version", ">=1") is None
+        assert inventory.satisfies("1.0", "not a specifier") is None
+        assert inventory.parse_version("2.6.0+cu124") == inventory.parse_version("2.6.0")
+
+    def test_repeats_are_served_from_the_memo(self):
+        inventory.satisfies("1.26.4", ">=1.21,<2")
+        before = inventory.version_cache_stats()
+        for _ in range(50):
+            assert inventory.satisfies("1.26.4", ">=1.21,<2") is True
+        after = inventory.version_cache_stats()
+        assert after["version"]["hits"] - before["version"]["hits"] == 50
+        assert after["specifier"]["hits"] - before["specifier"]["hits"] == 50
+        assert after["specifier"]["misses"] == before["specifier"]["misses"]
+        assert after["version"]["size"] <= inventory.VERSION_CACHE_SIZE
@@ -0,0 +1,265 @@
+"""The SQLite journal backend (COMFYDOCTOR_JOURNAL=sqlite).
+
+It has to answer every question exactly as the file journal does - the
+parity test drives both with the same random history and compares them after
+every scan - and take over an existing file journal without losing its
+first sightings or its pinned clean state."""
+
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor import timemachine as tm                  # noqa: E402
+from comfydoctor.env import Environment                    # noqa: E402
+from comfydoctor.inventory import Dist, Inventory          # noqa: E402
+from comfydoctor.journal import Journal                    # noqa: E402
+from comfydoctor.journal_sqlite import SQLITE_NAME, SqliteJournal  # noqa: E402
+from comfydoctor.models import Finding, Severity           # noqa: E402
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _env(root) -> Environment:
+    env = Environment.__new__(Environment)
+    env.comfy_root = root
+    env.python_exe = "C:/x/python.exe"
+    env.kind = "venv"
+    env.is_windows = True
+    return env
+
+
+def _inv(pkgs: dict) -> Inventory:
+    dists = {name: Dist(name=name, raw_name=name, version=v, location="/site")
+             for name, v in pkgs.items()}
+    return Inventory(dists=dists, duplicates={}, module_owners={}, unsatisfied=[])
+
+
+def _problem(fid: str) -> Finding:
+    return Finding(id=fid, severity=Severity.ERROR, category="c", title=f"title of {fid}")
+
+
+def _ts(k: int) -> str:
+    return (START + timedelta(hours=k)).isoformat(timespec="seconds")
+
+
+def _db_path(root) -> Path:
+    return root / "user" / "comfydoctor" / SQLITE_NAME
+
+
+def _seen(s):
+    return None if s is None else (s.first_seen, s.first_ts, s.last_seen, s.last_ts, s.last_absent)
+
+
+def _same(a, b, ids, names):
+    """Every question both backends answer, asked of both."""
+    assert a.newest() == b.newest()
+    assert a.span() == b.span()
+    assert a.last_clean() == b.last_clean()
+    newest = a.newest()
+    for seq in range(max(newest - 40, 0), newest + 2):
+        assert a.snapshot_at(seq) == b.snapshot_at(seq), seq
+    for current in (["a"], ["b", "c"], ids, ["never.seen"]):
+        assert a.before(current) == b.before(current), current
+    for pid in ids:
+        assert _seen(a.seen(pid)) == _seen(b.seen(pid)), pid
+        assert a.count_with(pid) == b.count_with(pid), pid
+    assert {k: _seen(v) for k, v in a.problem_index().items()} == \
+           {k: _seen(v) for k, v in b.problem_index().items()}
+    for name in names:
+        assert a.package_history(name) == b.package_history(name), name
+
+
+@pytest.fixture
+def sqlite_backend(monkeypatch):
+    monkeypatch.setenv("COMFYDOCTOR_JOURNAL", "sqlite")
+    monkeypatch.setattr(tm, "MAX_RECENT", 20)
+
+
+class TestParity:
+    def test_answers_match_the_file_journal_scan_by_scan(self, tmp_path):
+        rng = random.Random(11)
+        ids, names = ["a", "b", "c", "d"], ["x", "y", "z"]
+        files = Journal(tmp_path / "file" / "env_journal.jsonl.gz", keep=30)
+        db = SqliteJournal.load(tmp_path / "db" / SQLITE_NAME, 30)
+        packages = {"x": "1", "y": "1"}
+        for k in range(150):
+            if rng.random() < 0.3:
+                name = rng.choice(names)
+                if name in packages and rng.random() < 0.3:
+                    del packages[name]
+                else:
+                    packages[name] = str(rng.randrange(5))
+            problems = sorted(p for p in ids if rng.random() < 0.4)
+            if rng.random() < 0.3:   # an identical rescan: a touch
+                problems = list(files.entries[-1].problems) if files.entries else problems
+            for j in (files, db):
+                j.record(_ts(k), dict(packages), problems)
+            _same(files, db, ids, names)
+        db.close()
+        _same(files, SqliteJournal.load(tmp_path / "db" / SQLITE_NAME, 30), ids, names)
+
+    def test_retention_by_age_keeps_the_last_clean_state(self, tmp_path):
+        files = Journal(tmp_path / "f.jsonl.gz", keep=100, max_age_days=30)
+        db = SqliteJournal.load(tmp_path / SQLITE_NAME, 100, max_age_days=30)
+        old = datetime.now(timezone.utc) - timedelta(days=90)
+        for k in range(10):
+            ts = (old + timedelta(days=k)).isoformat(timespec="seconds")
+            for j in (files, db):
+                j.record(ts, {"x": str(k)}, [] if k == 3 else ["a"])
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        for j in (files, db):
+            j.record(now, {"x": "new"}, ["a"])
+        assert db.span()[0] == 1
+        assert db.last_clean()["packages"] == {"x": "3"}
+        _same(files, db, ["a"], ["x"])
+
+
+class TestMigration:
+    def test_first_open_imports_the_file_journal(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tm, "MAX_RECENT", 20)
+        env = _env(tmp_path)
+        tm.record(env, _inv({"numpy": "1.26.4"}), [])
+        for i in range(30):
+            tm.record(env, _inv({"numpy": "2.1.0", "torch": f"2.{i}"}), [_problem("p.old")])
+        files = tm.load(env)
+        assert files.entries[0].seq > 0, "the clean scan has left the window"
+
+        monkeypatch.setenv("COMFYDOCTOR_JOURNAL", "sqlite")
+        db = tm.load(env)
+        assert isinstance(db, SqliteJournal)
+        _same(files, db, ["p.old"], ["numpy", "torch"])
+        assert db.seen("p.old").first_seen == 1
+        assert db.last_clean()["packages"] == {"numpy": "1.26.4"}
+        assert tm.journal_path(env).exists(), "the file journal is left in place"
+
+    def test_later_opens_do_not_import_again(self, tmp_path, monkeypatch, sqlite_backend):
+        env = _env(tmp_path)
+        monkeypatch.delenv("COMFYDOCTOR_JOURNAL")
+        tm.record(env, _inv({"a": "1"}), [])
+        monkeypatch.setenv("COMFYDOCTOR_JOURNAL", "sqlite")
+        tm.record(env, _inv({"a": "2"}), [])
+        tm.record(env, _inv({"a": "3"}), [])
+        assert tm.load(env).span()[0] == 3
+
+
+class TestQueries:
+    def test_on_which_scans_did_torch_change(self, tmp_path, sqlite_backend):
+        env = _env(tmp_path)
+        for k, torch in enumerate(["2.8.0", "2.8.0", "2.9.1", None, "2.9.1"]):
+            pkgs = {"numpy": str(k)}
+            if torch:
+                pkgs["torch"] = torch
+            tm.record(env, _inv(pkgs), [])
+        versions = [c["version"] for c in tm.package_history(env, "Torch")]
+        assert versions == ["2.8.0", "2.9.1", None, "2.9.1"]
+        assert [c["seq"] for c in tm.package_history(env, "torch")] == [0, 2, 3, 4]
+
+    def test_every_state_with_a_version(self, tmp_path, sqlite_backend):
+        env = _env(tmp_path)
+        for xformers in ["0.0.28", "0.0.29", "0.0.28", "0.0.28"]:
+            tm.record(env, _inv({"xformers": xformers, "n": xformers}), [])
+            tm.record(env, _inv({"xformers": xformers}), [])
+        j = tm.load(env)
+        states = tm.states_with(env, "xformers", "0.0.28", j)
+        assert len(states) == 2 and states[-1]["until"] is None
+        assert states[0]["until"] == j.snapshot_at(2)["ts"]
+        assert tm.states_with(env, "xformers", "9.9", j) == []
+
+    def test_how_long_a_problem_has_been_present(self, tmp_path, sqlite_backend):
+        env = _env(tmp_path)
+        tm.record(env, _inv({"numpy": "1.26.4"}), [])
+        tm.record(env, _inv({"numpy": "2.1.0"}), [_problem("numpy.abi")])
+        tm.record(env, _inv({"numpy": "2.1.0", "x": "1"}), [_problem("numpy.abi")])
+        story = tm.history(env, "numpy.abi")
+        assert story["present"] and story["scans_with"] == 2 and story["scans"] == 3
+        assert story["appeared"]["diff"]["changed"] == [("numpy", "1.26.4", "2.1.0")]
+
+    def test_history_cli_package(self, tmp_path, monkeypatch, capsys, sqlite_backend):
+        from comfydoctor import cli
+
+        env = _env(tmp_path)
+        monkeypatch.setattr("comfydoctor.env.detect", lambda: env)
+        tm.record(env, _inv({"torch": "2.8.0"}), [])
+        tm.record(env, _inv({"torch": "2.9.1"}), [])
+        assert cli.main(["history", "--package", "torch"]) == 0
+        out = capsys.readouterr().out
+        assert "torch 2.8.0" in out and "torch 2.9.1" in out
+        assert cli.main(["history", "--package", "torch==2.8.0"]) == 0
+        assert "torch==2.8.0  from" in capsys.readouterr().out
+
+
+class TestDegradation:
+    def test_an_unreadable_database_is_an_empty_journal(self, tmp_path, sqlite_backend):
+        env = _env(tmp_path)
+        path = _db_path(tmp_path)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"not a database" * 100)
+        tm.record(env, _inv({"a": "1"}), [_problem("p")])
+        j = tm.load(env)
+        assert j.newest() is None and j.last_clean() is None and j.package_history("a") == []
+
+    def test_no_comfy_root_is_a_silent_noop(self, sqlite_backend):
+        env = _env(None)
+        tm.record(env, _inv({"a": "1"}), [])
+        assert tm.load(env).span() == (0, None)
+
+    def test_an_unreadable_database_is_closed_again(self, tmp_path, sqlite_connections):
+        path = tmp_path / SQLITE_NAME
+        path.write_bytes(b"not a database" * 100)
+        assert SqliteJournal.load(path, 10).newest() is None
+        assert sqlite_connections and all(c.closed for c in sqlite_connections)
+
+    def test_one_transaction_per_scan(self, tmp_path):
+        db = SqliteJournal.load(tmp_path / SQLITE_NAME, 10)
+        db.record(_ts(0), {"a": "1"}, [])
+        db.record(_ts(1), {"a": "2"}, ["p"])
+        other = sqlite3.connect(str(tmp_path / SQLITE_NAME))
+        assert other.execute("SELECT COUNT(*) FROM scans").fetchone() == (2,)
+        assert other.execute("SELECT COUNT(*) FROM versions WHERE until_seq IS NULL").fetchone() == (1,)
+
+    def test_a_failed_write_does_not_advance_the_journal(self, tmp_path, monkeypatch):
+        db = SqliteJournal.load(tmp_path / SQLITE_NAME, 10)
+        db.record(_ts(0), {"a": "1"}, [])
+        monkeypatch.setattr(db, "_trim", lambda newest: 1 / 0)
+        db.record(_ts(1), {"a": "2"}, ["p"])
+        assert db.newest() == 0 and db.snapshot_at(0)["packages"] == {"a": "1"}
+        monkeypatch.undo()
+        # The next scan is judged against what was committed, not the lost one.
+        db.record(_ts(2), {"a": "2"}, ["p"])
+        files = Journal(tmp_path / "f.jsonl.gz", keep=10)
+        files.record(_ts(0), {"a": "1"}, [])
+        files.record(_ts(2), {"a": "2"}, ["p"])
+        _same(files, db, ["p"], ["a"])
+        _same(files, SqliteJournal.load(tmp_path / SQLITE_NAME, 10), ["p"], ["a"])
+
+
+class TestConnections:
+    def test_a_call_without_a_journal_closes_the_one_it_loads(
+            self, tmp_path, sqlite_backend, sqlite_connections):
+        env = _env(tmp_path)
+        tm.record(env, _inv({"a": "1"}), [])
+        tm.record(env, _inv({"a": "2"}), [_problem("p")])
+        assert tm.history(env, "p")["present"]
+        assert tm.problem_index(env)[0]["id"] == "p"
+        assert [c["version"] for c in tm.package_history(env, "a")] == ["1", "2"]
+        assert tm.last_clean(env) is not None
+        assert len(sqlite_connections) == 6
+        assert all(c.closed for c in sqlite_connections)
+
+    def test_a_passed_journal_is_left_open_for_its_owner(
+            self, tmp_path, sqlite_backend, sqlite_connections):
+        env = _env(tmp_path)
+        j = tm.load(env)
+        tm.record(env, _inv({"a": "1"}), [], j)
+        assert tm.package_history(env, "a", j)
+        assert [c.closed for c in sqlite_connections] == [False]
+        j.close()
+        assert sqlite_connections[0].closed
+
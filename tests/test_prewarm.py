@@ -0,0 +1,134 @@
+"""The start-up pre-warm: it waits out a busy prompt queue, scans once at
+reduced priority to seed the cache, and stays out of the way otherwise."""
+
+import importlib
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor import executor, prewarm  # noqa: E402
+
+scan = importlib.import_module("comfydoctor.scan")
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    """Record pre-warm scans (and the nice value they ran at) instead of
+    scanning."""
+    calls = []
+
+    def fake_scan_cached(*a, **kw):
+        calls.append(_nice() if hasattr(os, "getpriority") else None)
+        return None, False
+
+    monkeypatch.setattr(scan, "scan_cached", fake_scan_cached)
+    monkeypatch.setattr(scan, "_LAST", None)
+    monkeypatch.setattr(executor, "_DEFAULT", executor.PriorityExecutor(name="t-prewarm"))
+    monkeypatch.delenv("COMFYDOCTOR_PREWARM", raising=False)
+    return calls
+
+
+def _nice():
+    return os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+
+
+def _run(busy, **kw):
+    t = prewarm.schedule(busy, delay=0, poll=0.01, **kw)
+    assert t is not None and t.name == "comfydoctor-prewarm"
+    t.join(5)
+    assert not t.is_alive()
+
+
+class TestPrewarm:
+    def test_waits_for_the_prompt_queue_to_drain(self, scans):
+        polls = iter([True, True, True, False])
+        seen = []
+
+        def busy():
+            seen.append(1)
+            return next(polls)
+
+        _run(busy)
+        assert len(seen) == 4 and len(scans) == 1
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="per-thread nice is Linux only")
+    def test_scans_at_reduced_priority_without_touching_the_caller(self, scans):
+        before = _nice()
+        _run(lambda: False)
+        assert scans[0] >= prewarm.NICE
+        assert _nice() == before
+        # Nor the pool's worker, which runs the panel's next request.
+        assert executor.default().submit(_nice).result(5) == before
+
+    def test_gives_up_on_a_queue_that_never_drains(self, scans):
+        _run(lambda: True, give_up=0.05)
+        assert scans == []
+
+    def test_skips_when_someone_already_scanned(self, scans, monkeypatch):
+        monkeypatch.setattr(scan, "_LAST", object())
+        _run(lambda: False)
+        assert scans == []
+
+    def test_a_broken_busy_check_does_not_block_the_prewarm(self, scans):
+        _run(lambda: 1 / 0)
+        assert len(scans) == 1
+
+    @pytest.mark.parametrize("value", ["0", "off", "False"])
+    def test_can_be_turned_off(self, scans, monkeypatch, value):
+        monkeypatch.setenv("COMFYDOCTOR_PREWARM", value)
+        assert prewarm.schedule(lambda: False, delay=0) is None
+
+    def test_a_prompt_queued_mid_scan_defers_the_prewarm(self, monkeypatch):
+        queue = iter([False, True, True, False, False])   # busy() answers, in order
+        attempts = []
+
+        def fake_scan_cached(cancel=None, **kw):
+            attempts.append(1)
+            if cancel():       # the scan polls before each stage
+                raise scan.Cancelled("probes")
+            return None, False
+
+        monkeypatch.setattr(scan, "scan_cached", fake_scan_cached)
+        monkeypatch.setattr(scan, "_LAST", None)
+        monkeypatch.delenv("COMFYDOCTOR_PREWARM", raising=False)
+        _run(lambda: next(queue))
+        assert len(attempts) == 2
+
+    def test_a_panel_request_goes_ahead_of_a_queued_prewarm(self, scans, monkeypatch):
+        """Both through their real call sites: the pre-warm's submit, and the
+        API's _in_thread. The pool's one worker is busy; the pre-warm queues
+        first, the panel's request second - and runs first."""
+        import asyncio
+        import time
+
+        from comfydoctor import api
+
+        pool = executor.PriorityExecutor(workers=1, name="t-order")
+        monkeypatch.setattr(executor, "_DEFAULT", pool)
+        release, started = threading.Event(), threading.Event()
+        pool.submit(lambda: started.set() or release.wait(5))
+        assert started.wait(5)
+        order = []
+        monkeypatch.setattr(scan, "scan_cached", lambda **kw: order.append("prewarm") or (None, False))
+
+        t = prewarm.schedule(lambda: False, delay=0, poll=0.01)
+        for _ in range(500):
+            if pool.stats()["queued"]:
+                break
+            time.sleep(0.01)
+        assert pool.stats()["queued"] == 1
+
+        async def panel():
+            job = api._in_thread(order.append, "panel")
+            release.set()
+            await job
+
+        asyncio.run(panel())
+        t.join(5)
+        assert order == ["panel", "prewarm"]
@@ -0,0 +1,131 @@
+"""Scan profiling: spans land in the right profile from any thread, cost
+nothing when nobody records, and export as a trace Chrome/Perfetto can load."""
+
+import importlib
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor import profile  # noqa: E402
+from comfydoctor.models import ScanResult  # noqa: E402
+
+scan = importlib.import_module("comfydoctor.scan")
+
+
+def _names(prof: dict, cat: str) -> list[str]:
+    return [s["name"] for s in prof["spans"] if s["cat"] == cat]
+
+
+class TestSpans:
+    def test_nothing_recorded_without_a_profile(self):
+        with profile.span("orphan"):
+            pass
+        prof = profile.Profile()
+        with profile.recording(prof):
+            pass
+        assert prof.to_dict()["spans"] == []
+
+    def test_spans_from_pool_threads_land_in_the_callers_profile(self):
+        prof = profile.Profile()
+
+        def work(i):
+            with profile.span(f"job{i}", cat="probe", i=i):
+                time.sleep(0.002)
+
+        with profile.recording(prof):
+            with ThreadPoolExecutor(3) as pool:
+                list(pool.map(profile.propagate(work), range(3)))
+            # Without propagate the worker has no active profile.
+            t = threading.Thread(target=work, args=(99,))
+            t.start()
+            t.join()
+
+        out = prof.to_dict()
+        assert sorted(_names(out, "probe")) == ["job0", "job1", "job2"]
+        assert all(s["ms"] >= 1 for s in out["spans"])
+        assert {s["args"]["i"] for s in out["spans"]} == {0, 1, 2}
+        assert out["by_category"]["probe"] >= 3
+
+    def test_a_span_that_raises_is_still_recorded(self):
+        prof = profile.Profile()
+        with profile.recording(prof):
+            try:
+                with profile.span("boom", cat="rule"):
+                    raise ValueError
+            except ValueError:
+                pass
+        assert _names(prof.to_dict(), "rule") == ["boom"]
+
+    def test_stage_jobs_are_spans_on_their_own_threads(self):
+        prof = profile.Profile()
+        with profile.recording(prof):
+            scan._stage([], "probes", [("a", lambda: 1), ("b", lambda: 2)])
+        out = prof.to_dict()
+        assert _names(out, "stage") == ["probes"]
+        jobs = [s for s in out["spans"] if s["cat"] == "probe"]
+        assert sorted(s["name"] for s in jobs) == ["a", "b"]
+        assert all(s["thread"].startswith("comfydoctor-probe") for s in jobs)
+
+
+class TestRuleSpans:
+    def test_every_rule_gets_a_span(self):
+        from comfydoctor.custom_nodes import NodeSurvey
+        from comfydoctor.env import Environment
+        from comfydoctor.gpu import GPUInfo
+        from comfydoctor.inventory import Inventory
+        from comfydoctor.rules import _RULES, Context, run_all
+
+        env = Environment.__new__(Environment)
+        env.is_windows = False
+        env.python_exe = "/x/python"
+        env.kind = "venv"
+        inv = Inventory(dists={}, duplicates={}, module_owners={}, unsatisfied=[])
+        ctx = Context(env=env, gpu=GPUInfo(), inv=inv, nodes=NodeSurvey())
+
+        prof = profile.Profile()
+        with profile.recording(prof):
+            run_all(ctx)   # rules that trip over the bare env still get a span
+        spans = [s for s in prof.to_dict()["spans"] if s["cat"] == "rule"]
+        assert [s["name"] for s in spans] == [name for name, _ in _RULES]
+        assert all(s["args"]["module"] for s in spans)
+
+
+class TestOutput:
+    def _profile(self) -> dict:
+        prof = profile.Profile()
+        with profile.recording(prof):
+            with profile.span("probes", cat="stage"):
+                with profile.span("nvidia-smi", cat="subprocess", code=0):
+                    time.sleep(0.001)
+        return prof.to_dict()
+
+    def test_chrome_trace_shape(self):
+        trace = profile.chrome_trace(self._profile())
+        json.dumps(trace)   # must serialize as-is
+        events = trace["traceEvents"]
+        complete = [e for e in events if e["ph"] == "X"]
+        assert [e["name"] for e in complete] == ["probes", "nvidia-smi"]
+        for e in complete:
+            assert {"name", "cat", "ts", "dur", "pid", "tid", "args"} <= set(e)
+            assert e["dur"] >= 0 and e["ts"] >= 0
+        outer, inner = complete
+        assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"] + 1
+        meta = {e["name"] for e in events if e["ph"] == "M"}
+        assert meta == {"thread_name", "process_name"}
+
+    def test_table_lists_categories_and_slowest(self):
+        lines = profile.format_table(self._profile(), slowest=1)
+        text = "\n".join(lines)
+        assert "subprocess" in text and "stage" in text
+        assert len([ln for ln in lines if ln.strip().endswith("[MainThread]")]) == 1
+
+    def test_result_carries_the_profile(self):
+        r = ScanResult(findings=[], snapshot={}, health=100, scanned_at="", duration_ms=0,
+                       comfy_runtime=False, profile=self._profile())
+        assert r.to_dict()["profile"]["by_category"]["subprocess"] > 0
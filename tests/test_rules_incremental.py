@@ -0,0 +1,101 @@
+"""Incremental rule evaluation: a rule re-runs only when an input it declared
+has changed, and the findings are the same as a full run's."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor import profile, rules  # noqa: E402
+from comfydoctor.custom_nodes import CustomNode, NodeSurvey  # noqa: E402
+from comfydoctor.env import Environment  # noqa: E402
+from comfydoctor.gpu import GPUInfo  # noqa: E402
+from comfydoctor.inventory import Dist, Inventory  # noqa: E402
+from comfydoctor.rules import Context, run_all  # noqa: E402
+
+
+def _env() -> Environment:
+    return Environment(
+        python_exe="/venv/bin/python", python_version="3.11.9", kind="venv",
+        kind_detail="", comfy_root=None, custom_nodes_dir=None,
+        site_dirs=["/venv/lib/python3.11/site-packages"], is_windows=False,
+        platform_tag="linux_x86_64",
+    )
+
+
+def _inv() -> Inventory:
+    d = Dist(name="numpy", raw_name="numpy", version="1.26.4", location="/site",
+             modules=("numpy",), owned_modules=("numpy",))
+    return Inventory(dists={"numpy": d}, duplicates={}, module_owners={}, unsatisfied=[])
+
+
+def _ids(findings) -> list[str]:
+    return [f.id for f in findings]
+
+
+def _ran(ctx) -> dict[str, str]:
+    prof = profile.Profile()
+    with profile.recording(prof):
+        findings = run_all(ctx, incremental=True)
+    ran = {s["name"]: s["args"]["reason"] for s in prof.to_dict()["spans"] if s["cat"] == "rule"}
+    return findings, ran
+
+
+@pytest.fixture(autouse=True)
+def _fresh():
+    rules._PREVIOUS.clear()
+    yield
+    rules._PREVIOUS.clear()
+
+
+class TestDeclarations:
+    def test_every_shipped_rule_declares_its_inputs(self):
+        run_all(Context(env=_env(), gpu=GPUInfo(), inv=_inv(), nodes=NodeSurvey()))
+        undeclared = [name for name, _ in rules._RULES if rules._READS[name] is None]
+        assert undeclared == []
+
+    def test_unknown_input_is_refused(self):
+        with pytest.raises(ValueError):
+            rules.rule(reads=("envv",))
+
+
+class TestIncremental:
+    def test_second_run_only_reruns_live_rules(self):
+        ctx = Context(env=_env(), gpu=GPUInfo(), inv=_inv(), nodes=NodeSurvey())
+        first, ran = _ran(ctx)
+        assert set(ran) == {name for name, _ in rules._RULES}
+        assert set(ran.values()) <= {"first run", "reads live state"}
+
+        again, ran = _ran(ctx)
+        assert set(ran.values()) == {"reads live state"}
+        assert set(ran) == {n for n, r in rules._READS.items() if "live" in r}
+        assert _ids(again) == _ids(first)
+
+    def test_a_new_node_reruns_only_node_rules(self):
+        env, gpu, inv = _env(), GPUInfo(), _inv()
+        _ran(Context(env=env, gpu=gpu, inv=inv, nodes=NodeSurvey()))
+
+        nodes = NodeSurvey(nodes=[CustomNode(name="ComfyUI-New", path=Path("/cn/ComfyUI-New"))])
+        ctx = Context(env=env, gpu=gpu, inv=inv, nodes=nodes)
+        findings, ran = _ran(ctx)
+        expect = {n for n, r in rules._READS.items() if "nodes" in r or "live" in r}
+        assert set(ran) == expect
+        assert all(r in ("nodes changed", "reads live state") for r in ran.values())
+        assert _ids(findings) == _ids(run_all(ctx))
+
+    def test_a_rebuilt_inventory_reruns_inventory_rules(self):
+        env, gpu, nodes = _env(), GPUInfo(), NodeSurvey()
+        _ran(Context(env=env, gpu=gpu, inv=_inv(), nodes=nodes))
+        _, ran = _ran(Context(env=env, gpu=gpu, inv=_inv(), nodes=nodes))
+        assert "contested_module_names" in ran and ran["contested_module_names"] == "inv changed"
+        assert "python_version" not in ran
+
+    def test_full_runs_neither_read_nor_disturb_the_kept_results(self):
+        ctx = Context(env=_env(), gpu=GPUInfo(), inv=_inv(), nodes=NodeSurvey())
+        _ran(ctx)
+        kept = dict(rules._PREVIOUS)
+        run_all(ctx)
+        assert rules._PREVIOUS == kept
@@ -0,0 +1,131 @@
+"""The scan result cache: served while the environment fingerprint matches and
+the result is young enough; anything visible changing, or force, scans."""
+
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor.env import Environment  # noqa: E402
+from comfydoctor.models import ScanResult  # noqa: E402
+
+scan = importlib.import_module("comfydoctor.scan")
+
+
+@pytest.fixture
+def world(tmp_path, monkeypatch):
+    site = tmp_path / "site-packages"
+    nodes = tmp_path / "custom_nodes"
+    (site / "numpy-1.26.4.dist-info").mkdir(parents=True)
+    (nodes / "ComfyUI-A").mkdir(parents=True)
+    e = Environment(python_exe=sys.executable, python_version="3.11", kind="venv",
+                    kind_detail="", comfy_root=tmp_path, custom_nodes_dir=nodes,
+                    site_dirs=[str(site)])
+    scans = []
+
+    def fake_scan(workers=0, reuse=False, only=None, on_event=None, cancel=None):
+        scans.append(only)
+        return ScanResult(findings=[], snapshot={}, health=100, scanned_at="",
+                          duration_ms=0, comfy_runtime=False)
+
+    monkeypatch.setattr(scan.env, "detect", lambda: e)
+    monkeypatch.setattr(scan, "scan", fake_scan)
+    monkeypatch.setattr(scan, "_CACHED", None)
+    monkeypatch.setattr(scan, "_LAST", None)
+    monkeypatch.setenv("COMFYDOCTOR_SCAN_TTL", "600")
+    return site, nodes, scans
+
+
+class TestScanCache:
+    def test_unchanged_environment_is_served_from_cache(self, world):
+        _, _, scans = world
+        first, cached = scan.scan_cached()
+        assert not cached
+        again, cached = scan.scan_cached()
+        assert cached and again is first and scan.last() is first
+        assert len(scans) == 1
+
+    def test_force_always_scans(self, world):
+        _, _, scans = world
+        scan.scan_cached()
+        _, cached = scan.scan_cached(force=True)
+        assert not cached and len(scans) == 2
+
+    @pytest.mark.parametrize("change", ["install", "node", "requirements", "env_var"])
+    def test_visible_changes_miss(self, world, change, monkeypatch):
+        site, nodes, scans = world
+        scan.scan_cached()
+        if change == "install":
+            (site / "torch-2.5.1.dist-info").mkdir()
+        elif change == "node":
+            (nodes / "ComfyUI-B").mkdir()
+        elif change == "requirements":
+            (nodes / "ComfyUI-A" / "requirements.txt").write_text("numpy<2\n")
+        else:
+            monkeypatch.setenv("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+        _, cached = scan.scan_cached()
+        assert not cached and len(scans) == 2
+
+    def test_ttl_expires_and_zero_disables(self, world, monkeypatch):
+        _, _, scans = world
+        monkeypatch.setenv("COMFYDOCTOR_SCAN_TTL", "0")
+        scan.scan_cached()
+        _, cached = scan.scan_cached()
+        assert not cached and len(scans) == 2
+
+    def test_a_partial_scan_never_answers_for_a_full_one(self, world):
+        _, _, scans = world
+        scan.scan_cached(only=["torch_stack"])
+        _, cached = scan.scan_cached()
+        assert not cached
+        _, cached = scan.scan_cached()
+        assert cached
+        assert scans == [["torch_stack"], None]
+
+    def test_the_panel_opened_after_the_ttl_gets_the_prewarmed_result(self, world, monkeypatch):
+        from comfydoctor import prewarm
+
+        _, _, scans = world
+        monkeypatch.setenv("COMFYDOCTOR_SCAN_TTL", "30")
+        prewarm._scan(lambda: False)
+        warm = scan._CACHED[3]
+        _age(3600)
+        first, cached = scan.scan_cached()
+        assert cached and first is warm and scan.last() is warm
+        _, cached = scan.scan_cached()   # held for the first answer only
+        assert not cached and len(scans) == 2
+
+    def test_a_held_result_still_misses_on_a_visible_change(self, world):
+        site, _, scans = world
+        scan.scan_cached(hold=True)
+        _age(3600)
+        (site / "torch-2.5.1.dist-info").mkdir()
+        _, cached = scan.scan_cached()
+        assert not cached and len(scans) == 2
+
+    def test_a_hit_restores_the_result_and_its_context_together(self, world, monkeypatch):
+        ctx = object()
+
+        def fake_scan(workers=0, reuse=False, only=None, on_event=None, cancel=None):
+            result = ScanResult(findings=[], snapshot={}, health=100, scanned_at="",
+                                duration_ms=0, comfy_runtime=False)
+            scan._LAST, scan._LAST_CTX = result, ctx
+            return result
+
+        monkeypatch.setattr(scan, "scan", fake_scan)
+        monkeypatch.setattr(scan, "_LAST_CTX", None)
+        first, _ = scan.scan_cached()
+        scan._LAST, scan._LAST_CTX = object(), object()   # a partial scan ran since
+        again, cached = scan.scan_cached()
+        assert cached and again is first
+        assert scan._LAST is first and scan._LAST_CTX is ctx
+
+
+def _age(seconds: float) -> None:
+    """Make the cached result `seconds` older."""
+    only, fp, at, result, ctx, held = scan._CACHED
+    scan._CACHED = (only, fp, at - seconds, result, ctx, held)
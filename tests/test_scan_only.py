@@ -0,0 +1,106 @@
+"""Partial scans: `only` picks rule groups, and only the probes those rules
+read are run."""
+
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor import rules  # noqa: E402
+from comfydoctor.gpu import GPUInfo  # noqa: E402
+
+scan = importlib.import_module("comfydoctor.scan")
+
+
+def _module(name: str) -> str:
+    return dict((n, fn.__module__.rsplit(".", 1)[-1]) for n, fn in rules._RULES)[name]
+
+
+class TestSelect:
+    def test_module_and_category_name_the_same_rules(self):
+        by_module = rules.select(["torch_stack"])
+        assert by_module and rules.select(["pytorch"]) == by_module
+        assert {_module(n) for n in by_module} == {"torch_stack"}
+
+    def test_unknown_group_is_refused_by_name(self):
+        with pytest.raises(ValueError, match="torchstack"):
+            rules.select(["torch_stack", "torchstack"])
+
+    def test_inputs_follow_the_declarations(self):
+        assert "nodes" not in rules.inputs_of(rules.select(["torch_stack"]))
+        assert "nodes" in rules.inputs_of(rules.select(["node_health"]))
+        assert rules.groups_of(rules.select(["System", "packages"])) == ["packages", "system"]
+
+
+@pytest.fixture
+def record_reads(tmp_path, monkeypatch):
+    """Every RECORD read, by either reader, with a cold dist-info cache."""
+    inventory = scan.inventory
+    reads = []
+    for name in ("_native_modules", "_dist_modules"):
+        real = getattr(inventory, name)
+        monkeypatch.setattr(inventory, name, lambda d, real=real: reads.append(d) or real(d))
+    monkeypatch.setattr(inventory, "CACHE_FILE", str(tmp_path / "cache.json"))
+    monkeypatch.setattr(scan.gpu, "probe", GPUInfo)
+    return reads
+
+
+class TestRecordReads:
+    def test_a_scan_without_module_rules_never_opens_record(self, record_reads):
+        groups = [g for g in rules.groups_of(rules.names()) if g not in ("packages", "node_health")]
+        result = scan.scan(only=groups)
+        assert record_reads == []
+        assert result.snapshot["packages"]["count"] > 0
+        assert "modules" not in next(iter(result.snapshot["packages"]["packages"].values()))
+
+
+class TestPartialScan:
+    @pytest.fixture
+    def probes(self, monkeypatch):
+        called = []
+
+        def probe():
+            called.append("gpu")
+            return GPUInfo()
+
+        def survey(*a):
+            called.append("custom_nodes")
+            raise AssertionError("node survey must not run")
+
+        def record(*a):
+            raise AssertionError("a partial scan must not be journaled")
+
+        monkeypatch.setattr(scan.gpu, "probe", probe)
+        monkeypatch.setattr(scan, "_survey", survey)
+        monkeypatch.setattr(scan.timemachine, "record", record)
+        return called
+
+    def test_torch_only_scan_skips_the_node_survey(self, record_reads, probes):
+        result = scan.scan(only=["torch_stack"])
+        assert probes == ["gpu"]
+        assert record_reads == []
+        assert result.only == ["torch_stack"]
+        assert {f.category for f in result.findings} <= {"PyTorch", "ComfyDoctor"}
+        assert set(result.snapshot) == {"environment", "gpu", "packages"}
+        assert [st["stage"] for st in result.stages] == ["environment", "probes", "rules"]
+        assert result.to_dict()["only"] == ["torch_stack"]
+
+    def test_a_partial_scan_snapshot_leaves_module_ownership_out(self, record_reads, probes):
+        # The module rule reads RECORD because it needs to; the snapshot adds
+        # nothing to that.
+        result = scan.scan(only=["packages"])
+        packages = result.snapshot["packages"]
+        assert "shared_modules" not in packages
+        assert all("modules" not in d for d in packages["packages"].values())
+        assert len(record_reads) <= len(packages["packages"]) + sum(
+            len(v) for v in packages["duplicates"].values())
+
+    def test_system_scan_needs_no_inventory(self, probes):
+        result = scan.scan(only=["System"])
+        assert probes == ["gpu"]  # vram reads the GPU
+        assert set(result.snapshot) == {"environment", "gpu"}
+        assert result.facts == {}
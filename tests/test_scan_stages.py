@@ -0,0 +1,68 @@
+"""The scan's staged executor: probes side by side, results and failures
+exactly as a serial run would have produced them."""
+
+import importlib
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor.models import ScanResult  # noqa: E402
+
+scan = importlib.import_module("comfydoctor.scan")
+
+
+class TestStage:
+    def test_jobs_overlap_and_results_keep_job_order(self):
+        stages = []
+        barrier = threading.Barrier(3, timeout=5)
+
+        def job(value):
+            def run():
+                barrier.wait()          # only passes if all three run at once
+                time.sleep(0.01 * (3 - value))
+                return value
+            return run
+
+        out = scan._stage(stages, "probes", [("a", job(0)), ("b", job(1)), ("c", job(2))])
+        assert out == [0, 1, 2]
+        (st,) = stages
+        assert st["stage"] == "probes" and list(st["parts"]) == ["a", "b", "c"]
+        assert st["serial_ms"] >= st["ms"]
+
+    def test_first_failure_in_job_order_wins_and_nobody_is_cut_short(self):
+        finished = []
+
+        def slow_fail():
+            time.sleep(0.05)
+            raise ValueError("gpu")
+
+        def fast_fail():
+            raise KeyError("nodes")
+
+        def ok():
+            time.sleep(0.02)
+            finished.append("inventory")
+            return 1
+
+        stages = []
+        with pytest.raises(ValueError, match="gpu"):
+            scan._stage(stages, "probes", [("gpu", slow_fail), ("inventory", ok), ("nodes", fast_fail)])
+        assert finished == ["inventory"]
+        assert set(stages[0]["parts"]) == {"gpu", "inventory", "nodes"}
+
+    def test_speedup_is_serial_over_wall(self):
+        r = ScanResult(findings=[], snapshot={}, health=100, scanned_at="", duration_ms=0,
+                       comfy_runtime=False, stages=[
+                           {"stage": "environment", "ms": 10.0, "serial_ms": 10.0, "parts": {}},
+                           {"stage": "probes", "ms": 100.0, "serial_ms": 210.0, "parts": {}},
+                       ])
+        assert r.speedup() == 2.0
+        assert r.to_dict()["speedup"] == 2.0
+        assert ScanResult(findings=[], snapshot={}, health=100, scanned_at="", duration_ms=0,
+                          comfy_runtime=False).speedup() is None
@@ -0,0 +1,75 @@
+"""Streaming scans: rules run as soon as the probes they read are in, every
+probe and rule is reported as it finishes, and the result is unchanged."""
+
+import importlib
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor import rules  # noqa: E402
+from comfydoctor.gpu import GPUInfo  # noqa: E402
+
+scan = importlib.import_module("comfydoctor.scan")
+
+
+@pytest.fixture
+def slow_gpu(monkeypatch):
+    """A GPU probe that only returns once the streaming scan has reported a
+    rule - which it can only do if rules run before every probe is in."""
+    released = threading.Event()
+
+    def probe():
+        assert released.wait(5), "no rule ran while the GPU probe was pending"
+        return GPUInfo()
+
+    monkeypatch.setattr(scan.gpu, "probe", probe)
+    monkeypatch.setattr(scan.timemachine, "record", lambda *a: None)
+    return released
+
+
+class TestStreaming:
+    def test_env_rules_report_before_the_gpu_probe_finishes(self, slow_gpu):
+        events = []
+
+        def on_event(event):
+            events.append(event)
+            if event["event"] == "rule":
+                slow_gpu.set()
+
+        result = scan.scan(on_event=on_event)
+        order = [(e["event"], e["name"]) for e in events]
+        gpu_done = order.index(("probe", "gpu"))
+        early = {name for kind, name in order[:gpu_done] if kind == "rule"}
+        assert "python_version" in early
+        assert not any("gpu" in rules._READS[name] for name in early)
+
+        # Every rule is reported exactly once, and the findings add up.
+        assert sorted(n for k, n in order if k == "rule") == sorted(rules.names())
+        streamed = sorted(f["id"] for e in events if e["event"] == "rule" for f in e["findings"])
+        assert streamed == sorted(f.id for f in result.findings)
+
+    def test_same_findings_as_a_plain_scan(self, slow_gpu):
+        slow_gpu.set()
+        plain = scan.scan()
+        streamed = scan.scan(on_event=lambda e: None)
+        assert [f.id for f in streamed.findings] == [f.id for f in plain.findings]
+
+    def test_a_broken_listener_does_not_break_the_scan(self, slow_gpu):
+        slow_gpu.set()
+
+        def on_event(event):
+            raise RuntimeError("client went away")
+
+        assert scan.scan(on_event=on_event).findings
+
+    def test_partial_streaming_scan_reports_only_its_rules(self, slow_gpu):
+        slow_gpu.set()
+        events = []
+        scan.scan(only=["torch_stack"], on_event=events.append)
+        assert {e["name"] for e in events if e["event"] == "rule"} == rules.select(["torch_stack"])
+        assert {e["name"] for e in events if e["event"] == "probe"} == {"gpu", "inventory"}
@@ -0,0 +1,145 @@
+"""Single-flight scans: callers that arrive while an identical scan is running
+share it - one set of probes, one result, one journal write."""
+
+import importlib
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor.gpu import GPUInfo  # noqa: E402
+
+scan = importlib.import_module("comfydoctor.scan")
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """A GPU probe held until the test opens the gate, counting its calls."""
+    opened = threading.Event()
+    entered = threading.Event()
+    calls = []
+
+    def probe():
+        calls.append(1)
+        entered.set()
+        assert opened.wait(5)
+        if getattr(opened, "fail", False):
+            raise RuntimeError("nvidia-smi exploded")
+        return GPUInfo()
+
+    journaled = []
+    monkeypatch.setattr(scan.gpu, "probe", probe)
+    monkeypatch.setattr(scan.timemachine, "record", lambda *a: journaled.append(1))
+    return opened, entered, calls, journaled
+
+
+def _join(n: int, entered: threading.Event, opened: threading.Event, **kw):
+    """Start one scan, and once it is inside its probes, n-1 more."""
+    pool = ThreadPoolExecutor(n)
+    first = pool.submit(scan.scan, **kw)
+    assert entered.wait(5)
+    before = scan.flight_stats()["coalesced"]
+    rest = [pool.submit(scan.scan, **kw) for _ in range(n - 1)]
+    while scan.flight_stats()["coalesced"] < before + n - 1:
+        threading.Event().wait(0.005)
+    opened.set()
+    pool.shutdown(wait=True)
+    return [first, *rest], before
+
+
+class TestSingleFlight:
+    def test_concurrent_callers_share_one_scan(self, gate):
+        opened, entered, calls, journaled = gate
+        futures, before = _join(4, entered, opened)
+        results = [f.result() for f in futures]
+        assert all(r is results[0] for r in results)
+        assert len(calls) == 1 and len(journaled) == 1
+        assert scan.flight_stats()["coalesced"] == before + 3
+        assert scan.last() is results[0]
+
+    def test_joiners_get_the_scans_exception(self, gate):
+        opened, entered, calls, _ = gate
+        opened.fail = True
+        futures, _ = _join(3, entered, opened)
+        for f in futures:
+            with pytest.raises(RuntimeError, match="exploded"):
+                f.result()
+        assert len(calls) == 1
+
+    def test_different_scans_do_not_join(self, gate):
+        opened, entered, calls, _ = gate
+        opened.set()
+        scan.scan()
+        scan.scan(only=["torch_stack"])
+        assert len(calls) == 2
+
+    def test_a_streaming_joiner_hears_everything_from_the_start(self, gate):
+        opened, entered, calls, _ = gate
+        leader_events, joiner_events = [], []
+        with ThreadPoolExecutor(2) as pool:
+            first = pool.submit(scan.scan, on_event=leader_events.append)
+            assert entered.wait(5)
+            before = scan.flight_stats()["coalesced"]
+            second = pool.submit(scan.scan, on_event=joiner_events.append)
+            while scan.flight_stats()["coalesced"] == before:
+                threading.Event().wait(0.005)
+            opened.set()
+        assert first.result() is second.result()
+        assert joiner_events == leader_events and leader_events
+
+
+class TestCancel:
+    def test_cancel_stops_the_scan_at_the_next_stage(self, gate):
+        opened, entered, calls, journaled = gate
+        busy = threading.Event()
+        pool = ThreadPoolExecutor(1)
+        fut = pool.submit(scan.scan, cancel=busy.is_set)
+        assert entered.wait(5)
+        busy.set()             # a prompt was queued while the probes ran
+        opened.set()
+        with pytest.raises(scan.Cancelled, match="rules"):
+            fut.result(5)
+        assert journaled == []
+
+    def test_a_scan_somebody_joined_is_not_cancelled(self, gate):
+        opened, entered, calls, _ = gate
+        busy = threading.Event()
+        pool = ThreadPoolExecutor(2)
+        first = pool.submit(scan.scan, cancel=busy.is_set)
+        assert entered.wait(5)
+        before = scan.flight_stats()["coalesced"]
+        second = pool.submit(scan.scan)
+        while scan.flight_stats()["coalesced"] == before:
+            threading.Event().wait(0.005)
+        busy.set()
+        opened.set()
+        assert first.result(5) is second.result(5)
+        assert len(calls) == 1
+
+    def test_a_caller_joining_while_cancel_decides_gets_a_scan_of_its_own(self, gate):
+        """The join lands while the leader's cancel is being asked: it must
+        neither join a scan that is about to stop nor stop the one it joined."""
+        opened, entered, calls, _ = gate
+        pool = ThreadPoolExecutor(2)
+        joiner = []
+
+        def cancel():
+            if not opened.is_set():
+                return False
+            if not joiner:
+                joiner.append(pool.submit(scan.scan))
+                threading.Event().wait(0.1)   # time for it to reach the join
+            return True
+
+        first = pool.submit(scan.scan, cancel=cancel)
+        assert entered.wait(5)
+        opened.set()
+        with pytest.raises(scan.Cancelled):
+            first.result(5)
+        assert joiner[0].result(5).findings is not None
+        assert len(calls) == 2
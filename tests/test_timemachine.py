@@ -12,13 +12,18 @@ added since the reference point, and never sends torch-family through bare
 PyPI.
 """
 
+import gzip
 import json
 import sys
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(ROOT))
 
+from comfydoctor import journal                            # noqa: E402
 from comfydoctor import timemachine as tm                  # noqa: E402
 from comfydoctor.env import Environment                    # noqa: E402
 from comfydoctor.inventory import Dist, Inventory          # noqa: E402
@@ -50,22 +55,44 @@ CLEAN = [Finding(id="ok.x", severity=Severity.OK, category="c", title="fine"),
          Finding(id="warn.x", severity=Severity.WARNING, category="c", title="meh")]
 
 
-def _journal(root) -> dict:
-    return json.loads((root / "user" / "comfydoctor" / "env_journal.json").read_text())
+@pytest.fixture(autouse=True)
+def short_window(monkeypatch):
+    """The real retention is thousands of scans; most tests here are about
+    what happens at its edge, so they get a short one. TestLongHistory uses
+    the real numbers."""
+    monkeypatch.setattr(tm, "MAX_RECENT", 20)
+
+
+def _journal(root) -> tm.Journal:
+    return tm.load(_env(root))
+
+
+def _snapshots(root) -> list[dict]:
+    j = _journal(root)
+    return [j.snapshot(i) for i in range(len(j.entries))]
+
+
+def _path(root) -> Path:
+    return root / "user" / "comfydoctor" / "env_journal.jsonl.gz"
+
+
+def _lines(root) -> list[dict]:
+    with gzip.open(_path(root), "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
 
 
 class TestJournal:
     def test_records_packages_and_problems(self, tmp_path):
         env = _env(tmp_path)
         tm.record(env, _inv({"torch": "2.9.1+cu130"}), [_problem("onnx.dup")])
-        entry = _journal(tmp_path)["recent"][-1]
+        entry = _snapshots(tmp_path)[-1]
         assert entry["packages"] == {"torch": "2.9.1+cu130"}
         assert entry["problems"] == ["onnx.dup"]
 
     def test_warnings_are_not_problems(self, tmp_path):
         env = _env(tmp_path)
         tm.record(env, _inv({"numpy": "1.26.4"}), CLEAN)
-        assert _journal(tmp_path)["recent"][-1]["problems"] == []
+        assert _snapshots(tmp_path)[-1]["problems"] == []
         assert tm.last_clean(env) is not None
 
     def test_identical_scans_do_not_flush_history(self, tmp_path):
@@ -73,13 +100,13 @@ class TestJournal:
         tm.record(env, _inv({"numpy": "1.26.4"}), CLEAN)
         for _ in range(5):
             tm.record(env, _inv({"numpy": "1.26.4"}), CLEAN)
-        assert len(_journal(tmp_path)["recent"]) == 1
+        assert len(_journal(tmp_path).entries) == 1
 
     def test_recent_window_is_capped(self, tmp_path):
         env = _env(tmp_path)
         for i in range(tm.MAX_RECENT + 10):
             tm.record(env, _inv({"numpy": f"1.{i}.0"}), CLEAN)
-        assert len(_journal(tmp_path)["recent"]) == tm.MAX_RECENT
+        assert len(_journal(tmp_path).entries) == tm.MAX_RECENT
 
     def test_clean_snapshot_survives_a_long_run_of_broken_scans(self, tmp_path):
         env = _env(tmp_path)
@@ -88,7 +115,7 @@ class TestJournal:
             tm.record(env, _inv({"torch": f"2.9.{i}"}), [_problem("torch.cpu")])
         assert tm.last_clean(env)["packages"]["torch"] == "2.9.1+cu130"
 
-    def test_corrupt_journal_is_a_fresh_start_not_a_crash(self, tmp_path):
+    def test_corrupt_legacy_journal_is_a_fresh_start_not_a_crash(self, tmp_path):
         env = _env(tmp_path)
         p = tmp_path / "user" / "comfydoctor" / "env_journal.json"
         p.parent.mkdir(parents=True)
@@ -103,6 +130,225 @@ class TestJournal:
         assert tm.what_changed_finding(env, _inv({}), [_problem("x")]) is None
 
 
+class TestJournalFormat:
+    """Append-only: a scan writes one line of what changed, and a scan reads
+    the file once."""
+
+    def test_a_scan_appends_only_what_changed(self, tmp_path):
+        env = _env(tmp_path)
+        many = {f"pkg{i}": "1.0" for i in range(50)}
+        tm.record(env, _inv(many), CLEAN)
+        tm.record(env, _inv({**many, "pkg3": "2.0", "new": "0.1"}), [_problem("p")])
+        tm.record(env, _inv({**many, "pkg3": "2.0", "new": "0.1"}), [_problem("p")])
+        smaller = {**many, "pkg3": "2.0", "new": "0.1"}
+        del smaller["pkg7"]
+        tm.record(env, _inv(smaller), [_problem("p")])
+
+        base, delta, touch, gone = _lines(tmp_path)
+        assert base["t"] == "base" and len(base["packages"]) == 50
+        assert delta == {"t": "delta", "ts": delta["ts"], "set": {"pkg3": "2.0", "new": "0.1"},
+                         "problems": ["p"]}
+        assert touch["t"] == "touch"
+        assert gone == {"t": "delta", "ts": gone["ts"], "del": ["pkg7"]}, "problems unchanged"
+        assert _snapshots(tmp_path)[-1]["packages"] == smaller
+        assert _snapshots(tmp_path)[-1]["problems"] == ["p"]
+
+    def test_compaction_keeps_the_window_and_the_clean_pin(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(journal, "COMPACT_AT", 30)
+        env = _env(tmp_path)
+        tm.record(env, _inv({"a": "1.0"}), CLEAN)
+        for i in range(tm.MAX_RECENT + 15):
+            tm.record(env, _inv({"a": f"2.{i}"}), [_problem("p")])
+        lines = _lines(tmp_path)
+        assert [ln["t"] for ln in lines[:3]] == ["meta", "clean", "base"]
+        assert len(lines) - lines[0]["compacted"] <= 30
+        j = _journal(tmp_path)
+        assert len(j.entries) == tm.MAX_RECENT
+        assert j.snapshot(-1)["packages"] == {"a": f"2.{tm.MAX_RECENT + 14}"}
+        assert j.last_clean()["packages"] == {"a": "1.0"}
+
+    def test_a_torn_last_member_loses_only_that_scan(self, tmp_path):
+        env = _env(tmp_path)
+        tm.record(env, _inv({"a": "1.0"}), CLEAN)
+        tm.record(env, _inv({"a": "2.0"}), CLEAN)
+        member = gzip.compress(b'{"t":"delta","ts":"x","set":{"a":"9"}}\n')
+        with open(_path(tmp_path), "ab") as f:
+            f.write(member[:len(member) // 2])
+        assert [s["packages"] for s in _snapshots(tmp_path)] == [{"a": "1.0"}, {"a": "2.0"}]
+        tm.record(env, _inv({"a": "3.0"}), CLEAN)
+        assert [ln["t"] for ln in _lines(tmp_path)] == ["meta", "base", "delta", "delta"]
+
+    def test_legacy_json_journal_is_migrated(self, tmp_path):
+        env = _env(tmp_path)
+        legacy = tmp_path / "user" / "comfydoctor" / "env_journal.json"
+        legacy.parent.mkdir(parents=True)
+        legacy.write_text(json.dumps({
+            "recent": [{"ts": "2026-01-01T00:00:00+00:00", "packages": {"a": "1.0"}, "problems": ["p"]},
+                       {"ts": "2026-01-02T00:00:00+00:00", "packages": {"a": "2.0"}, "problems": ["p"]}],
+            "last_clean": {"ts": "2025-12-01T00:00:00+00:00", "packages": {"a": "0.9"}, "problems": []},
+        }))
+        assert tm.last_clean(env)["packages"] == {"a": "0.9"}
+        tm.record(env, _inv({"a": "3.0"}), [_problem("p")])
+        assert not legacy.exists()
+        assert [s["packages"]["a"] for s in _snapshots(tmp_path)] == ["1.0", "2.0", "3.0"]
+        assert tm.last_clean(env)["packages"] == {"a": "0.9"}
+
+    def test_uncompressed_jsonl_journal_is_migrated(self, tmp_path):
+        env = _env(tmp_path)
+        plain = tmp_path / "user" / "comfydoctor" / "env_journal.jsonl"
+        plain.parent.mkdir(parents=True)
+        plain.write_text(
+            '{"t":"base","ts":"2026-10-01T00:00:00+00:00","packages":{"a":"1.0","b":"1.0"},"problems":[]}\n'
+            '{"t":"delta","ts":"2026-10-02T00:00:00+00:00","set":{"a":"2.0"},"del":["b"],"problems":["p"]}\n')
+        tm.record(env, _inv({"a": "3.0"}), [_problem("p")])
+        assert not plain.exists()
+        assert [s["packages"] for s in _snapshots(tmp_path)] == [
+            {"a": "1.0", "b": "1.0"}, {"a": "2.0"}, {"a": "3.0"}]
+
+    def test_one_load_serves_the_whole_scan(self, tmp_path, monkeypatch):
+        env = _env(tmp_path)
+        tm.record(env, _inv({"a": "1.0"}), CLEAN)
+        loads = []
+        real = tm.Journal.load
+        monkeypatch.setattr(tm.Journal, "load", lambda *a: loads.append(1) or real(*a))
+        journal = tm.load(env)
+        findings = [_problem("p")]
+        assert tm.what_changed_finding(env, _inv({"a": "2.0"}), findings, journal) is not None
+        tm.record(env, _inv({"a": "2.0"}), findings, journal)
+        assert len(loads) == 1
+        assert [s["packages"]["a"] for s in _snapshots(tmp_path)] == ["1.0", "2.0"]
+
+
+class TestLongHistory:
+    """Months of hourly scans, with the real retention numbers."""
+
+    def _churn(self, j: tm.Journal, n: int, start: datetime, packages: int = 600):
+        pkgs = {f"package-{i}": "1.0.0" for i in range(packages)}
+        for k in range(n):
+            pkgs[f"package-{(k * 7) % packages}"] = f"1.{k}.0"
+            j.record((start + timedelta(hours=k)).isoformat(timespec="seconds"), dict(pkgs),
+                     ["p.standing"] if k % 3 else [])
+        return pkgs
+
+    def test_thousands_of_scans_fit_in_a_few_hundred_kb(self, tmp_path):
+        j = tm.Journal(_path(tmp_path), keep=5000)
+        start = datetime.now(timezone.utc) - timedelta(days=100)
+        final = self._churn(j, 2000, start)
+        j.compact()
+        assert _path(tmp_path).stat().st_size < 300_000
+        again = tm.Journal.load(_path(tmp_path), 5000)
+        assert len(again.entries) == 2000
+        assert again.snapshot(-1)["packages"] == final
+
+    def test_any_snapshot_is_rebuilt_from_a_nearby_keyframe(self, tmp_path):
+        j = tm.Journal(_path(tmp_path), keep=5000)
+        self._churn(j, 450, datetime.now(timezone.utc) - timedelta(days=30), packages=50)
+        j = tm.Journal.load(_path(tmp_path), 5000)
+        for i in (0, 99, 100, 101, 317, 448):
+            keyframe = max(k for k in range(i + 1) if j.entries[k].keyframe is not None)
+            assert i - keyframe < journal.KEYFRAME_EVERY
+        # Spot-check the arithmetic against a straight replay.
+        replay = {f"package-{i}": "1.0.0" for i in range(50)}
+        for k in range(318):
+            replay[f"package-{(k * 7) % 50}"] = f"1.{k}.0"
+        assert j.packages(317) == replay
+
+    def test_retention_by_count_and_age_keeps_last_clean(self, tmp_path):
+        j = tm.Journal(_path(tmp_path), keep=100, max_age_days=30)
+        old = datetime.now(timezone.utc) - timedelta(days=60)
+        j.record(old.isoformat(), {"a": "0.1"}, [])                         # clean, too old
+        for k in range(150):
+            j.record((old + timedelta(days=40, hours=k)).isoformat(), {"a": f"1.{k}"}, ["p"])
+        assert len(j.entries) == 100
+        assert j.entries[0].keyframe == {"a": "1.50"}
+        assert j.last_clean()["packages"] == {"a": "0.1"}
+        j.compact()
+        again = tm.Journal.load(_path(tmp_path), 100, 30)
+        assert [again.snapshot(i)["packages"]["a"] for i in (0, -1)] == ["1.50", "1.149"]
+        assert again.last_clean()["packages"] == {"a": "0.1"}
+
+    def test_age_never_drops_the_newest_scan(self, tmp_path):
+        j = tm.Journal(_path(tmp_path), keep=100, max_age_days=1)
+        j.record("2020-01-01T00:00:00+00:00", {"a": "1.0"}, ["p"])
+        j.record("2020-01-02T00:00:00+00:00", {"a": "2.0"}, ["p"])
+        assert [j.snapshot(i)["packages"]["a"] for i in range(len(j.entries))] == ["2.0"]
+
+
+class TestProblemIndex:
+    """Per-problem first seen / last seen / last absent: the reference point
+    is a lookup, and `comfydoctor history` reads the same index."""
+
+    def _walk(self, j: tm.Journal, current: list[str]):
+        """The reference point the slow way: newest-first over every entry."""
+        for i in range(len(j.entries) - 1, -1, -1):
+            if any(p not in j.entries[i].problems for p in current):
+                return i
+        return None
+
+    def test_lookup_matches_a_walk_of_the_history(self, tmp_path):
+        import random
+
+        rng = random.Random(7)
+        j = tm.Journal(_path(tmp_path), keep=60)
+        ids = ["a", "b", "c", "d"]
+        for k in range(200):
+            j.record(f"2026-10-01T{k % 24:02d}:00:00+00:00", {"x": str(k)},
+                     sorted(p for p in ids if rng.random() < 0.6))
+            for current in (["a"], ["b", "c"], ["a", "b", "c", "d"], ["never.seen"]):
+                assert j.position(j.before(current)) == self._walk(j, current), (k, current)
+        again = tm.Journal.load(_path(tmp_path), 60)
+        for current in (["a"], ["b", "d"], ["c"]):
+            assert again.position(again.before(current)) == self._walk(again, current)
+
+    def test_first_seen_outlives_retention(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(journal, "COMPACT_AT", 5)
+        env = _env(tmp_path)
+        tm.record(env, _inv({"a": "1.0"}), [_problem("p.old")])
+        first = _journal(tmp_path).index["p.old"].first_ts
+        for i in range(tm.MAX_RECENT + 10):
+            tm.record(env, _inv({"a": f"2.{i}"}), [_problem("p.old")])
+        j = _journal(tmp_path)
+        assert j.entries[0].seq > 0, "the first scan has left the window"
+        assert j.index["p.old"].first_seen == 0 and j.index["p.old"].first_ts == first
+        assert j.index["p.old"].last_seen == j.entries[-1].seq
+        assert j.before(["p.old"]) is None
+
+    def test_history_of_a_present_problem(self, tmp_path):
+        env = _env(tmp_path)
+        tm.record(env, _inv({"numpy": "1.26.4", "torch": "2.9.1"}), CLEAN)
+        tm.record(env, _inv({"numpy": "2.1.0", "torch": "2.9.1"}), [_problem("numpy.abi")])
+        tm.record(env, _inv({"numpy": "2.1.0", "torch": "2.9.2"}), [_problem("numpy.abi")])
+        story = tm.history(env, "numpy.abi")
+        assert story["present"] and story["scans_with"] == 2 and story["scans"] == 3
+        assert story["appeared"]["diff"]["changed"] == [("numpy", "1.26.4", "2.1.0")]
+        assert "resolved" not in story
+        assert tm.history(env, "never.seen") is None
+
+    def test_history_of_a_resolved_problem(self, tmp_path):
+        env = _env(tmp_path)
+        tm.record(env, _inv({"numpy": "2.1.0"}), [_problem("numpy.abi")])
+        tm.record(env, _inv({"numpy": "1.26.4"}), CLEAN)
+        story = tm.history(env, "numpy.abi")
+        assert not story["present"]
+        assert story["resolved"]["diff"]["changed"] == [("numpy", "2.1.0", "1.26.4")]
+        assert [r["id"] for r in tm.problem_index(env)] == ["numpy.abi"]
+
+    def test_history_cli(self, tmp_path, monkeypatch, capsys):
+        from comfydoctor import cli
+
+        env = _env(tmp_path)
+        monkeypatch.setattr("comfydoctor.env.detect", lambda: env)
+        tm.record(env, _inv({"numpy": "1.26.4"}), CLEAN)
+        tm.record(env, _inv({"numpy": "2.1.0"}), [_problem("numpy.abi")])
+        assert cli.main(["history", "numpy.abi"]) == 0
+        out = capsys.readouterr().out
+        assert "still present" in out and "~ numpy: 1.26.4 -> 2.1.0" in out
+        assert cli.main(["history"]) == 0
+        assert "numpy.abi" in capsys.readouterr().out
+        assert cli.main(["history", "nope", "--json"]) == 1
+        assert capsys.readouterr().out.strip() == "null"
+
+
 class TestPersistentErrorMachine:
     """THE real-world case: a machine that has carried an onnxruntime ERROR
     for months and the owner is fine with it. A new problem must still be
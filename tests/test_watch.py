@@ -0,0 +1,191 @@
+"""Change generations for site dirs and custom_nodes, and the scan's reuse of
+an unchanged inventory / node survey.
+
+Both backends are run against the same script of changes: whatever inotify
+reports, polling must report too, or the fallback would serve stale scans.
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from comfydoctor import inventory, watch  # noqa: E402
+from comfydoctor.env import Environment     # noqa: E402
+
+# `comfydoctor.scan` the attribute is the scan() function; this is the module.
+scan = importlib.import_module("comfydoctor.scan")
+
+
+@pytest.fixture(params=["inotify", "poll"])
+def make_watcher(request):
+    made = []
+
+    def make(areas):
+        w = watch.Watcher(areas, backend=request.param)
+        if w.backend != request.param:
+            pytest.skip("inotify is not available here")
+        made.append(w)
+        return w
+
+    yield make
+    for w in made:
+        w.close()
+
+
+def _bump_mtime(path: Path) -> None:
+    # Polling compares mtimes; make sure a change is visible even on
+    # filesystems with coarse timestamps.
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+class TestWatcher:
+    def test_nothing_changed_is_the_same_generation(self, tmp_path, make_watcher):
+        w = make_watcher({"site": watch.Area([str(tmp_path)])})
+        g = w.generation("site")
+        assert w.generation("site") == g
+        os.listdir(tmp_path)            # reading is not a change
+        assert w.generation("site") == g
+
+    def test_install_in_a_site_dir_moves_the_generation(self, tmp_path, make_watcher):
+        site = tmp_path / "site-packages"
+        site.mkdir()
+        w = make_watcher({"site": watch.Area([str(site)])})
+        g = w.generation("site")
+        (site / "numpy-2.1.0.dist-info").mkdir()
+        _bump_mtime(site)
+        assert w.generation("site") > g
+
+    def test_node_requirements_edit_and_new_node(self, tmp_path, make_watcher):
+        cn = tmp_path / "custom_nodes"
+        (cn / "NodeA").mkdir(parents=True)
+        req = cn / "NodeA" / "requirements.txt"
+        req.write_text("numpy\n")
+        w = make_watcher({"nodes": watch.Area([str(cn)], children=True,
+                                              files=("requirements.txt",))})
+        g = w.generation("nodes")
+
+        req.write_text("numpy<2\n")     # edited in place: the dir mtime does not move
+        _bump_mtime(req)
+        g2 = w.generation("nodes")
+        assert g2 > g
+
+        (cn / "NodeB").mkdir()
+        _bump_mtime(cn)
+        g3 = w.generation("nodes")
+        assert g3 > g2
+        (cn / "NodeB" / "requirements.txt").write_text("einops\n")
+        assert w.generation("nodes") > g3
+
+    def test_areas_are_independent(self, tmp_path, make_watcher):
+        a, b = tmp_path / "a", tmp_path / "b"
+        a.mkdir()
+        b.mkdir()
+        w = make_watcher({"a": watch.Area([str(a)]), "b": watch.Area([str(b)])})
+        ga, gb = w.generation("a"), w.generation("b")
+        (a / "x").mkdir()
+        _bump_mtime(a)
+        assert w.generation("a") > ga
+        assert w.generation("b") == gb
+
+    def test_a_root_that_appears_later_is_picked_up(self, tmp_path, make_watcher):
+        later = tmp_path / "later"
+        other = tmp_path / "other"
+        other.mkdir()
+        w = make_watcher({"site": watch.Area([str(other), str(later)])})
+        g = w.generation("site")
+        later.mkdir()
+        assert w.generation("site") > g
+
+
+def _reused(env):
+    """The inventory / node survey half of scan(reuse=True)."""
+    scan._watch(env)
+    reqs = inventory.RequirementCache()
+    return scan._inventory(0, reqs, True), scan._survey(env, reqs, True)
+
+
+class TestScanReuse:
+    @pytest.fixture
+    def world(self, tmp_path, monkeypatch):
+        site = tmp_path / "site-packages"
+        site.mkdir()
+        cn = tmp_path / "custom_nodes"
+        (cn / "NodeA").mkdir(parents=True)
+        (cn / "NodeA" / "requirements.txt").write_text("numpy\n")
+        env = Environment.__new__(Environment)
+        env.site_dirs = [str(site)]
+        env.custom_nodes_dir = cn
+
+        builds = []
+        real_build = inventory.build
+        monkeypatch.setattr(inventory, "build",
+                            lambda **kw: builds.append(1) or real_build(paths=[str(site)], **kw))
+        monkeypatch.setattr(scan, "_WATCH", None)
+        monkeypatch.setattr(scan, "_KEPT", {})
+        yield env, site, cn, builds
+        if scan._WATCH is not None:
+            scan._WATCH.close()
+
+    def test_unchanged_areas_are_reused(self, world):
+        env, site, cn, builds = world
+        inv1, nodes1 = _reused(env)
+        inv2, nodes2 = _reused(env)
+        assert inv2 is inv1 and nodes2 is nodes1
+        assert len(builds) == 1
+
+    def test_a_change_rebuilds_only_its_own_area(self, world):
+        env, site, cn, builds = world
+        inv1, nodes1 = _reused(env)
+        (site / "six-1.16.0.dist-info").mkdir()
+        _bump_mtime(site)
+        inv2, nodes2 = _reused(env)
+        assert inv2 is not inv1 and nodes2 is nodes1
+        (cn / "NodeA" / "requirements.txt").write_text("numpy<2\n")
+        _bump_mtime(cn / "NodeA" / "requirements.txt")
+        inv3, nodes3 = _reused(env)
+        assert inv3 is inv2 and nodes3 is not nodes2
+        assert nodes3.nodes[0].requirements == ["numpy<2"]
+
+    def test_sys_path_change_rebuilds_the_inventory(self, world, monkeypatch):
+        env, site, cn, builds = world
+        inv1, _ = _reused(env)
+        monkeypatch.setattr(sys, "path", [*sys.path, str(cn / "NodeA")])
+        inv2, _ = _reused(env)
+        assert inv2 is not inv1
+
+    def test_flights_side_by_side_start_one_watcher(self, world, monkeypatch):
+        env, site, cn, builds = world
+        made = []
+        real = watch.Watcher
+
+        def slow(*a, **kw):
+            made.append(1)
+            time.sleep(0.05)
+            return real(*a, **kw)
+
+        monkeypatch.setattr(watch, "Watcher", slow)
+        threads = [threading.Thread(target=scan._watch, args=(env,)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        assert len(made) == 1
+
+    def test_a_build_that_outlived_its_watcher_is_not_kept(self, world, tmp_path):
+        env, site, cn, builds = world
+        scan._watch(env)
+        w, _ = scan._kept("inv")
+        moved = Environment.__new__(Environment)
+        moved.site_dirs, moved.custom_nodes_dir = env.site_dirs, tmp_path
+        scan._watch(moved)          # re-aimed while the build was running
+        scan._keep(w, "inv", (0, ()), "stale")
+        assert scan._kept("inv")[1] is None
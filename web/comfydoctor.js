@@ -730,13 +730,64 @@ function buildHeader(data, ctx) {
   return header;
 }
 
-function buildSkeleton() {
-  const wrap = el("div", { class: "cd-skeleton" });
+function buildSkeleton(partial) {
+  const checked = partial ? partial.rules : 0;
+  const wrap = el("div", { class: checked ? "cd-skeleton cd-skeleton--compact" : "cd-skeleton" });
   wrap.appendChild(icon("pi-spinner pi-spin"));
   wrap.appendChild(el("div", { class: "cd-skeleton-text", text: "Examining your environment…" }));
+  if (checked) {
+    wrap.appendChild(el("div", { class: "cd-skeleton-sub", text: `${checked} checks done so far` }));
+  }
   return wrap;
 }
 
+// ---------------------------------------------------------------------------
+// Streaming scan (/comfydoctor/scan/stream: one JSON event per line)
+// ---------------------------------------------------------------------------
+
+const SEVERITY_ORDER = ["critical", "error", "warning", "tip", "info", "ok"];
+
+// Findings that arrived before the scan finished, in report order. They are
+// shown read-only: a fix is looked up in the server's finished scan, which
+// does not exist yet.
+function provisionalFindings(findings) {
+  const rank = (f) => {
+    const i = SEVERITY_ORDER.indexOf(f.severity);
+    return i < 0 ? SEVERITY_ORDER.length : i;
+  };
+  return findings
+    .map((f) => (f.remedy ? { ...f, remedy: { ...f.remedy, runnable: false } } : f))
+    .sort((a, b) => rank(a) - rank(b)
+      || (a.category || "").localeCompare(b.category || "")
+      || (a.id || "").localeCompare(b.id || ""));
+}
+
+async function readScanStream(res, onProgress) {
+  const partial = { probes: [], rules: 0, findings: [] };
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buffered.split("\n");
+    buffered = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+      if (event.event === "result") return { ...event.result, cached: event.cached };
+      if (event.event === "error") throw new Error(`Scan failed: ${event.error}`);
+      if (event.event === "probe") partial.probes.push(event.name);
+      if (event.event === "rule") {
+        partial.rules += 1;
+        partial.findings = partial.findings.concat(event.findings || []);
+      }
+      onProgress(partial);
+    }
+    if (done) throw new Error("Scan failed: the connection closed before the result arrived");
+  }
+}
+
 function buildErrorView(message, ctx) {
   const wrap = el("div", { class: "cd-error-view" });
   wrap.appendChild(icon("pi-exclamation-triangle"));
@@ -805,7 +856,11 @@ app.registerExtension({
         function update() {
           panelRoot.textContent = "";
           if (state.loading && !state.data) {
-            panelRoot.appendChild(buildSkeleton());
+            panelRoot.appendChild(buildSkeleton(state.partial));
+            if (state.partial && state.partial.findings.length) {
+              panelRoot.appendChild(buildFindingsList(
+                { findings: provisionalFindings(state.partial.findings) }, ctx));
+            }
             return;
           }
           if (state.error) {
@@ -822,14 +877,24 @@ app.registerExtension({
           }
         }
 
-        async function scan() {
+        // Opening the panel may be answered from the server's scan cache; a
+        // "Scan again" click always scans. Findings show up as the rules finish
+        // on a first scan; on a re-scan the previous report stays up until the
+        // new one is complete.
+        async function scan(force = false) {
           state.loading = true;
           state.error = null;
+          state.partial = null;
           update();
           try {
-            const res = await api.fetchApi("/comfydoctor/scan");
+            // Streamed, so that cheap findings show while the torch probe is
+            // still running.
+            const res = await api.fetchApi(force ? "/comfydoctor/scan/stream?force=1" : "/comfydoctor/scan/stream");
             if (!res.ok) throw new Error(`Scan failed (HTTP ${res.status})`);
-            state.data = await res.json();
+            state.data = await readScanStream(res, (partial) => {
+              state.partial = partial;
+              update();
+            });
           } catch (err) {
             state.error = (err && err.message) || "Failed to scan your environment.";
           } finally {
@@ -838,7 +903,7 @@ app.registerExtension({
           }
         }
 
-        ctx.scan = scan;
+        ctx.scan = () => scan(true);
         ctx.rerender = update;
         scan();
 